@@ -48,11 +48,89 @@ CREATE TABLE PriceFactor (
     UNIQUE (flight_id, seats_booked_percent)
 );
 
+-- OPTIONAL TABLES (the booking path writes passengers and receipts only when these exist)
+
+CREATE TABLE passengers (
+    passenger_id SERIAL PRIMARY KEY,-- PRIMARY KEY, SERIAL
+    booking_id INTEGER REFERENCES Booking(booking_id),-- FOREIGN KEY
+    name VARCHAR(100) NOT NULL,
+    age INTEGER,
+    passport VARCHAR(20),
+    seat VARCHAR(5)
+);
+
+CREATE TABLE receipts (
+    receipt_id SERIAL PRIMARY KEY,-- PRIMARY KEY, SERIAL
+    booking_id INTEGER REFERENCES Booking(booking_id),-- FOREIGN KEY
+    payload_json TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_passengers_booking ON passengers (booking_id);
+CREATE INDEX IF NOT EXISTS idx_receipts_booking ON receipts (booking_id);
+
+-- PNR SEQUENCE (each API process reserves a block of sequence numbers and encodes them as 6-character PNRs)
+
+CREATE TABLE IF NOT EXISTS PnrBlock (
+    block_name VARCHAR(20) PRIMARY KEY,-- PRIMARY KEY
+    next_value BIGINT NOT NULL
+);
+
+INSERT INTO PnrBlock (block_name, next_value) VALUES ('pnr', 0);
+
+-- FARE HOLDS (nonce of each fare hold token redeemed by a booking; makes tokens single use)
+
+CREATE TABLE IF NOT EXISTS FareHoldClaim (
+    nonce VARCHAR(16) PRIMARY KEY,-- PRIMARY KEY
+    pnr_code CHAR(6) NOT NULL,
+    expires_at BIGINT NOT NULL
+);
+
+-- READ MODELS (GET /booking/{pnr}: one JSON document per PNR with booking, flight, passengers and receipt)
+
+CREATE TABLE IF NOT EXISTS BookingView (
+    pnr_code CHAR(6) PRIMARY KEY,-- PRIMARY KEY
+    booking_id INTEGER NOT NULL,
+    flight_id INTEGER NOT NULL,
+    document TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- INDEXES (search path: origin/destination lookup, then departures per route in time order)
+-- origin-led lookups are already served by the UNIQUE (origin_airport_code, destination_airport_code) index
+
+CREATE INDEX IF NOT EXISTS idx_route_destination ON Route (destination_airport_code);
+CREATE INDEX IF NOT EXISTS idx_flight_route_departure ON Flight (route_id, departure_time);
+CREATE INDEX IF NOT EXISTS idx_booking_flight ON Booking (flight_id);
+
 -- ALTER TABLE EXAMPLE
 
 ALTER TABLE Flight
 ADD COLUMN current_occupancy DECIMAL(5, 2) NOT NULL DEFAULT 0.00;
 
+-- CANCELLATIONS (status and seat count per booking, flight status, refunds issued on cancel)
+
+ALTER TABLE Booking
+ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'confirmed';
+
+ALTER TABLE Booking
+ADD COLUMN seat_count INTEGER NOT NULL DEFAULT 1;
+
+ALTER TABLE Booking
+ADD COLUMN cancelled_at TIMESTAMP WITH TIME ZONE;
+
+ALTER TABLE Flight
+ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'scheduled';
+
+CREATE TABLE Refund (
+    refund_id SERIAL PRIMARY KEY,-- PRIMARY KEY, SERIAL
+    booking_id INTEGER REFERENCES Booking(booking_id),-- FOREIGN KEY
+    pnr_code CHAR(6) NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL CHECK (amount >= 0),
+    reason VARCHAR(30) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- SAMPLE DATA POPULATION 
 
 --- 1. Aircraft (20 Entries)
@@ -1,96 +1,246 @@
 # backend/api.py
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-from datetime import datetime
-import io, json
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from datetime import date, datetime
+from typing import List, Optional
+import asyncio, json, os
 
-from backend import crud
-from backend.schemas import BookingRequest, BookingResponse
+from backend import cancellation, crud, receipts
+from backend.cache import booking_cache, search_cache
+from backend.db_config import init_db
+from backend.fare_calendar import MAX_CALENDAR_DAYS, fare_calendar, fare_calendar_for
+from backend.fare_stream import HEARTBEAT_SECONDS, MAX_STREAM_FLIGHTS, fare_publisher
+from backend.metrics import MetricsMiddleware, recent_profiles, render_metrics
+from backend.route_graph import MAX_STOPS, MIN_CONNECTION_MINUTES, find_connections, route_graph
+from backend.seat_map import seat_maps
+from backend.schemas import (BatchBookingRequest, BatchBookingResponse, BookingRequest, BookingResponse,
+                             BulkCancelRequest, BulkCancelResponse, CancelResult, FareCalendarResponse, FareHoldRequest,
+                             FareHoldResponse, Itinerary)
 
 app = FastAPI(title="Flight Booking Simulator API")
+app.add_middleware(MetricsMiddleware, fastapi_app=app)
+
+# "async" runs /search and /book_multi on the async engine; "sync" keeps the blocking
+# SQLAlchemy session on the threadpool (handy for side-by-side benchmarks)
+DB_IO_MODE = os.getenv("DB_IO_MODE", "async")
+MAX_BATCH_SIZE = 1000
+
+@app.on_event("startup")
+def startup():
+    init_db()
+    route_graph.build()
+    fare_publisher.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    fare_publisher.stop()
+    receipts.shutdown()
 
 # Search endpoint
 @app.get("/search")
-def search(origin: str = "", destination: str = ""):
+async def search(origin: str = "", destination: str = "", date_from: Optional[date] = None, date_to: Optional[date] = None,
+                 limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
     try:
-        results = crud.search_flights(origin.strip().upper(), destination.strip().upper())
+        args = (origin.strip().upper(), destination.strip().upper(), date_from, date_to, limit, offset)
+        if DB_IO_MODE == "async":
+            results = await crud.search_flights_async(*args)
+        else:
+            results = await run_in_threadpool(crud.search_flights, *args)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Multi-leg connections from the in-memory route graph (see backend/route_graph.py)
+@app.get("/connections", response_model=List[Itinerary])
+def connections(origin: str, destination: str, date: date, k: int = Query(5, ge=1, le=50),
+                sort: str = Query("price", regex="^(price|duration)$"), max_stops: int = Query(MAX_STOPS, ge=0, le=MAX_STOPS),
+                seats: int = Query(1, ge=1, le=9), min_connection: int = Query(MIN_CONNECTION_MINUTES, ge=0, le=24 * 60)):
+    return find_connections(origin.strip().upper(), destination.strip().upper(), date, k=k, sort=sort,
+                            max_stops=max_stops, seats=seats, min_connection=min_connection)
+
+# Cheapest fare per departure date on one route (see backend/fare_calendar.py)
+@app.get("/fare_calendar", response_model=FareCalendarResponse)
+def fare_calendar_view(origin: str, destination: str, date_from: Optional[date] = None,
+                       days: int = Query(60, ge=1, le=MAX_CALENDAR_DAYS)):
+    return fare_calendar_for(origin.strip().upper(), destination.strip().upper(), date_from, days)
+
+# Live fares: server-sent events with fare and seat-count changes for the listed flights (see backend/fare_stream.py).
+# The first event is a "snapshot" of every flight, then "fare" events carry only what changed.
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/stream/fares")
+async def stream_fares(flight_ids: str):
+    try:
+        ids = sorted({int(f) for f in flight_ids.split(",") if f.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="flight_ids must be comma-separated integers")
+    if not ids or len(ids) > MAX_STREAM_FLIGHTS:
+        raise HTTPException(status_code=400, detail=f"Subscribe to 1 to {MAX_STREAM_FLIGHTS} flights")
+    sub = fare_publisher.subscribe(ids, asyncio.get_running_loop())
+    try:
+        snapshot = await run_in_threadpool(fare_publisher.current, ids)
+    except Exception:
+        fare_publisher.unsubscribe(sub)
+        raise
+
+    async def events():
+        try:
+            yield _sse("snapshot", snapshot)
+            while True:
+                batch = await sub.next_batch(HEARTBEAT_SECONDS)
+                yield "".join(_sse("fare", update) for update in batch) if batch else ": keepalive\n\n"
+        finally:
+            fare_publisher.unsubscribe(sub)
+
+    # the Streamlit page reads the stream straight from the browser, from another origin
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Access-Control-Allow-Origin": "*"})
+
+# Fare hold: the quoted fare per seat is honoured by /book_multi with the token until it expires (see backend/fare_hold.py)
+@app.post("/fare_hold", response_model=FareHoldResponse)
+def fare_hold(req: FareHoldRequest):
+    if req.seats < 1:
+        raise HTTPException(status_code=400, detail="seats must be at least 1")
+    try:
+        return crud.hold_fare(req.flight_id, req.seats)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+# Prometheus scrape endpoint (see backend/metrics.py)
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Last sampled profiles (METRICS_PROFILING=1 and an "X-Profile: 1" request header)
+@app.get("/metrics/profiles")
+def profiles():
+    return recent_profiles()
+
+# Search cache counters
+@app.get("/cache/stats")
+def cache_stats():
+    return {"search": search_cache.stats(), "bookings": booking_cache.stats(), "receipts": receipts.receipt_store.stats(),
+            "seat_maps": seat_maps.stats(), "route_graph": route_graph.stats(), "fare_calendar": fare_calendar.stats()}
+
+# Seat map (served from the in-memory bitmaps, not a Seat scan per view)
+@app.get("/flights/{flight_id}/seats")
+def flight_seats(flight_id: int):
+    seat_map = seat_maps.get(flight_id)
+    return {"flight_id": flight_id, "availability": seat_map.availability(), "cabins": seat_map.layout()}
+
 # Booking endpoint
 @app.post("/book_multi", response_model=BookingResponse)
-def book_multi(req: BookingRequest):
+async def book_multi(req: BookingRequest):
     try:
         payload = req.dict()
-        result = crud.book_multi(payload)
-        return {"pnr": result["pnr"], "total_price": result["total_price"], "status": "confirmed"}
+        if DB_IO_MODE == "async":
+            result = await crud.book_multi_async(payload)
+        else:
+            result = await run_in_threadpool(crud.book_multi, payload)
+        return {"pnr": result["pnr"], "total_price": result["total_price"], "status": "confirmed", "seats": result["seats"]}
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
+    except crud.BookingConflict as bc:
+        raise HTTPException(status_code=409, detail=str(bc))
     except RuntimeError as re:
         raise HTTPException(status_code=402, detail=str(re))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Get booking & receipt
+# Batch booking endpoint (agency blocks / load tests); per-item success or failure
+@app.post("/book_batch", response_model=BatchBookingResponse)
+async def book_batch(req: BatchBookingRequest):
+    if len(req.bookings) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} bookings per batch")
+    if any(b.fare_hold_token for b in req.bookings):
+        raise HTTPException(status_code=400, detail="Fare holds apply to /book_multi only")
+    try:
+        payload = [b.dict() for b in req.bookings]
+        if DB_IO_MODE == "async":
+            results = await crud.book_batch_async(payload)
+        else:
+            results = await run_in_threadpool(crud.book_batch, payload)
+        confirmed = sum(1 for r in results if r["status"] == "confirmed")
+        return {"confirmed": confirmed, "failed": len(results) - confirmed, "results": results}
+    except crud.BookingConflict as bc:
+        raise HTTPException(status_code=409, detail=str(bc))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Get booking & receipt (read model, see backend/booking_view.py)
 @app.get("/booking/{pnr}")
-def get_booking(pnr: str):
-    # Try to find booking details and receipt (depends on your schema)
-    session = None
+async def get_booking(pnr: str):
+    pnr = pnr.strip().upper()
+    if DB_IO_MODE == "async":
+        doc = await crud.get_booking_async(pnr)
+    else:
+        doc = await run_in_threadpool(crud.get_booking, pnr)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return doc
+
+# Cancellation: releases seats and occupancy, records the refund (see backend/cancellation.py)
+async def _cancel(pnrs, reason):
+    if DB_IO_MODE == "async":
+        return await cancellation.cancel_bookings_async(pnrs, reason)
+    return await run_in_threadpool(cancellation.cancel_bookings, pnrs, reason)
+
+def _cancel_summary(results):
+    cancelled = [r for r in results if r["status"] == "cancelled"]
+    return {"cancelled": len(cancelled), "failed": len(results) - len(cancelled),
+            "refund_total": round(sum(r["refund"] for r in cancelled), 2), "results": results}
+
+@app.post("/cancel/{pnr}", response_model=CancelResult)
+async def cancel(pnr: str):
     try:
-        from backend.db_config import get_session
-        session = get_session()
-        res = session.execute("SELECT * FROM Booking WHERE pnr_code = :pnr", {"pnr": pnr}).fetchone()
-        if not res:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        booking = dict(res)
-        # try receipt
-        try:
-            rec = session.execute("SELECT payload_json FROM receipts WHERE booking_id = :bid ORDER BY receipt_id DESC LIMIT 1", {"bid": booking['booking_id']}).fetchone()
-            receipt = json.loads(rec.payload_json) if rec else None
-        except Exception:
-            receipt = None
-        return {"booking": booking, "receipt": receipt}
-    finally:
-        if session:
-            session.close()
-
-# Receipt PDF
-@app.get("/receipt/{pnr}")
-def receipt_pdf(pnr: str):
-    # Get receipt payload
-    session = None
+        result = (await _cancel([pnr], "customer"))[0]
+    except crud.BookingConflict as bc:
+        raise HTTPException(status_code=409, detail=str(bc))
+    if result["status"] != "cancelled":
+        raise HTTPException(status_code=404 if result["error"] == "Booking not found" else 400, detail=result["error"])
+    return result
+
+@app.post("/cancel_batch", response_model=BulkCancelResponse)
+async def cancel_batch(req: BulkCancelRequest):
+    if len(req.pnrs) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} PNRs per batch")
     try:
-        from backend.db_config import get_session
-        session = get_session()
-        row = session.execute("SELECT b.booking_id, r.payload_json FROM Booking b JOIN receipts r ON b.booking_id = r.booking_id WHERE b.pnr_code = :pnr ORDER BY r.receipt_id DESC LIMIT 1", {"pnr": pnr}).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Receipt not found")
-        payload = json.loads(row.payload_json)
-
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        p.setFont("Helvetica", 12)
-        p.drawString(40, 750, f"Flight Booking Receipt - PNR: {payload.get('pnr')}")
-        p.drawString(40, 730, f"Flight ID: {payload.get('flight_id')}")
-        p.drawString(40, 710, f"Seats: {payload.get('seats')}")
-        p.drawString(40, 690, f"Total Price: ${payload.get('total_price')}")
-        p.drawString(40, 670, f"Booking Time: {payload.get('booking_time')}")
-        p.drawString(40, 650, "Passengers:")
-        y = 630
-        for psg in payload.get("passengers", []):
-            line = f"- {psg.get('name')} | age:{psg.get('age')} | passport:{psg.get('passport')}"
-            p.drawString(60, y, line)
-            y -= 16
-            if y < 80:
-                p.showPage()
-                y = 750
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        return FileResponse(buffer, media_type='application/pdf', filename=f"receipt_{pnr}.pdf")
-    finally:
-        if session:
-            session.close()
+        return _cancel_summary(await _cancel(req.pnrs, req.reason))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except crud.BookingConflict as bc:
+        raise HTTPException(status_code=409, detail=str(bc))
+
+# Airline-side cancellation of a whole flight: every confirmed booking, full refunds
+@app.post("/flights/{flight_id}/cancel", response_model=BulkCancelResponse)
+async def cancel_flight(flight_id: int):
+    try:
+        if DB_IO_MODE == "async":
+            results = await cancellation.cancel_flight_async(flight_id)
+        else:
+            results = await run_in_threadpool(cancellation.cancel_flight, flight_id)
+        return _cancel_summary(results)
+    except cancellation.FlightNotFound as nf:
+        raise HTTPException(status_code=404, detail=str(nf))
+    except crud.BookingConflict as bc:
+        raise HTTPException(status_code=409, detail=str(bc))
+
+# Receipt PDF: pre-rendered after booking (see backend/receipts.py), rendered off the event loop on a miss
+RECEIPT_CHUNK_BYTES = 64 * 1024
+
+@app.get("/receipt/{pnr}")
+async def receipt_pdf(pnr: str, if_none_match: Optional[str] = Header(None)):
+    pnr = pnr.strip().upper()
+    entry = await receipts.get_receipt_pdf(pnr, crud.receipt_payload)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Receipt not found")
+    pdf, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="receipt_{pnr}.pdf"'
+    headers["Content-Length"] = str(len(pdf))
+    chunks = (pdf[i:i + RECEIPT_CHUNK_BYTES] for i in range(0, len(pdf), RECEIPT_CHUNK_BYTES))
+    return StreamingResponse(chunks, media_type="application/pdf", headers=headers)
@@ -1,107 +1,65 @@
 # backend/backend.py
-from fastapi import FastAPI
-from datetime import datetime
-import random
+from fastapi import FastAPI, HTTPException
+import os
 from apscheduler.schedulers.background import BackgroundScheduler
-from backend.pricing_engine import calculate_dynamic_fare
-from backend.db_config import get_connection, init_db
+from backend import crud
+from backend.db_config import init_db
 from backend.models import FlightBooking
+from backend.simulator import DemandSimulator
 
 app = FastAPI(title="Flight Booking Simulator")
 
-# Initialize DB
-init_db()
+SIMULATION_INTERVAL_SECONDS = int(os.getenv("SIMULATION_INTERVAL_SECONDS", "60"))
 
 # ----------------------------
 # Background Simulation
 # ----------------------------
-def simulate_demand():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM flights")
-    flights = cursor.fetchall()
+simulator = DemandSimulator(arrival_model=os.getenv("SIMULATION_ARRIVAL_MODEL", "poisson"))
+scheduler = BackgroundScheduler()
 
-    for flight in flights:
-        seats_to_book = random.randint(0, 3)
-        new_booked = min(flight["booked_seats"] + seats_to_book, flight["total_seats"])
-        cursor.execute("UPDATE flights SET booked_seats=? WHERE flight_id=?", (new_booked, flight["flight_id"]))
-        print(f"[{datetime.now()}] Flight {flight['flight_id']} booked seats: {new_booked}")
+@app.on_event("startup")
+def startup():
+    # Initialize DB
+    init_db()
+    scheduler.add_job(simulator.tick, 'interval', seconds=SIMULATION_INTERVAL_SECONDS, max_instances=1, coalesce=True)
+    scheduler.start()
 
-    conn.commit()
-    conn.close()
+@app.on_event("shutdown")
+def shutdown():
+    scheduler.shutdown(wait=False)
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(simulate_demand, 'interval', seconds=60)
-scheduler.start()
+@app.get("/simulator/stats")
+def simulator_stats():
+    return simulator.metrics
 
 # ----------------------------
 # API: Search Flights
 # ----------------------------
 @app.get("/search")
 def search_flights(origin: str, destination: str):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM flights WHERE origin=? AND destination=?", (origin, destination))
-    flights = cursor.fetchall()
-    results = []
-
-    for flight in flights:
-        demand_level = random.choice(["low", "medium", "high"])
-        fare = calculate_dynamic_fare(
-            flight["base_fare"],
-            flight["total_seats"],
-            flight["booked_seats"],
-            datetime.fromisoformat(flight["departure"]),
-            demand_level
-        )
-        results.append({
-            "flight_id": flight["flight_id"],
-            "origin": flight["origin"],
-            "destination": flight["destination"],
-            "departure": flight["departure"],
-            "fare": fare,
-            "available_seats": flight["total_seats"] - flight["booked_seats"]
-        })
-
-    conn.close()
-    return results
+    return crud.search_flights(origin.strip().upper(), destination.strip().upper())
 
 # ----------------------------
 # API: Book Flight
 # ----------------------------
 @app.post("/book")
 def book_flight(booking: FlightBooking):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM flights WHERE flight_id=?", (booking.flight_id,))
-    flight = cursor.fetchone()
-
-    if not flight:
-        conn.close()
-        return {"error": "Flight not found"}
-
-    available = flight["total_seats"] - flight["booked_seats"]
-    if booking.seats > available:
-        conn.close()
-        return {"error": f"Only {available} seats available"}
-
-    # Concurrency-safe update
-    new_booked = flight["booked_seats"] + booking.seats
-    cursor.execute("UPDATE flights SET booked_seats=? WHERE flight_id=?", (new_booked, booking.flight_id))
-
-    # Generate PNR
-    pnr = f"PNR{random.randint(1000,9999)}"
-    cursor.execute(
-        "INSERT INTO bookings (flight_id, seats_booked, pnr, booking_time) VALUES (?,?,?,?)",
-        (booking.flight_id, booking.seats, pnr, datetime.now().isoformat())
-    )
-
-    conn.commit()
-    conn.close()
+    req = {
+        "flight_id": booking.flight_id,
+        "passengers": [{"name": f"Passenger {i + 1}"} for i in range(booking.seats)],
+        "simulate_payment": False
+    }
+    try:
+        result = crud.book_multi(req)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except crud.BookingConflict as bc:
+        raise HTTPException(status_code=409, detail=str(bc))
 
     return {
         "message": "Booking confirmed",
         "flight_id": booking.flight_id,
         "seats_booked": booking.seats,
-        "pnr": pnr
+        "pnr": result["pnr"],
+        "total_price": result["total_price"]
     }
@@ -0,0 +1,104 @@
+# backend/booking_view.py
+import json
+
+from sqlalchemy import bindparam, text
+
+# Denormalized read model for GET /booking/{pnr}: one row per PNR holding the booking, its passengers,
+# the receipt payload and the flight summary as a JSON document, so a lookup is a single primary-key read.
+# Written in the same transaction as the booking (crud._book_multi_tx / _book_batch_tx).
+BOOKING_VIEW_DDL = """
+CREATE TABLE IF NOT EXISTS BookingView (
+    pnr_code CHAR(6) PRIMARY KEY,
+    booking_id INTEGER NOT NULL,
+    flight_id INTEGER NOT NULL,
+    document TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+INSERT_VIEW_SQL = "INSERT INTO BookingView (pnr_code, booking_id, flight_id, document, updated_at) VALUES (:pnr, :bid, :fid, :doc, :ua)"
+
+VIEW_SQL = "SELECT document FROM BookingView WHERE pnr_code = :pnr"
+
+# Source rows for (re)building documents of bookings written before the read model existed
+SOURCE_BOOKING_SQL = """
+SELECT b.booking_id, b.pnr_code, b.flight_id, b.seat_id, b.total_fare_paid, b.passenger_name, b.booking_time,
+       b.status, b.seat_count, f.flight_number, f.departure_time, r.origin_airport_code, r.destination_airport_code
+FROM Booking b
+LEFT JOIN Flight f ON f.flight_id = b.flight_id
+LEFT JOIN Route r ON r.route_id = f.route_id
+"""
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+def booking_document(booking, flight, passengers, receipt):
+    """
+    The read-model document. booking: Booking columns; flight: flight_number / origin / destination / departure;
+    passengers: list of dicts; receipt: stored receipt payload (or None).
+    """
+    booking = dict(booking)
+    booking["total_fare_paid"] = float(booking["total_fare_paid"])
+    booking["booking_time"] = _iso(booking.get("booking_time"))
+    flight = dict(flight)
+    flight["departure"] = _iso(flight.get("departure"))
+    return {"booking": booking, "flight": flight, "passengers": passengers, "receipt": receipt}
+
+def view_row(doc, updated_at):
+    b = doc["booking"]
+    return {"pnr": b["pnr_code"], "bid": b["booking_id"], "fid": b["flight_id"], "doc": json.dumps(doc, default=str), "ua": updated_at}
+
+def write_views(session, rows):
+    """Insert read-model rows (view_row dicts) inside the caller's transaction."""
+    if rows:
+        session.execute(text(INSERT_VIEW_SQL), rows)
+
+def read_view(session, pnr: str):
+    row = session.execute(text(VIEW_SQL), {"pnr": pnr}).fetchone()
+    return json.loads(row.document) if row else None
+
+def read_views(session, pnrs):
+    """{pnr: document} for the PNRs that have a view row."""
+    q = text("SELECT pnr_code, document FROM BookingView WHERE pnr_code IN :pnrs").bindparams(bindparam("pnrs", expanding=True))
+    return {r.pnr_code: json.loads(r.document) for r in session.execute(q, {"pnrs": list(pnrs)})}
+
+def update_views(session, docs, updated_at):
+    """Rewrite existing read-model rows (e.g. after a cancellation) inside the caller's transaction."""
+    if docs:
+        session.execute(text("UPDATE BookingView SET document = :doc, updated_at = :ua WHERE pnr_code = :pnr"),
+                        [{"pnr": d["booking"]["pnr_code"], "doc": json.dumps(d, default=str), "ua": updated_at} for d in docs])
+
+def build_documents(conn, pnrs, caps):
+    """Documents for the given PNRs from the base tables (three set-based queries)."""
+    q = text(SOURCE_BOOKING_SQL + " WHERE b.pnr_code IN :pnrs").bindparams(bindparam("pnrs", expanding=True))
+    bookings = conn.execute(q, {"pnrs": list(pnrs)}).fetchall()
+    if not bookings:
+        return []
+    ids = [b.booking_id for b in bookings]
+    passengers, receipts = {}, {}
+    if caps.get("passengers"):
+        q = text("SELECT booking_id, name, age, passport, seat FROM passengers WHERE booking_id IN :ids ORDER BY passenger_id")
+        for p in conn.execute(q.bindparams(bindparam("ids", expanding=True)), {"ids": ids}):
+            passengers.setdefault(p.booking_id, []).append({"name": p.name, "age": p.age, "passport": p.passport, "seat": p.seat})
+    if caps.get("receipts"):
+        q = text("SELECT booking_id, payload_json FROM receipts WHERE booking_id IN :ids ORDER BY receipt_id")
+        for r in conn.execute(q.bindparams(bindparam("ids", expanding=True)), {"ids": ids}):
+            receipts[r.booking_id] = json.loads(r.payload_json)  # latest receipt wins
+    docs = []
+    for b in bookings:
+        m = b._mapping
+        docs.append(booking_document(
+            {k: m[k] for k in ("booking_id", "pnr_code", "flight_id", "seat_id", "total_fare_paid", "passenger_name", "booking_time", "status", "seat_count")},
+            {"flight_number": b.flight_number, "origin": b.origin_airport_code, "destination": b.destination_airport_code, "departure": b.departure_time},
+            passengers.get(b.booking_id, []), receipts.get(b.booking_id)))
+    return docs
+
+def ensure_view_table(conn, caps, batch_size: int = 1000):
+    """Create BookingView if missing and backfill documents for bookings that don't have one yet."""
+    conn.execute(text(BOOKING_VIEW_DDL))
+    missing = [r.pnr_code for r in conn.execute(text(
+        "SELECT b.pnr_code FROM Booking b LEFT JOIN BookingView v ON v.pnr_code = b.pnr_code WHERE v.pnr_code IS NULL"))]
+    for start in range(0, len(missing), batch_size):
+        docs = build_documents(conn, missing[start:start + batch_size], caps)
+        if docs:
+            conn.execute(text(INSERT_VIEW_SQL), [view_row(d, None) for d in docs])
@@ -0,0 +1,86 @@
+# backend/cache.py
+import threading, time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL. Entries can be tagged with flight ids so that
+    everything mentioning a flight is dropped when its occupancy changes.
+    Counters (hits / misses / evictions / invalidations) are exposed through stats().
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()  # key -> (expires_at, value, flight_ids)
+        self._by_flight = {}  # flight_id -> set of keys
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, flight_ids=()):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value, tuple(flight_ids))
+            for fid in flight_ids:
+                self._by_flight.setdefault(fid, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single entry."""
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+                self.invalidations += 1
+
+    def invalidate_flights(self, flight_ids):
+        """Drop every entry tagged with any of flight_ids."""
+        with self._lock:
+            for fid in flight_ids:
+                for key in list(self._by_flight.get(fid, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_flight.clear()
+
+    def _drop(self, key):
+        _, _, flight_ids = self._data.pop(key)
+        for fid in flight_ids:
+            keys = self._by_flight.get(fid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_flight[fid]
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl_seconds": self.ttl_seconds,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations}
+
+# /search results keyed by (origin, destination, date window, page)
+search_cache = TTLCache(maxsize=2048, ttl_seconds=30.0)
+
+# /booking/{pnr} read-model documents keyed by PNR, tagged with the booking's flight. Cancellations
+# write through only in the process that ran them, so the TTL bounds how long other workers can
+# serve a cancelled booking as confirmed; it absorbs repeated polling of a fresh booking.
+booking_cache = TTLCache(maxsize=20000, ttl_seconds=5.0)
@@ -0,0 +1,214 @@
+# backend/cancellation.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, inspect, text
+
+from backend import crud
+from backend.booking_view import read_views, update_views
+from backend.cache import booking_cache
+from backend.db_config import detect_table_capabilities, table_capabilities
+from backend.route_graph import route_graph
+from backend.seat_map import seat_maps
+from backend.utils import to_utc_naive
+
+# Columns cancellation needs on Booking (kept in sync with the ALTER TABLE section of DB/db_schema.sql)
+BOOKING_COLUMNS = {
+    "status": "VARCHAR(20) NOT NULL DEFAULT 'confirmed'",
+    "seat_count": "INTEGER NOT NULL DEFAULT 1",
+    "cancelled_at": "TIMESTAMP WITH TIME ZONE",
+}
+# cancel_flight sets 'cancelled'; search, booking and the route graph skip cancelled flights
+FLIGHT_COLUMNS = {
+    "status": "VARCHAR(20) NOT NULL DEFAULT 'scheduled'",
+}
+
+REFUND_DDL = """
+CREATE TABLE IF NOT EXISTS Refund (
+    refund_id {pk},
+    booking_id INTEGER REFERENCES Booking(booking_id),
+    pnr_code CHAR(6) NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL CHECK (amount >= 0),
+    reason VARCHAR(30) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Share of the fare refunded by time left before departure (first matching row wins); airline-initiated
+# cancellations (reason "flight_cancelled", only set by cancel_flight) are always refunded in full
+REFUND_POLICY = ((timedelta(days=7), 1.0), (timedelta(hours=24), 0.5), (timedelta(0), 0.0))
+FLIGHT_CANCELLED = "flight_cancelled"
+# Reasons a customer may give (stored in Refund.reason; all follow REFUND_POLICY)
+CUSTOMER_REASONS = ("customer", "duplicate_booking", "schedule_conflict")
+
+CANCEL_BOOKINGS_SQL = """
+SELECT b.booking_id, b.pnr_code, b.flight_id, b.seat_id, b.total_fare_paid, b.seat_count, b.status, f.departure_time
+FROM Booking b
+JOIN Flight f ON f.flight_id = b.flight_id
+"""
+
+# Decrement per flight; never below zero (the demand simulator also moves occupancy without Booking rows)
+RELEASE_OCCUPANCY_SQL = """
+UPDATE Flight SET current_occupancy = CASE WHEN current_occupancy > :n THEN current_occupancy - :n ELSE 0 END
+WHERE flight_id = :fid
+"""
+
+class FlightNotFound(ValueError):
+    """cancel_flight was given a flight id that does not exist."""
+
+def ensure_cancellation_schema(conn):
+    """Add the Booking and Flight status columns and the Refund table to an existing database (run from init_db)."""
+    tables = {t.lower(): t for t in inspect(conn).get_table_names()}
+    existing = {c["name"].lower() for c in inspect(conn).get_columns(tables["flight"])}
+    for name, ddl in FLIGHT_COLUMNS.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE Flight ADD COLUMN {name} {ddl}"))
+    existing = {c["name"].lower() for c in inspect(conn).get_columns(tables["booking"])}
+    for name, ddl in BOOKING_COLUMNS.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE Booking ADD COLUMN {name} {ddl}"))
+            if name == "seat_count" and (table_capabilities or detect_table_capabilities(conn))["passengers"]:
+                conn.execute(text("UPDATE Booking SET seat_count = (SELECT COUNT(*) FROM passengers p WHERE p.booking_id = Booking.booking_id) "
+                                  "WHERE EXISTS (SELECT 1 FROM passengers p WHERE p.booking_id = Booking.booking_id)"))
+    pk = "SERIAL PRIMARY KEY" if conn.dialect.name == "postgresql" else "INTEGER PRIMARY KEY"
+    conn.execute(text(REFUND_DDL.format(pk=pk)))
+
+def refund_amount(fare_paid: float, departure: datetime, now: datetime, reason: str) -> float:
+    if reason == FLIGHT_CANCELLED:
+        return round(fare_paid, 2)
+    left = departure - now
+    for min_left, share in REFUND_POLICY:
+        if left >= min_left:
+            return round(fare_paid * share, 2)
+    return 0.0
+
+def cancel_bookings(pnrs, reason: str = "customer"):
+    """
+    Cancel many PNRs in one transaction. Returns one result per PNR, in order:
+    {"pnr", "status": "cancelled"|"failed", "refund", "error"}.
+    """
+    _check_reason(reason)
+    outcome = crud._with_retry(_cancel_tx, [p.strip().upper() for p in pnrs], None, reason)
+    return _after_cancel_commit(outcome)
+
+async def cancel_bookings_async(pnrs, reason: str = "customer"):
+    """Async variant of cancel_bookings."""
+    _check_reason(reason)
+    outcome = await crud._with_retry_async(_cancel_tx, [p.strip().upper() for p in pnrs], None, reason)
+    return _after_cancel_commit(outcome)
+
+def cancel_flight(flight_id: int):
+    """Mark a flight cancelled (it is no longer searched or sold) and cancel its confirmed bookings, with full refunds."""
+    return _after_cancel_commit(crud._with_retry(_cancel_tx, None, flight_id, FLIGHT_CANCELLED))
+
+async def cancel_flight_async(flight_id: int):
+    """Async variant of cancel_flight."""
+    return _after_cancel_commit(await crud._with_retry_async(_cancel_tx, None, flight_id, FLIGHT_CANCELLED))
+
+def _check_reason(reason: str):
+    if reason not in CUSTOMER_REASONS:
+        raise ValueError(f"Unknown cancellation reason {reason!r}")
+
+def _cancel_tx(session, pnrs, flight_id, reason):
+    """
+    Set-based regardless of how many bookings are cancelled: one read, one Booking UPDATE, one Seat UPDATE
+    and one occupancy UPDATE per flight, one executemany each for refunds and read-model rows.
+    """
+    with session.begin():
+        if pnrs is not None:
+            q, params = CANCEL_BOOKINGS_SQL + " WHERE b.pnr_code IN :pnrs", {"pnrs": pnrs}
+        else:
+            q, params = CANCEL_BOOKINGS_SQL + " WHERE b.flight_id = :fid AND b.status = 'confirmed'", {"fid": flight_id}
+        if session.get_bind().dialect.name == "postgresql":
+            q += " FOR UPDATE OF b"
+        q = text(q)
+        if pnrs is not None:
+            q = q.bindparams(bindparam("pnrs", expanding=True))
+        rows = session.execute(q, params).fetchall()
+        found = {r.pnr_code: r for r in rows}
+        if flight_id is not None:
+            if session.execute(text("UPDATE Flight SET status = 'cancelled' WHERE flight_id = :fid"), {"fid": flight_id}).rowcount != 1:
+                raise FlightNotFound("Flight not found")
+
+        order = pnrs if pnrs is not None else [r.pnr_code for r in rows]
+        now = datetime.utcnow()
+        results, live, seen = [], [], set()
+        for pnr in order:
+            r = found.get(pnr)
+            if pnr in seen:
+                results.append({"pnr": pnr, "status": "failed", "refund": None, "error": "Duplicate PNR in request"})
+                continue
+            seen.add(pnr)
+            if r is None:
+                results.append({"pnr": pnr, "status": "failed", "refund": None, "error": "Booking not found"})
+            elif r.status != "confirmed":
+                results.append({"pnr": pnr, "status": "failed", "refund": None, "error": f"Booking is already {r.status}"})
+            elif pnrs is not None and to_utc_naive(r.departure_time) <= now:
+                results.append({"pnr": pnr, "status": "failed", "refund": None, "error": "Flight has already departed"})
+            else:
+                results.append({"pnr": pnr, "status": "cancelled", "refund": None, "error": None})
+                live.append(r)
+        outcome = {"results": results, "released": {}, "views": [], "flights": set(), "cancelled_flight": flight_id}
+        if not live:
+            return outcome
+
+        ids = [r.booking_id for r in live]
+        # seat_id is cleared so the seat can be sold again (Booking.seat_id is UNIQUE)
+        q = text("UPDATE Booking SET status = 'cancelled', seat_id = NULL, cancelled_at = :now "
+                 "WHERE booking_id IN :ids AND status = 'confirmed'").bindparams(bindparam("ids", expanding=True))
+        if session.execute(q, {"ids": ids, "now": now.isoformat()}).rowcount != len(ids):
+            raise crud.BookingConflict("Bookings changed during cancellation")
+
+        # seats: the booking's own seat plus every passenger's assigned seat
+        caps = table_capabilities or detect_table_capabilities(session.connection())
+        seat_ids = [r.seat_id for r in live if r.seat_id is not None]
+        numbers = {}
+        if caps["passengers"]:
+            q = text("SELECT b.flight_id, p.seat FROM passengers p JOIN Booking b ON b.booking_id = p.booking_id "
+                     "WHERE p.booking_id IN :ids AND p.seat IS NOT NULL").bindparams(bindparam("ids", expanding=True))
+            for p in session.execute(q, {"ids": ids}):
+                numbers.setdefault(p.flight_id, set()).add(p.seat)
+        if seat_ids:
+            q = text("SELECT flight_id, seat_number FROM Seat WHERE seat_id IN :ids").bindparams(bindparam("ids", expanding=True))
+            for s in session.execute(q, {"ids": seat_ids}):
+                numbers.setdefault(s.flight_id, set()).add(s.seat_number)
+        for fid, nums in numbers.items():
+            q = text("UPDATE Seat SET is_booked = FALSE WHERE flight_id = :fid AND seat_number IN :nums").bindparams(bindparam("nums", expanding=True))
+            session.execute(q, {"fid": fid, "nums": sorted(nums)})
+
+        released = {}
+        for r in live:
+            released[r.flight_id] = released.get(r.flight_id, 0) + (r.seat_count or 1)
+        session.execute(text(RELEASE_OCCUPANCY_SQL), [{"fid": fid, "n": n} for fid, n in released.items()])
+
+        refunds = {r.pnr_code: refund_amount(float(r.total_fare_paid), to_utc_naive(r.departure_time), now, reason) for r in live}
+        session.execute(text("INSERT INTO Refund (booking_id, pnr_code, amount, reason, created_at) VALUES (:bid, :pnr, :amount, :reason, :ca)"),
+                        [{"bid": r.booking_id, "pnr": r.pnr_code, "amount": refunds[r.pnr_code], "reason": reason, "ca": now.isoformat()} for r in live])
+
+        docs = read_views(session, refunds)
+        for pnr, doc in docs.items():
+            doc["booking"].update(status="cancelled", seat_id=None, cancelled_at=now.isoformat())
+            doc["refund"] = {"amount": refunds[pnr], "reason": reason}
+        update_views(session, list(docs.values()), now.isoformat())
+
+        for res in results:
+            if res["status"] == "cancelled":
+                res["refund"] = refunds[res["pnr"]]
+        outcome.update(released={fid: sorted(n) for fid, n in numbers.items()}, views=list(docs.values()), flights=set(released))
+        return outcome
+
+def _after_cancel_commit(outcome):
+    for fid, nums in outcome["released"].items():
+        seat_maps.mark_booked(fid, nums, booked=False)
+    for res in outcome["results"]:
+        if res["status"] == "cancelled":
+            booking_cache.invalidate(res["pnr"])
+    for doc in outcome["views"]:
+        booking_cache.put(doc["booking"]["pnr_code"], doc, [doc["booking"]["flight_id"]])
+    if outcome["cancelled_flight"] is not None:
+        seat_maps.invalidate(outcome["cancelled_flight"])  # never sold again
+        # no seats in the connection graph once refreshed below, and gone from it and the fare calendar
+        # after the (background) rebuild; its search cache entries are dropped below as well
+        route_graph.invalidate()
+        outcome["flights"].add(outcome["cancelled_flight"])
+    crud.notify_occupancy_changed(outcome["flights"])
+    return outcome["results"]
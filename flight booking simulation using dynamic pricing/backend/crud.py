@@ -1,138 +1,581 @@
 # backend/crud.py
-import random, json
-from datetime import datetime
-from sqlalchemy import text
-from backend.db_config import get_session
-from backend.pricing_engine import calculate_dynamic_fare
+import asyncio, random, json, time
+from datetime import date, datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+from backend.booking_view import booking_document, build_documents, read_view, view_row, write_views
+from backend.cache import booking_cache, search_cache
+from backend import db_config, receipts
+from backend.db_config import (detect_table_capabilities, get_async_read_session, get_async_session, get_read_session,
+                               get_session, table_capabilities)
+from backend import fare_hold
+from backend.fare_curves import fare_curves
+from backend.fare_stream import fare_publisher
+from backend.pnr import PnrGenerator, allocate_db_block
+from backend.pricing_engine import calculate_dynamic_fare, calculate_dynamic_fares, demand_level_for, demand_window
+from backend.route_graph import route_graph
+from backend.seat_map import claim_seat_rows, seat_maps
+from backend.utils import to_utc_naive
+
+pnr_generator = PnrGenerator(lambda size: allocate_db_block(db_config.engine, size))
 
 def gen_pnr():
-    t = datetime.utcnow().strftime("%y%m%d%H%M%S")
-    rnd = random.randint(1000, 9999)
-    return f"PNR{t}{rnd}"
+    """Unique 6-character PNR (see backend/pnr.py)."""
+    return pnr_generator.next()
+
+SEARCH_SQL = """
+SELECT f.flight_id, f.flight_number, f.departure_time, f.base_price, f.current_occupancy,
+       r.origin_airport_code, r.destination_airport_code,
+       COALESCE(a.total_capacity, 150) AS total_capacity
+FROM Flight f
+JOIN Route r ON r.route_id = f.route_id
+LEFT JOIN Aircraft a ON a.aircraft_id = f.aircraft_id
+WHERE f.status <> 'cancelled'
+"""
 
-def search_flights(origin: str, destination: str):
+def search_flights(origin: str, destination: str, date_from: date = None, date_to: date = None,
+                   limit: int = 50, offset: int = 0):
     """
-    Return list of flights with dynamic fares (simulate demand randomly).
+    Return list of flights with dynamic fares (demand drawn per flight per demand window).
+    One set-based query (Flight JOIN Route JOIN Aircraft) regardless of result count;
+    date_from/date_to bound the departure date (inclusive) and limit/offset paginate.
+    Results are served from search_cache until the TTL expires or a listed flight's occupancy changes.
+    Reads go to the read replica when READ_DATABASE_URL is set (see db_config.get_read_session).
+    class_availability counts free seats per cabin class for flights with a seat map (see backend/seat_map.py).
     """
-    session = get_session()
+    key = (origin, destination, date_from, date_to, limit, offset, demand_window())
+    results = search_cache.get(key)
+    if results is not None:
+        return results
+    session = get_read_session()
     try:
-        q = "SELECT flight_id, flight_number, departure_time, base_price, current_occupancy, aircraft_id, route_id FROM Flight WHERE 1=1"
-        params = {}
-        if origin:
-            q += " AND route_id IN (SELECT route_id FROM Route WHERE origin_airport_code = :origin)"
-            params['origin'] = origin
-        if destination:
-            q += " AND route_id IN (SELECT route_id FROM Route WHERE destination_airport_code = :destination)"
-            params['destination'] = destination
-
-        rows = session.execute(text(q), params).fetchall()
-        results = []
-        for r in rows:
-            # fetch seats count & booked seats via queries (Seat and Booking tables)
-            # We'll compute total seats as aircraft.total_capacity, current occupancy as Flight.current_occupancy
-            # Fallbacks used if values missing
-            # Get aircraft capacity
-            cap_row = session.execute(text("SELECT total_capacity FROM Aircraft WHERE aircraft_id = :aid"), {"aid": r.aircraft_id}).fetchone()
-            total_seats = cap_row.total_capacity if cap_row else 150
-            booked = int(r.current_occupancy or 0)
-            # parse departure_time
-            departure = r.departure_time.isoformat() if hasattr(r.departure_time, "isoformat") else str(r.departure_time)
-            demand = random.choice(["low", "medium", "high"])
-            fare = calculate_dynamic_fare(float(r.base_price), total_seats, booked, r.departure_time, demand)
-            results.append({
-                "flight_id": r.flight_id,
-                "flight_number": r.flight_number,
-                "departure": departure,
-                "base_price": float(r.base_price),
-                "available_seats": max(0, total_seats - booked),
-                "dynamic_fare": fare
-            })
+        rows = _search_flights_tx(session, origin, destination, date_from, date_to, limit, offset)
+    finally:
+        session.close()
+    results = _search_results(rows)
+    search_cache.put(key, results, [r["flight_id"] for r in results])
+    return results
+
+async def search_flights_async(origin: str, destination: str, date_from: date = None, date_to: date = None,
+                               limit: int = 50, offset: int = 0):
+    """
+    Async variant of search_flights on the async engine (same query, run through AsyncSession.run_sync).
+    Pricing runs in the threadpool: fare curves and seat maps may load through their own sync sessions.
+    """
+    key = (origin, destination, date_from, date_to, limit, offset, demand_window())
+    results = search_cache.get(key)
+    if results is not None:
         return results
+    async with get_async_read_session() as session:
+        rows = await session.run_sync(_search_flights_tx, origin, destination, date_from, date_to, limit, offset)
+    results = await run_in_threadpool(_search_results, rows)
+    search_cache.put(key, results, [r["flight_id"] for r in results])
+    return results
+
+def _search_flights_tx(session, origin, destination, date_from, date_to, limit, offset):
+    q = SEARCH_SQL
+    params = {}
+    if origin:
+        q += " AND r.origin_airport_code = :origin"
+        params['origin'] = origin
+    if destination:
+        q += " AND r.destination_airport_code = :destination"
+        params['destination'] = destination
+    if date_from:
+        q += " AND f.departure_time >= :date_from"
+        params['date_from'] = date_from
+    if date_to:
+        q += " AND f.departure_time < :date_to"
+        params['date_to'] = date_to + timedelta(days=1)
+    q += " ORDER BY f.departure_time, f.flight_id LIMIT :limit OFFSET :offset"
+    params['limit'] = limit
+    params['offset'] = offset
+
+    return session.execute(text(q), params).fetchall()
+
+def _search_results(rows):
+    """Price the SEARCH_SQL rows; after the search session is done, as fare curves and seat maps may load on their own."""
+    booked = [int(r.current_occupancy or 0) for r in rows]
+    capacities = [r.total_capacity for r in rows]
+    fares = calculate_dynamic_fares(
+        [float(r.base_price) for r in rows],
+        capacities,
+        booked,
+        [to_utc_naive(r.departure_time) for r in rows],
+        [demand_level_for(r.flight_id) for r in rows],
+        seat_mults=fare_curves.seat_multipliers([r.flight_id for r in rows], booked, capacities),
+    )
+    by_class = seat_maps.availability([r.flight_id for r in rows])
+    results = []
+    for r, occ, fare in zip(rows, booked, fares.tolist()):
+        departure = r.departure_time.isoformat() if hasattr(r.departure_time, "isoformat") else str(r.departure_time)
+        results.append({
+            "flight_id": r.flight_id,
+            "flight_number": r.flight_number,
+            "origin": r.origin_airport_code,
+            "destination": r.destination_airport_code,
+            "departure": departure,
+            "base_price": float(r.base_price),
+            "available_seats": max(0, r.total_capacity - occ),
+            "class_availability": by_class[r.flight_id],
+            "dynamic_fare": fare
+        })
+    return results
+
+BOOKING_FLIGHT_SQL = """
+SELECT f.flight_id, f.flight_number, f.base_price, f.current_occupancy, f.departure_time, f.status,
+       COALESCE(a.total_capacity, 150) AS total_capacity,
+       r.origin_airport_code, r.destination_airport_code
+FROM Flight f
+LEFT JOIN Aircraft a ON a.aircraft_id = f.aircraft_id
+LEFT JOIN Route r ON r.route_id = f.route_id
+"""
+
+def _check_bookable(row):
+    """Raise ValueError unless `row` (a BOOKING_FLIGHT_SQL row or None) can still be sold."""
+    if not row:
+        raise ValueError("Flight not found")
+    if row.status == "cancelled":
+        raise ValueError("Flight is cancelled")
+
+def _flight_summary(row):
+    return {"flight_number": row.flight_number, "origin": row.origin_airport_code,
+            "destination": row.destination_airport_code, "departure": row.departure_time}
+
+# Compare-and-set on the occupancy we priced against; the capacity check makes overselling impossible
+# even if two transactions race past the read
+CLAIM_SEATS_SQL = """
+UPDATE Flight SET current_occupancy = current_occupancy + :n
+WHERE flight_id = :fid AND current_occupancy = :expected AND current_occupancy + :n <= :capacity AND status <> 'cancelled'
+"""
+
+MAX_BOOKING_ATTEMPTS = 8
+BOOKING_BACKOFF_SECONDS = 0.005
+
+class BookingConflict(Exception):
+    """The flight row changed (or was locked) under us; the booking can be retried."""
+
+def _is_retryable(exc) -> bool:
+    if isinstance(exc, BookingConflict):
+        return True
+    # SQLite reports writer contention as "database is locked" (SQLITE_BUSY)
+    return isinstance(exc, OperationalError) and "locked" in str(exc).lower()
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, BOOKING_BACKOFF_SECONDS * (2 ** attempt))
+
+# Booking rules, shared by the DB paths and the offline market simulation (backend/market_sim.py)
+def check_availability(total_seats: int, booked: int, seats_req: int):
+    if seats_req > (total_seats - booked):
+        raise ValueError(f"Only {total_seats - booked} seats available")
+
+def payment_succeeds(booking_req, rng=random) -> bool:
+    if not booking_req.get("simulate_payment", True):
+        return True
+    return rng.random() < booking_req.get("payment_success_rate", 0.95)
+
+def _assign_seats(flight_id, booking_req, taken_ids=()):
+    """One (seat_id, seat_number) or None per passenger, from the flight's in-memory seat map."""
+    return seat_maps.pick_seats(flight_id, booking_req['passengers'], booking_req.get('seat_class'), taken_ids)
+
+def _claim_seats(session, flight_id, seat_ids):
+    if not claim_seat_rows(session, flight_id, seat_ids):
+        seat_maps.invalidate(flight_id)  # our copy was stale; the retry picks from a fresh one
+        raise BookingConflict(f"Seats on flight {flight_id} were taken during booking")
+
+def _first_seat_id(seats):
+    # Booking has a single (unique) seat_id; the rest of the party's seats live on the passengers rows
+    return next((s[0] for s in seats if s), None)
+
+def _with_seat_numbers(passengers, seats):
+    return [dict(p, seat=s[1]) if s else p for p, s in zip(passengers, seats)]
+
+def _preload(flight_ids):
+    """
+    Load what a booking transaction reads through its own sessions (seat maps, fare curves) before the
+    transaction checks out a connection: with a bounded pool, transactions holding one connection while
+    waiting for a second could otherwise use up the pool and wait on each other.
+    """
+    seat_maps.availability(flight_ids)
+    fare_curves.ensure_loaded()
+
+def _with_retry(tx_fn, *args, preload=None):
+    """
+    Run tx_fn(session, *args) in a fresh session, retrying lost races with backoff.
+    preload: flight ids to _preload before each attempt (a lost seat race drops the flight's seat map).
+    """
+    for attempt in range(MAX_BOOKING_ATTEMPTS):
+        if preload:
+            _preload(preload)
+        session = get_session()
+        try:
+            return tx_fn(session, *args)
+        except Exception as e:
+            if not _is_retryable(e) or attempt == MAX_BOOKING_ATTEMPTS - 1:
+                raise
+        finally:
+            session.close()
+        time.sleep(_backoff(attempt))
+
+async def _with_retry_async(tx_fn, *args, preload=None):
+    """
+    _with_retry on the async engine; the same transaction body runs through AsyncSession.run_sync.
+    That runs on the event loop, so _preload runs in the threadpool before each attempt.
+    """
+    for attempt in range(MAX_BOOKING_ATTEMPTS):
+        if preload:
+            await run_in_threadpool(_preload, preload)
+        try:
+            async with get_async_session() as session:
+                return await session.run_sync(tx_fn, *args)
+        except Exception as e:
+            if not _is_retryable(e) or attempt == MAX_BOOKING_ATTEMPTS - 1:
+                raise
+        await asyncio.sleep(_backoff(attempt))
+
+def _booking_fare(row, booked: int, demand_level: str) -> float:
+    """Fare per seat for a booking on `row` (a BOOKING_FLIGHT_SQL row) at `booked` occupancy."""
+    return calculate_dynamic_fare(float(row.base_price), row.total_capacity, booked, to_utc_naive(row.departure_time), demand_level,
+                                  seat_mult=fare_curves.seat_multiplier(row.flight_id, booked, row.total_capacity))
+
+def hold_fare(flight_id: int, seats: int):
+    """Quote the fare book_multi would charge now and return a signed, short-lived fare hold for it."""
+    session = get_session()
+    try:
+        row = session.execute(text(BOOKING_FLIGHT_SQL + " WHERE f.flight_id = :fid"), {"fid": flight_id}).fetchone()
     finally:
         session.close()
+    _check_bookable(row)
+    booked = int(row.current_occupancy or 0)
+    check_availability(row.total_capacity, booked, seats)
+    return fare_hold.issue(flight_id, seats, _booking_fare(row, booked, demand_level_for(flight_id)))
+
+def _verify_fare_hold(booking_req):
+    """booking_req with fare_hold set to the verified hold of its fare_hold_token (if any); claimed by _book_multi_tx."""
+    token = booking_req.get("fare_hold_token")
+    if not token:
+        return booking_req
+    return dict(booking_req, fare_hold=fare_hold.verify(token, booking_req['flight_id'], len(booking_req['passengers'])))
 
 def book_multi(booking_req):
     """
     booking_req: dict with flight_id,int passengers:list(dict), simulate_payment,bool, payment_success_rate
-    Uses a database transaction and SELECT FOR UPDATE on Flight row to avoid race conditions.
+    Seats are claimed with a conditional UPDATE (occupancy compare-and-set + capacity check); on a
+    lost race the whole transaction is retried with backoff, up to MAX_BOOKING_ATTEMPTS times.
+    On Postgres the flight row is additionally locked with SELECT ... FOR UPDATE.
+    Flights with a seat map get real seats (see _assign_seats); booking_req may carry seat_class.
+    With a fare_hold_token (see backend/fare_hold.py) the held fare per seat is charged; the token
+    is used up by a confirmed booking and can be retried after a failed one.
+    """
+    booking_req = _verify_fare_hold(booking_req)
+    # the PNR is reserved before the transaction: refilling the PNR block writes PnrBlock on its own connection,
+    # which must neither wait on the write lock the transaction takes (SQLite has a single writer) nor on the pool
+    result = _with_retry(_book_multi_tx, booking_req, gen_pnr(), preload=[booking_req['flight_id']])
+    seat_maps.mark_booked(booking_req['flight_id'], result["seats"])
+    booking_cache.put(result["pnr"], result["view"], [booking_req['flight_id']])
+    notify_occupancy_changed([booking_req['flight_id']])
+    receipts.prerender(result["pnr"], result["receipt"])
+    return result
+
+async def book_multi_async(booking_req):
+    """Async variant of book_multi."""
+    booking_req = _verify_fare_hold(booking_req)
+    pnr = await run_in_threadpool(gen_pnr)
+    result = await _with_retry_async(_book_multi_tx, booking_req, pnr, preload=[booking_req['flight_id']])
+    seat_maps.mark_booked(booking_req['flight_id'], result["seats"])
+    booking_cache.put(result["pnr"], result["view"], [booking_req['flight_id']])
+    notify_occupancy_changed([booking_req['flight_id']])
+    receipts.prerender(result["pnr"], result["receipt"])
+    return result
+
+def _book_multi_tx(session, booking_req, pnr):
+    # Open transaction
+    with session.begin():
+        q = BOOKING_FLIGHT_SQL + " WHERE f.flight_id = :fid"
+        if session.get_bind().dialect.name == "postgresql":
+            # Row lock so concurrent bookings queue instead of failing the compare-and-set
+            q += " FOR UPDATE OF f"
+        row = session.execute(text(q), {"fid": booking_req['flight_id']}).fetchone()
+        _check_bookable(row)
+
+        # compute seating
+        total_seats = row.total_capacity
+        booked = int(row.current_occupancy or 0)
+
+        seats_req = len(booking_req['passengers'])
+        check_availability(total_seats, booked, seats_req)
+        seats = _assign_seats(row.flight_id, booking_req)
+
+        # compute fare (use same demand for all seats), unless a fare hold fixed it
+        hold = booking_req.get("fare_hold")
+        if hold is not None:
+            fare_hold.claim(session, hold, pnr)
+            fare_per_seat = hold["p"]
+        else:
+            fare_per_seat = _booking_fare(row, booked, booking_req.get("demand_level") or demand_level_for(row.flight_id))
+        total_price = round(fare_per_seat * seats_req, 2)
+
+        # simulate payment
+        if not payment_succeeds(booking_req):
+            raise RuntimeError("Payment failed (simulated)")
+
+        # claim the seats, then insert booking & passengers & receipt
+        claimed = session.execute(text(CLAIM_SEATS_SQL), {"n": seats_req, "fid": row.flight_id, "expected": row.current_occupancy, "capacity": total_seats})
+        if claimed.rowcount != 1:
+            raise BookingConflict(f"Flight {row.flight_id} changed during booking")
+        _claim_seats(session, row.flight_id, [s[0] for s in seats if s])
+
+        now = datetime.utcnow().isoformat()
+        # Insert booking; the id comes back from RETURNING (or the cursor's lastrowid)
+        booking_params = {"pnr": pnr, "fid": booking_req['flight_id'], "seat_id": _first_seat_id(seats), "price": total_price,
+                          "pname": booking_req['passengers'][0]['name'] if booking_req['passengers'] else "N/A", "bt": now, "seats": seats_req}
+        passengers = _with_seat_numbers(booking_req['passengers'], seats)
+        booking_id = _insert_booking(session, booking_params)
+
+        # Optional tables (see DB/db_schema.sql); detected once, not probed per booking
+        caps = table_capabilities or detect_table_capabilities(session.connection())
+
+        if caps["passengers"] and passengers:
+            session.execute(text("INSERT INTO passengers (booking_id, name, age, passport, seat) VALUES (:bid, :name, :age, :passport, :seat)"),
+                            [{"bid": booking_id, "name": p.get('name'), "age": p.get('age'), "passport": p.get('passport'), "seat": p.get('seat')}
+                             for p in passengers])
+
+        payload = {
+            "pnr": pnr,
+            "flight_id": booking_req['flight_id'],
+            "seats": seats_req,
+            "passengers": passengers,
+            "total_price": total_price,
+            "booking_time": now
+        }
+        if caps["receipts"]:
+            session.execute(text("INSERT INTO receipts (booking_id, payload_json, created_at) VALUES (:bid, :payload, :ca)"),
+                            {"bid": booking_id, "payload": json.dumps(payload), "ca": now})
+
+        # read model for /booking/{pnr}, committed with the booking
+        view = booking_document({"booking_id": booking_id, "pnr_code": pnr, "flight_id": row.flight_id, "seat_id": booking_params["seat_id"],
+                                 "total_fare_paid": total_price, "passenger_name": booking_params["pname"], "booking_time": now,
+                                 "status": "confirmed", "seat_count": seats_req},
+                                _flight_summary(row), passengers, payload)
+        write_views(session, [view_row(view, now)])
+
+        return {"pnr": pnr, "total_price": total_price, "seats": [s[1] for s in seats if s], "receipt": payload, "view": view}
+
+def book_batch(booking_reqs):
+    """
+    Place many bookings (possibly across several flights) in one transaction.
+    booking_reqs: list of book_multi-style dicts. Requests are grouped by flight: each flight is read
+    once, priced once (all its seats in this batch at the pre-batch fare) and its occupancy claimed
+    with a single conditional UPDATE; bookings, passengers and receipts are written with executemany.
+    Returns one result per request, in order: {"index", "status": "confirmed"|"failed", "pnr", "total_price", "error"}.
+    """
+    # as in book_multi: one PNR per request (unused ones are skipped), reserved before the transaction
+    pnrs = [gen_pnr() for _ in booking_reqs]
+    results = _with_retry(_book_batch_tx, booking_reqs, pnrs, preload=sorted({r['flight_id'] for r in booking_reqs}))
+    _after_batch_commit(results)
+    return results
+
+async def book_batch_async(booking_reqs):
+    """Async variant of book_batch."""
+    pnrs = await run_in_threadpool(lambda: [gen_pnr() for _ in booking_reqs])
+    results = await _with_retry_async(_book_batch_tx, booking_reqs, pnrs, preload=sorted({r['flight_id'] for r in booking_reqs}))
+    _after_batch_commit(results)
+    return results
+
+def _after_batch_commit(results):
+    for r in results:
+        if r["seats"]:
+            seat_maps.mark_booked(r["flight_id"], r["seats"])
+    notify_occupancy_changed({r["flight_id"] for r in results if r["status"] == "confirmed"})
+    for r in results:
+        if "view" in r:
+            booking_cache.put(r["pnr"], r.pop("view"), [r["flight_id"]])
+        if "receipt" in r:
+            receipts.prerender(r["pnr"], r.pop("receipt"))
+
+def _book_batch_tx(session, booking_reqs, pnrs):
+    by_flight = {}
+    for i, req in enumerate(booking_reqs):
+        by_flight.setdefault(req['flight_id'], []).append(i)
+    results = [{"index": i, "flight_id": req['flight_id'], "status": "failed", "pnr": None, "total_price": None, "seats": [], "error": None}
+               for i, req in enumerate(booking_reqs)]
+
+    spare_pnrs = list(pnrs)  # a retried attempt starts from the full list again
+
+    with session.begin():
+        q = BOOKING_FLIGHT_SQL + " WHERE f.flight_id IN :fids ORDER BY f.flight_id"
+        if session.get_bind().dialect.name == "postgresql":
+            q += " FOR UPDATE OF f"
+        q = text(q).bindparams(bindparam("fids", expanding=True))
+        flights = session.execute(q, {"fids": sorted(by_flight)}).fetchall()
+
+        # one fare computation for every flight in the batch
+        booked = [int(f.current_occupancy or 0) for f in flights]
+        capacities = [f.total_capacity for f in flights]
+        fares = calculate_dynamic_fares(
+            [float(f.base_price) for f in flights], capacities, booked,
+            [to_utc_naive(f.departure_time) for f in flights],
+            [demand_level_for(f.flight_id) for f in flights],
+            seat_mults=fare_curves.seat_multipliers([f.flight_id for f in flights], booked, capacities),
+        ).tolist()
+
+        claims, bookings, accepted = [], [], []
+        pnrs, seats_by_req, seat_claims = [], {}, {}
+        now = datetime.utcnow().isoformat()
+        for flight, occ, fare_per_seat in zip(flights, booked, fares):
+            seats_taken = 0
+            seat_ids = []
+            for i in by_flight[flight.flight_id]:
+                req = booking_reqs[i]
+                seats_req = len(req['passengers'])
+                try:
+                    _check_bookable(flight)
+                    check_availability(flight.total_capacity, occ + seats_taken, seats_req)
+                except ValueError as ve:
+                    results[i]["error"] = str(ve)
+                    continue
+                try:
+                    seats = _assign_seats(flight.flight_id, req, seat_ids)
+                except ValueError as ve:
+                    results[i]["error"] = str(ve)
+                    continue
+                if not payment_succeeds(req):
+                    results[i]["error"] = "Payment failed (simulated)"
+                    continue
+                pnr = spare_pnrs.pop()
+                pnrs.append(pnr)
+                total_price = round(fare_per_seat * seats_req, 2)
+                seats_taken += seats_req
+                seat_ids.extend(s[0] for s in seats if s)
+                seats_by_req[i] = seats
+                results[i].update(status="confirmed", pnr=pnr, total_price=total_price, seats=[s[1] for s in seats if s])
+                bookings.append({"pnr": pnr, "fid": flight.flight_id, "seat_id": _first_seat_id(seats), "price": total_price,
+                                 "pname": req['passengers'][0]['name'] if req['passengers'] else "N/A", "bt": now, "seats": seats_req})
+                accepted.append(i)
+            if seats_taken:
+                claims.append({"n": seats_taken, "fid": flight.flight_id, "expected": flight.current_occupancy, "capacity": flight.total_capacity})
+                seat_claims[flight.flight_id] = seat_ids
+
+        for res in results:
+            if res["status"] == "failed" and res["error"] is None:
+                res["error"] = "Flight not found"
+        if not accepted:
+            return results
+
+        # one conditional UPDATE per flight (not executemany: multi-row rowcounts aren't reliable on every driver)
+        for claim in claims:
+            if session.execute(text(CLAIM_SEATS_SQL), claim).rowcount != 1:
+                raise BookingConflict(f"Flight {claim['fid']} changed during booking")
+        # one guarded Seat UPDATE per flight covers every seat assigned in the batch
+        for fid, seat_ids in seat_claims.items():
+            _claim_seats(session, fid, seat_ids)
+
+        session.execute(text(INSERT_BOOKING_SQL), bookings)
+        ids = session.execute(
+            text("SELECT booking_id, pnr_code FROM Booking WHERE pnr_code IN :pnrs").bindparams(bindparam("pnrs", expanding=True)),
+            {"pnrs": pnrs}).fetchall()
+        booking_ids = {r.pnr_code: r.booking_id for r in ids}
+
+        caps = table_capabilities or detect_table_capabilities(session.connection())
+        if caps["passengers"]:
+            rows = [{"bid": booking_ids[results[i]["pnr"]], "name": p.get('name'), "age": p.get('age'), "passport": p.get('passport'), "seat": p.get('seat')}
+                    for i in accepted for p in _with_seat_numbers(booking_reqs[i]['passengers'], seats_by_req[i])]
+            if rows:
+                session.execute(text("INSERT INTO passengers (booking_id, name, age, passport, seat) VALUES (:bid, :name, :age, :passport, :seat)"), rows)
+        for i in accepted:
+            req, res = booking_reqs[i], results[i]
+            res["receipt"] = {"pnr": res["pnr"], "flight_id": req['flight_id'], "seats": len(req['passengers']),
+                              "passengers": _with_seat_numbers(req['passengers'], seats_by_req[i]), "total_price": res["total_price"], "booking_time": now}
+        if caps["receipts"]:
+            rows = [{"bid": booking_ids[results[i]["pnr"]], "payload": json.dumps(results[i]["receipt"]), "ca": now} for i in accepted]
+            session.execute(text("INSERT INTO receipts (booking_id, payload_json, created_at) VALUES (:bid, :payload, :ca)"), rows)
+
+        flights_by_id = {f.flight_id: f for f in flights}
+        for i, booking in zip(accepted, bookings):
+            res = results[i]
+            res["view"] = booking_document({"booking_id": booking_ids[res["pnr"]], "pnr_code": res["pnr"], "flight_id": res["flight_id"],
+                                            "seat_id": booking["seat_id"], "total_fare_paid": res["total_price"],
+                                            "passenger_name": booking["pname"], "booking_time": now,
+                                            "status": "confirmed", "seat_count": booking["seats"]},
+                                           _flight_summary(flights_by_id[res["flight_id"]]), res["receipt"]["passengers"], res["receipt"])
+        write_views(session, [view_row(results[i]["view"], now) for i in accepted])
+
+    return results
+
+INSERT_BOOKING_SQL = ("INSERT INTO Booking (pnr_code, flight_id, seat_id, total_fare_paid, passenger_name, booking_time, seat_count) "
+                      "VALUES (:pnr, :fid, :seat_id, :price, :pname, :bt, :seats)")
+
+def _insert_booking(session, params) -> int:
+    if session.get_bind().dialect.insert_returning:
+        return session.execute(text(INSERT_BOOKING_SQL + " RETURNING booking_id"), params).scalar_one()
+    return session.execute(text(INSERT_BOOKING_SQL), params).lastrowid
+
+def get_booking(pnr: str):
+    """
+    Booking read model for a PNR (see backend/booking_view.py): {"booking", "flight", "passengers", "receipt"},
+    or None. Served from booking_cache (written through by the booking paths), else one primary-key read.
+    """
+    doc = booking_cache.get(pnr)
+    if doc is None:
+        session = get_session()
+        try:
+            doc = _booking_view_tx(session, pnr)
+        finally:
+            session.close()
+        if doc is not None:
+            booking_cache.put(pnr, doc, [doc["booking"]["flight_id"]])
+    return doc
+
+async def get_booking_async(pnr: str):
+    """Async variant of get_booking."""
+    doc = booking_cache.get(pnr)
+    if doc is None:
+        async with get_async_session() as session:
+            doc = await session.run_sync(_booking_view_tx, pnr)
+        if doc is not None:
+            booking_cache.put(pnr, doc, [doc["booking"]["flight_id"]])
+    return doc
+
+def _booking_view_tx(session, pnr):
+    doc = read_view(session, pnr)
+    if doc is None:
+        # written by a process that predates the read model and not yet backfilled by init_db
+        caps = table_capabilities or detect_table_capabilities(session.connection())
+        docs = build_documents(session.connection(), [pnr], caps)
+        doc = docs[0] if docs else None
+    return doc
+
+def receipt_payload(pnr: str):
+    """Receipt payload for a PNR, from the booking read model (None if there is none)."""
+    doc = get_booking(pnr)
+    return doc["receipt"] if doc else None
+
+def notify_occupancy_changed(flight_ids):
+    """
+    Called after a committed change to Flight.current_occupancy (bookings, demand simulator)
+    so cached fares for those flights are dropped, the route graph re-reads them and open fare
+    streams get the new fares.
+    """
+    search_cache.invalidate_flights(flight_ids)
+    route_graph.mark_dirty(flight_ids)
+    fare_publisher.notify(flight_ids)
+
+def set_price_factors(flight_id: int, breakpoints):
+    """
+    Replace a flight's PriceFactor curve. breakpoints: list of (seats_booked_percent, fare_multiplier);
+    an empty list reverts the flight to the built-in seat tiers.
     """
     session = get_session()
     try:
-        # Open transaction
         with session.begin():
-            # Lock the flight row
-            row = session.execute(text("SELECT flight_id, base_price, current_occupancy, route_id, aircraft_id FROM Flight WHERE flight_id = :fid FOR UPDATE"), {"fid": booking_req['flight_id']}).fetchone()
-            if not row:
-                raise ValueError("Flight not found")
-
-            # compute seating
-            cap_row = session.execute(text("SELECT total_capacity FROM Aircraft WHERE aircraft_id = :aid"), {"aid": row.aircraft_id}).fetchone()
-            total_seats = cap_row.total_capacity if cap_row else 150
-            booked = int(row.current_occupancy or 0)
-
-            seats_req = len(booking_req['passengers'])
-            if seats_req > (total_seats - booked):
-                raise ValueError(f"Only {total_seats - booked} seats available")
-
-            # compute fare (use same demand for all seats)
-            demand = booking_req.get("demand_level", random.choice(["low","medium","high"]))
-            fare_per_seat = calculate_dynamic_fare(float(row.base_price), total_seats, booked, row.departure_time if hasattr(row, 'departure_time') else datetime.utcnow(), demand)
-            total_price = round(fare_per_seat * seats_req, 2)
-
-            # simulate payment
-            if booking_req.get("simulate_payment", True):
-                import random as _random
-                if _random.random() >= booking_req.get("payment_success_rate", 0.95):
-                    raise RuntimeError("Payment failed (simulated)")
-
-            # update occupancy and insert booking & passengers & receipt
-            new_occupancy = booked + seats_req
-            session.execute(text("UPDATE Flight SET current_occupancy = :occ WHERE flight_id = :fid"), {"occ": new_occupancy, "fid": booking_req['flight_id']})
-
-            pnr = gen_pnr()
-            now = datetime.utcnow().isoformat()
-            # Insert booking
-            session.execute(text(
-                "INSERT INTO Booking (pnr_code, flight_id, seat_id, total_fare_paid, passenger_name, booking_time) VALUES (:pnr, :fid, NULL, :price, :pname, :bt)"
-            ), {"pnr": pnr, "fid": booking_req['flight_id'], "price": total_price, "pname": booking_req['passengers'][0]['name'] if booking_req['passengers'] else "N/A", "bt": now})
-
-            # Get booking_id (Postgres returns via currval if serial) - fetch latest row
-            booking_row = session.execute(text("SELECT booking_id FROM Booking WHERE pnr_code = :pnr"), {"pnr": pnr}).fetchone()
-            booking_id = booking_row.booking_id
-
-            # Insert passenger rows into passengers table (we reuse passenger table name 'passengers' if exists; adapt to your SQL)
-            # The provided schema uses a separate passengers table in earlier snippets — if not present, skip.
-            # We'll insert into 'passengers' table if it exists
-            try:
-                session.execute(text("SELECT 1 FROM passengers LIMIT 1"))
-                has_passengers_table = True
-            except Exception:
-                has_passengers_table = False
-
-            if has_passengers_table:
-                for p in booking_req['passengers']:
-                    session.execute(text("INSERT INTO passengers (booking_id, name, age, passport, seat) VALUES (:bid, :name, :age, :passport, :seat)"),
-                                    {"bid": booking_id, "name": p.get('name'), "age": p.get('age'), "passport": p.get('passport'), "seat": p.get('seat')})
-
-            # Insert into receipts if table exists
-            try:
-                session.execute(text("SELECT 1 FROM receipts LIMIT 1"))
-                has_receipts_table = True
-            except Exception:
-                has_receipts_table = False
-
-            if has_receipts_table:
-                payload = {
-                    "pnr": pnr,
-                    "flight_id": booking_req['flight_id'],
-                    "seats": seats_req,
-                    "passengers": booking_req['passengers'],
-                    "total_price": total_price,
-                    "booking_time": now
-                }
-                session.execute(text("INSERT INTO receipts (booking_id, payload_json, created_at) VALUES (:bid, :payload, :ca)"),
-                                {"bid": booking_id, "payload": json.dumps(payload), "ca": now})
-
-            return {"pnr": pnr, "total_price": total_price}
+            session.execute(text("DELETE FROM PriceFactor WHERE flight_id = :fid"), {"fid": flight_id})
+            if breakpoints:
+                session.execute(text("INSERT INTO PriceFactor (flight_id, seats_booked_percent, fare_multiplier) VALUES (:fid, :pct, :mult)"),
+                                [{"fid": flight_id, "pct": pct, "mult": mult} for pct, mult in breakpoints])
+        fare_curves.invalidate(flight_id)
+        search_cache.invalidate_flights([flight_id])
+        route_graph.mark_dirty([flight_id])
     finally:
         session.close()
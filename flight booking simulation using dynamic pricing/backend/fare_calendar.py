@@ -0,0 +1,156 @@
+# backend/fare_calendar.py
+import heapq, threading
+from datetime import date, datetime
+
+import numpy as np
+
+from backend.pricing_engine import demand_window, next_tier_change
+from backend.route_graph import route_graph
+
+MAX_CALENDAR_DAYS = 120
+
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+class _RouteCalendar:
+    """
+    The (date -> cheapest fare) cells of one route, over one route graph snapshot and one demand
+    window. Fares are kept per flight so a change re-aggregates only the days it touches, and
+    `boundaries` is a heap of (next time-tier change in unix microseconds, position) so a flight is
+    re-priced only when its days-to-departure multiplier actually changes.
+    """
+
+    def __init__(self, schedule, rows):
+        self.window = demand_window()
+        self.rows = rows
+        self.pos = {int(r): i for i, r in enumerate(rows)}
+        self.departure_ts = schedule.departure_ts[rows]
+        self.day = self.departure_ts.astype("datetime64[D]").astype(np.int64)  # rows are in departure order
+        self.fares = schedule.price(rows)
+        self.cells = {}
+        for day in np.unique(self.day).tolist():
+            self._aggregate(schedule, day)
+        changes = next_tier_change(self.departure_ts)
+        self.boundaries = [(int(t), i) for i, t in enumerate(changes.astype(np.int64).tolist()) if not np.isnat(changes[i])]
+        heapq.heapify(self.boundaries)
+
+    def _aggregate(self, schedule, day: int):
+        lo, hi = np.searchsorted(self.day, [day, day + 1]).tolist()
+        best, seats, flights = None, 0, 0
+        for i in range(lo, hi):
+            if self.rows[i] in schedule.cancelled:
+                continue
+            flights += 1
+            free = schedule.free[self.rows[i]]
+            seats += free
+            if free > 0 and (best is None or self.fares[i] < self.fares[best]):
+                best = i
+        self.cells[day] = (None if best is None else int(self.rows[best]), seats, flights)
+
+    def update(self, schedule, positions):
+        """Re-price the flights at `positions` and re-aggregate their days."""
+        positions = sorted(set(positions))
+        for i, fare in zip(positions, schedule.price(self.rows[positions]).tolist()):
+            self.fares[i] = fare
+        for day in {int(self.day[i]) for i in positions}:
+            self._aggregate(schedule, day)
+
+    def expire(self, schedule):
+        """Re-price the flights whose time tier changed since they were last priced."""
+        now = datetime.utcnow()
+        now_us = int(np.datetime64(now, "us").astype(np.int64))
+        crossed = []
+        while self.boundaries and self.boundaries[0][0] < now_us:
+            crossed.append(heapq.heappop(self.boundaries)[1])
+        if crossed:
+            changes = next_tier_change(self.departure_ts[crossed], now)
+            for i, t in zip(crossed, changes):
+                if not np.isnat(t):
+                    heapq.heappush(self.boundaries, (int(t.astype(np.int64)), i))
+            self.update(schedule, crossed)
+        return len(crossed)
+
+    def cell(self, schedule, day: int):
+        row, seats, flights = self.cells.get(day, (None, 0, 0))
+        return {"date": date.fromordinal(day + _EPOCH_DAY).isoformat(),
+                "min_fare": None if row is None else float(self.fares[self.pos[row]]),
+                "flight_id": None if row is None else schedule.ids[row],
+                "flight_number": None if row is None else schedule.numbers[row],
+                "available_seats": seats, "flights": flights}
+
+class _RouteEntry:
+    """One route's calendar (None until first built) and the lock its build and updates run under."""
+
+    def __init__(self):
+        self.calendar = None
+        self.lock = threading.Lock()
+
+class FareCalendar:
+    """
+    Flexible-date fares: per (route, departure date) the cheapest fare with a free seat, the
+    seats left that day and the number of flights, served from cells kept in memory on top of the
+    route graph snapshot (backend/route_graph.py).
+    A route's cells are built on first request in each demand window (the demand levels change
+    for every flight then, so there is nothing to carry over). Within a window they are updated
+    incrementally: flights the route graph re-reads after an occupancy change, and flights whose
+    days-to-departure tier boundary has passed, are re-priced and only their days re-aggregated.
+    The shared lock only guards the route table and the pending changes; a route is built, updated
+    and read under its own lock, so a cold route does not hold up requests for the others.
+    """
+
+    def __init__(self):
+        self._schedule = None
+        self._routes = {}  # (origin index, destination index) -> _RouteEntry
+        self._changed = {}  # route key -> rows re-read by the route graph, not yet applied
+        self._lock = threading.Lock()
+        self.builds = self.updates = self.tier_changes = 0
+
+    def flights_changed(self, schedule, rows):
+        """route_graph listener: occupancy (and so fares) of these rows changed."""
+        with self._lock:
+            if schedule is self._schedule:
+                for row in rows:
+                    key = (schedule.origin[row], schedule.dest[row])
+                    if key in self._routes:
+                        self._changed.setdefault(key, set()).add(row)
+
+    def route(self, origin: str, destination: str, date_from: date, days: int):
+        """Cells for `days` consecutive departure dates (UTC) from date_from."""
+        schedule = route_graph.snapshot(fares=False)
+        key = (schedule.index.get(origin), schedule.index.get(destination))
+        with self._lock:
+            if schedule is not self._schedule:
+                self._schedule, self._routes, self._changed = schedule, {}, {}
+            entry = self._routes.get(key)
+            if entry is None:
+                entry = _RouteEntry()
+                if None not in key:
+                    self._routes[key] = entry
+        with entry.lock:
+            # taken before a build too: the build reads every change reported so far
+            with self._lock:
+                changed = self._changed.pop(key, ()) if schedule is self._schedule else ()
+            cal = entry.calendar
+            if cal is None or cal.window != demand_window():
+                cal = entry.calendar = _RouteCalendar(schedule, schedule.route_rows(origin, destination))
+                if None not in key:
+                    self.builds += 1
+            else:
+                if changed:
+                    cal.update(schedule, [cal.pos[row] for row in changed])
+                    self.updates += len(changed)
+                self.tier_changes += cal.expire(schedule)
+            first = date_from.toordinal() - _EPOCH_DAY
+            return [cal.cell(schedule, day) for day in range(first, first + days)]
+
+    def stats(self):
+        return {"routes": len(self._routes), "builds": self.builds, "flight_updates": self.updates,
+                "tier_changes": self.tier_changes}
+
+fare_calendar = FareCalendar()
+route_graph.subscribe(fare_calendar.flights_changed)
+
+def fare_calendar_for(origin: str, destination: str, date_from: date = None, days: int = 60):
+    """Cheapest fare per departure date on origin -> destination for the next `days` days."""
+    date_from = date_from or datetime.utcnow().date()
+    return {"origin": origin, "destination": destination, "date_from": date_from.isoformat(),
+            "days": fare_calendar.route(origin, destination, date_from, days)}
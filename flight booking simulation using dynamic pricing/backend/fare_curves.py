@@ -0,0 +1,106 @@
+# backend/fare_curves.py
+import threading, time
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+from sqlalchemy import bindparam, text
+
+from backend.db_config import get_session
+
+PRICE_FACTOR_SQL = "SELECT flight_id, seats_booked_percent, fare_multiplier FROM PriceFactor"
+
+def curve_multiplier(curve, booked_seats: int, total_seats: int):
+    """Step lookup on a (percents, multipliers) curve; None when there is no curve or no breakpoint applies."""
+    if curve is None or total_seats <= 0:
+        return None
+    pcts, mults = curve
+    i = bisect_right(pcts, booked_seats * 100.0 / total_seats)
+    return mults[i - 1] if i else None
+
+class FareCurveCache:
+    """
+    In-memory copy of the PriceFactor table: per flight, a sorted array of seats_booked_percent
+    breakpoints and the matching fare multipliers. The seat multiplier for a flight is the multiplier
+    of the highest breakpoint <= its booked percent (a step curve, looked up with bisect).
+    Flights without rows (or below their first breakpoint) get None, i.e. the built-in seat tiers.
+    """
+
+    def __init__(self, max_age_seconds: float = 300.0):
+        self.max_age_seconds = max_age_seconds  # full reload interval, picks up out-of-band edits
+        self._curves = {}
+        self._stale = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, flight_id: int = None):
+        """Drop one flight's curve (re-read on next use) or, with no flight_id, the whole table."""
+        with self._lock:
+            if flight_id is None:
+                self._loaded_at = None
+            else:
+                self._stale.add(flight_id)
+
+    def _build(self, rows):
+        curves = {}
+        for fid, pct, mult in rows:
+            pcts, mults = curves.setdefault(fid, (array("d"), array("d")))
+            pcts.append(float(pct))
+            mults.append(float(mult))
+        return curves
+
+    def _ensure_loaded(self):
+        expired = self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age_seconds
+        if not expired and not self._stale:
+            return
+        with self._lock:
+            session = get_session()
+            try:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age_seconds:
+                    rows = session.execute(text(PRICE_FACTOR_SQL + " ORDER BY flight_id, seats_booked_percent")).fetchall()
+                    self._curves = self._build(rows)
+                    self._loaded_at = time.monotonic()
+                    self._stale.clear()
+                elif self._stale:
+                    stale = list(self._stale)
+                    q = text(PRICE_FACTOR_SQL + " WHERE flight_id IN :ids ORDER BY flight_id, seats_booked_percent")
+                    rows = session.execute(q.bindparams(bindparam("ids", expanding=True)), {"ids": stale}).fetchall()
+                    curves = self._build(rows)
+                    for fid in stale:
+                        if fid in curves:
+                            self._curves[fid] = curves[fid]
+                        else:
+                            self._curves.pop(fid, None)
+                    self._stale.clear()
+            finally:
+                session.close()
+
+    def ensure_loaded(self):
+        """Load (or refresh) the curves now rather than on first lookup."""
+        self._ensure_loaded()
+
+    def seat_multiplier(self, flight_id: int, booked_seats: int, total_seats: int):
+        """Multiplier from the flight's PriceFactor curve, or None to use the built-in tiers."""
+        self._ensure_loaded()
+        return self._lookup(flight_id, booked_seats, total_seats)
+
+    def _lookup(self, flight_id, booked_seats, total_seats):
+        return curve_multiplier(self._curves.get(flight_id), booked_seats, total_seats)
+
+    def curves(self):
+        """Snapshot of every loaded curve: {flight_id: (percents, multipliers)}."""
+        self._ensure_loaded()
+        return dict(self._curves)
+
+    def seat_multipliers(self, flight_ids, booked_seats, total_seats) -> np.ndarray:
+        """Batch lookup for calculate_dynamic_fares; NaN marks flights that use the built-in tiers."""
+        self._ensure_loaded()
+        out = np.full(len(flight_ids), np.nan)
+        for i, fid in enumerate(flight_ids):
+            if fid in self._curves:
+                mult = self._lookup(fid, booked_seats[i], total_seats[i])
+                if mult is not None:
+                    out[i] = mult
+        return out
+
+fare_curves = FareCurveCache()
@@ -0,0 +1,71 @@
+# backend/fare_hold.py
+# Short-lived fare holds: POST /fare_hold quotes a flight and returns a signed token; a booking that
+# carries the token is charged the quoted fare per seat instead of the fare at booking time.
+# Tokens are HMAC-SHA256 signed (FARE_HOLD_SECRET), so nothing is stored per hold; each token is
+# single use: the booking that redeems it records its nonce in FareHoldClaim in the same transaction.
+# A hold fixes the price only, not the seats.
+import base64, hashlib, hmac, json, os, secrets, time
+
+from sqlalchemy import text
+
+FARE_HOLD_SECONDS = int(os.getenv("FARE_HOLD_SECONDS", "300"))
+# Set FARE_HOLD_SECRET when several API processes serve the same users: the default is per process
+FARE_HOLD_SECRET = (os.getenv("FARE_HOLD_SECRET") or secrets.token_hex(32)).encode()
+
+class FareHoldError(ValueError):
+    """The token is malformed, forged, expired, already used or for another flight."""
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(body: str) -> str:
+    return _b64(hmac.new(FARE_HOLD_SECRET, body.encode(), hashlib.sha256).digest())
+
+def issue(flight_id: int, seats: int, fare_per_seat: float, now: float = None) -> dict:
+    expires = int((now or time.time()) + FARE_HOLD_SECONDS)
+    body = _b64(json.dumps({"f": flight_id, "n": seats, "p": fare_per_seat, "e": expires, "h": secrets.token_hex(8)},
+                           separators=(",", ":")).encode())
+    return {"token": f"{body}.{_sign(body)}", "flight_id": flight_id, "seats": seats, "fare_per_seat": fare_per_seat,
+            "total_price": round(fare_per_seat * seats, 2), "expires_at": expires}
+
+def verify(token: str, flight_id: int, seats: int, now: float = None) -> dict:
+    """The hold's fields ({"f", "n", "p", "e", "h"}) if the token is valid for this booking."""
+    try:
+        body, sig = token.split(".")
+        hold = json.loads(_unb64(body)) if hmac.compare_digest(sig, _sign(body)) else None
+    except (ValueError, TypeError):
+        hold = None
+    if not isinstance(hold, dict):
+        raise FareHoldError("Invalid fare hold")
+    if hold["e"] < (now or time.time()):
+        raise FareHoldError("Fare hold expired")
+    if hold["f"] != flight_id:
+        raise FareHoldError("Fare hold is for another flight")
+    if seats > hold["n"]:
+        raise FareHoldError(f"Fare hold covers {hold['n']} seats")
+    return hold
+
+# Rows past expires_at can be deleted at any time: verify() rejects their tokens anyway
+FARE_HOLD_CLAIM_DDL = """
+CREATE TABLE IF NOT EXISTS FareHoldClaim (
+    nonce VARCHAR(16) PRIMARY KEY,
+    pnr_code CHAR(6) NOT NULL,
+    expires_at BIGINT NOT NULL
+)
+"""
+
+def ensure_claim_table(conn):
+    conn.execute(text(FARE_HOLD_CLAIM_DDL))
+
+def claim(session, hold: dict, pnr: str):
+    """
+    Mark `hold` used by booking `pnr`, inside the booking's transaction: the claim commits or rolls
+    back with the booking, and the primary key makes a token single use across processes and restarts.
+    """
+    claimed = session.execute(text("INSERT INTO FareHoldClaim (nonce, pnr_code, expires_at) VALUES (:h, :pnr, :e) "
+                                   "ON CONFLICT (nonce) DO NOTHING"), {"h": hold["h"], "pnr": pnr, "e": hold["e"]})
+    if claimed.rowcount != 1:
+        raise FareHoldError("Fare hold already used")
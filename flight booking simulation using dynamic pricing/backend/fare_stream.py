@@ -0,0 +1,158 @@
+# backend/fare_stream.py
+# Server-push fare and seat-count updates (GET /stream/fares, server-sent events). One publisher
+# thread prices each changed flight once and fans the result out to every subscriber of that flight;
+# browsers keep one open stream instead of re-running /search.
+import asyncio, threading, time
+
+from backend.metrics import fare_stream_events, fare_stream_subscribers
+from backend.pricing_engine import demand_window
+from backend.route_graph import route_graph
+
+MAX_STREAM_FLIGHTS = 100  # flights per subscription
+RESYNC_SECONDS = 30.0  # every subscribed flight is re-priced this often (demand window, time tiers)
+HEARTBEAT_SECONDS = 15.0
+
+class Subscription:
+    """
+    One open stream. Updates are coalesced per flight (only the latest fare of a flight is kept
+    until the client reads it), so a slow client costs at most one pending entry per flight.
+    offer() runs on the subscription's event loop; next_batch() is awaited by the response.
+    """
+
+    def __init__(self, flight_ids, loop):
+        self.flight_ids = frozenset(flight_ids)
+        self.loop = loop
+        self.closed = False
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, update: dict):
+        self._pending[update["flight_id"]] = update
+        self._ready.set()
+
+    async def next_batch(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch, self._pending = list(self._pending.values()), {}
+        return batch
+
+class FarePublisher:
+    """
+    Fare and seat-count deltas for subscribed flights. notify() (from notify_occupancy_changed) wakes
+    the publisher thread, which lets the route graph re-read the dirty flights; the graph reports them
+    back through its listener, and each one that has subscribers is priced once (the route graph
+    prices exactly like /search) and sent only if its fare or seat count changed since the last send.
+    """
+
+    def __init__(self):
+        self._subs = {}  # flight_id -> set of Subscription
+        self._last = {}  # flight_id -> (fare, seats) last sent
+        self._changed = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="fare-publisher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def subscribe(self, flight_ids, loop) -> Subscription:
+        sub = Subscription(flight_ids, loop)
+        with self._lock:
+            for fid in sub.flight_ids:
+                self._subs.setdefault(fid, set()).add(sub)
+        fare_stream_subscribers.inc()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub.closed:
+                return
+            sub.closed = True
+            for fid in sub.flight_ids:
+                subs = self._subs.get(fid)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[fid]
+                        self._last.pop(fid, None)
+        fare_stream_subscribers.dec()
+
+    def notify(self, flight_ids):
+        """Occupancy of these flights changed (committed); cheap when nobody watches them."""
+        with self._lock:
+            watched = any(fid in self._subs for fid in flight_ids)
+        if watched:
+            self._wake.set()
+
+    def flights_changed(self, schedule, rows):
+        """route_graph listener: these rows were re-read."""
+        with self._lock:
+            self._changed.update(schedule.ids[r] for r in rows if schedule.ids[r] in self._subs)
+
+    def current(self, flight_ids):
+        """Fare and seats now, for the first event of a new stream."""
+        updates = self._price(route_graph.snapshot(fares=False), flight_ids)
+        with self._lock:
+            for u in updates:  # the baseline for deltas, unless other streams already have one
+                self._last.setdefault(u["flight_id"], (u["dynamic_fare"], u["available_seats"]))
+        return updates
+
+    def _price(self, schedule, flight_ids):
+        found = [(fid, schedule.row_of(fid)) for fid in flight_ids]
+        found = [(fid, row) for fid, row in found if row is not None]
+        fares = schedule.price([row for _, row in found]).tolist()
+        return [{"flight_id": fid, "dynamic_fare": fare, "available_seats": schedule.free[row]}
+                for (fid, row), fare in zip(found, fares)]
+
+    def _run(self):
+        last_resync, window = time.monotonic(), demand_window()
+        while not self._stopped:
+            self._wake.wait(RESYNC_SECONDS)
+            self._wake.clear()
+            if self._stopped:
+                break
+            try:
+                schedule = route_graph.snapshot(fares=False)
+                with self._lock:
+                    changed, self._changed = self._changed, set()
+                    if time.monotonic() - last_resync >= RESYNC_SECONDS or demand_window() != window:
+                        changed = set(self._subs)
+                        last_resync, window = time.monotonic(), demand_window()
+                if changed:
+                    self._publish(self._price(schedule, changed))
+            except Exception:
+                # a failed refresh (e.g. the database is briefly unavailable) is retried on the next wake-up
+                time.sleep(1.0)
+
+    def _publish(self, updates):
+        for update in updates:
+            fid = update["flight_id"]
+            with self._lock:
+                key = (update["dynamic_fare"], update["available_seats"])
+                if self._last.get(fid) == key:
+                    continue
+                self._last[fid] = key
+                subs = list(self._subs.get(fid, ()))
+            for sub in subs:
+                try:
+                    sub.loop.call_soon_threadsafe(sub.offer, update)
+                    fare_stream_events.inc(("fare",))
+                except RuntimeError:  # the subscriber's event loop is gone
+                    self.unsubscribe(sub)
+
+fare_publisher = FarePublisher()
+route_graph.subscribe(fare_publisher.flights_changed)
@@ -0,0 +1,219 @@
+# backend/market_sim.py
+# Offline market simulation: replays synthetic passenger demand against the pricing engine on a
+# virtual clock (no HTTP, no DB writes, no wall-clock waits), partitioned by route across a process pool.
+#   python -m backend.market_sim --synthetic 5000 --workers 4
+#   python -m backend.market_sim --from-db --horizon-days 60
+import argparse, heapq, json, math, random, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from backend.crud import check_availability, payment_succeeds
+from backend.fare_curves import curve_multiplier
+from backend.pricing_engine import calculate_dynamic_fare, demand_level_for, demand_window
+
+_EPOCH = datetime(1970, 1, 1)
+
+class MarketConfig:
+    """
+    Demand model for a simulation run.
+    arrivals_per_seat: expected booking requests per seat over the whole booking horizon
+    decay_days:        arrival intensity ~ exp(-days_to_departure / decay_days) (bookings bunch up near departure)
+    wtp_sigma:         log-normal spread of willingness to pay around the base price
+    late_premium:      extra willingness to pay (as a fraction) for requests in the final week
+    """
+
+    def __init__(self, horizon_days: int = 60, arrivals_per_seat: float = 1.6, decay_days: float = 18.0,
+                 wtp_mean: float = 1.15, wtp_sigma: float = 0.25, late_premium: float = 0.35,
+                 party_sizes=(1, 2, 3, 4), party_weights=(0.55, 0.25, 0.12, 0.08), payment_success_rate: float = 0.97):
+        self.horizon_days = horizon_days
+        self.arrivals_per_seat = arrivals_per_seat
+        self.decay_days = decay_days
+        self.wtp_mean = wtp_mean
+        self.wtp_sigma = wtp_sigma
+        self.late_premium = late_premium
+        self.party_sizes = party_sizes
+        self.party_weights = party_weights
+        self.payment_success_rate = payment_success_rate
+
+def _intensity_by_day(cfg: MarketConfig) -> np.ndarray:
+    """Share of a flight's arrivals falling on each day before departure (index = days to departure)."""
+    days = np.arange(cfg.horizon_days)
+    w = np.exp(-days / cfg.decay_days)
+    return w / w.sum()
+
+def simulate_partition(flights, cfg: MarketConfig, seed: int, pricing_fn=calculate_dynamic_fare):
+    """
+    Run every flight in `flights` (dicts: flight_id, route_id, base_price, capacity, departure, curve)
+    from booking open to departure on one virtual clock. Returns per-flight results plus daily price paths.
+    """
+    rng = np.random.default_rng(seed)
+    pay_rng = random.Random(seed)
+    shares = _intensity_by_day(cfg)
+    payment_req = {"simulate_payment": True, "payment_success_rate": cfg.payment_success_rate}
+
+    events = []  # (virtual unix time, kind, flight index, party size, willingness to pay per seat)
+    for idx, f in enumerate(flights):
+        dep_ts = (f["departure"] - _EPOCH).total_seconds()
+        expected = cfg.arrivals_per_seat * f["capacity"] / np.average(cfg.party_sizes, weights=cfg.party_weights)
+        counts = rng.poisson(expected * shares)
+        n = int(counts.sum())
+        dtd = np.repeat(np.arange(cfg.horizon_days), counts) + rng.random(n)  # fractional days to departure
+        parties = rng.choice(cfg.party_sizes, size=n, p=cfg.party_weights)
+        wtp = f["base_price"] * cfg.wtp_mean * rng.lognormal(0.0, cfg.wtp_sigma, size=n)
+        wtp *= np.where(dtd < 7, 1.0 + cfg.late_premium, 1.0)
+        for t, p, w in zip((dep_ts - dtd * 86400.0).tolist(), parties.tolist(), wtp.tolist()):
+            events.append((t, 1, idx, p, w))
+        # one fare snapshot per day for the price path
+        for d in range(cfg.horizon_days + 1):
+            events.append((dep_ts - d * 86400.0, 0, idx, d, 0.0))
+    heapq.heapify(events)
+
+    booked = [0] * len(flights)
+    revenue = [0.0] * len(flights)
+    bookings = [0] * len(flights)
+    arrivals = [0] * len(flights)
+    path_fare = np.zeros(cfg.horizon_days + 1)
+    path_load = np.zeros(cfg.horizon_days + 1)
+    path_n = np.zeros(cfg.horizon_days + 1)
+
+    while events:
+        t, kind, idx, a, wtp = heapq.heappop(events)
+        f = flights[idx]
+        now = _EPOCH + timedelta(seconds=t)
+        fare = pricing_fn(f["base_price"], f["capacity"], booked[idx], f["departure"],
+                          demand_level_for(f["flight_id"], demand_window(t)), now=now,
+                          seat_mult=curve_multiplier(f.get("curve"), booked[idx], f["capacity"]))
+        if kind == 0:
+            path_fare[a] += fare
+            path_load[a] += booked[idx] / f["capacity"]
+            path_n[a] += 1
+            continue
+        arrivals[idx] += 1
+        if wtp < fare:
+            continue
+        try:
+            check_availability(f["capacity"], booked[idx], a)
+        except ValueError:
+            continue
+        if not payment_succeeds(payment_req, pay_rng):
+            continue
+        booked[idx] += a
+        bookings[idx] += 1
+        revenue[idx] += round(fare * a, 2)
+
+    return {
+        "flights": [{"flight_id": f["flight_id"], "route_id": f["route_id"], "capacity": f["capacity"],
+                     "seats_sold": booked[i], "bookings": bookings[i], "arrivals": arrivals[i], "revenue": revenue[i]}
+                    for i, f in enumerate(flights)],
+        "path_fare": path_fare, "path_load": path_load, "path_n": path_n,
+    }
+
+def _partitions(flights, n_parts: int):
+    """Group flights by route, then spread routes over n_parts partitions (largest first, least-loaded partition)."""
+    by_route = {}
+    for f in flights:
+        by_route.setdefault(f["route_id"], []).append(f)
+    parts = [[] for _ in range(max(1, n_parts))]
+    for group in sorted(by_route.values(), key=len, reverse=True):
+        min(parts, key=len).extend(group)
+    return [p for p in parts if p]
+
+def run_market(flights, cfg: MarketConfig = None, workers: int = 4, seed: int = 0, pricing_fn=calculate_dynamic_fare):
+    """Simulate a whole schedule across a process pool and aggregate revenue, load factor and price-path stats."""
+    cfg = cfg or MarketConfig()
+    t0 = time.perf_counter()
+    parts = _partitions(flights, workers * 4)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_partition, parts, [cfg] * len(parts),
+                                    [seed + i for i in range(len(parts))], [pricing_fn] * len(parts)))
+    else:
+        results = [simulate_partition(p, cfg, seed + i, pricing_fn) for i, p in enumerate(parts)]
+    elapsed = time.perf_counter() - t0
+    return summarize(results, cfg, elapsed)
+
+def summarize(results, cfg: MarketConfig, elapsed: float):
+    per_flight = [f for r in results for f in r["flights"]]
+    path_n = sum(r["path_n"] for r in results)
+    path_fare = sum(r["path_fare"] for r in results) / np.maximum(path_n, 1)
+    path_load = sum(r["path_load"] for r in results) / np.maximum(path_n, 1)
+    capacity = sum(f["capacity"] for f in per_flight)
+    seats = sum(f["seats_sold"] for f in per_flight)
+    revenue = sum(f["revenue"] for f in per_flight)
+    lf = np.array([f["seats_sold"] / f["capacity"] for f in per_flight]) if per_flight else np.zeros(1)
+    by_route = {}
+    for f in per_flight:
+        r = by_route.setdefault(f["route_id"], {"revenue": 0.0, "seats_sold": 0, "capacity": 0})
+        r["revenue"] += f["revenue"]
+        r["seats_sold"] += f["seats_sold"]
+        r["capacity"] += f["capacity"]
+    virtual_seconds = len(per_flight) and cfg.horizon_days * 86400.0
+    return {
+        "flights": len(per_flight),
+        "revenue": round(revenue, 2),
+        "seats_sold": seats,
+        "capacity": capacity,
+        "load_factor": seats / capacity if capacity else 0.0,
+        "load_factor_p10_p50_p90": np.percentile(lf, [10, 50, 90]).round(4).tolist(),
+        "avg_fare_paid": round(revenue / seats, 2) if seats else 0.0,
+        "arrivals": sum(f["arrivals"] for f in per_flight),
+        "bookings": sum(f["bookings"] for f in per_flight),
+        "price_path": [{"days_to_departure": d, "mean_fare": round(float(path_fare[d]), 2), "mean_load_factor": round(float(path_load[d]), 4)}
+                       for d in range(cfg.horizon_days, -1, -1)],
+        "by_route": {rid: {**r, "load_factor": r["seats_sold"] / r["capacity"] if r["capacity"] else 0.0}
+                     for rid, r in sorted(by_route.items())},
+        "wall_seconds": round(elapsed, 3),
+        "speedup_vs_real_time": round(virtual_seconds / elapsed) if elapsed else None,
+    }
+
+def synthetic_schedule(n_flights: int, n_routes: int = 200, season_days: int = 120, seed: int = 0):
+    """Flights spread over a season starting tomorrow, on n_routes routes with realistic capacities and fares."""
+    rng = np.random.default_rng(seed)
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    capacities = rng.choice([78, 156, 180, 189, 220, 290, 396, 550], size=n_flights)
+    return [{"flight_id": i + 1, "route_id": int(r), "base_price": round(float(p), 2), "capacity": int(c),
+             "departure": start + timedelta(minutes=int(m)), "curve": None}
+            for i, (r, p, c, m) in enumerate(zip(rng.integers(1, n_routes + 1, size=n_flights),
+                                                 rng.uniform(2500, 22000, size=n_flights), capacities,
+                                                 rng.integers(0, season_days * 1440, size=n_flights)))]
+
+def load_schedule():
+    """The scheduled (not cancelled) flights in the configured database, with their PriceFactor curves."""
+    from backend.db_config import get_session
+    from backend.fare_curves import fare_curves
+    from backend.utils import to_utc_naive
+    session = get_session()
+    try:
+        rows = session.execute(text(
+            "SELECT f.flight_id, f.route_id, f.base_price, f.departure_time, COALESCE(a.total_capacity, 150) AS total_capacity "
+            "FROM Flight f LEFT JOIN Aircraft a ON a.aircraft_id = f.aircraft_id WHERE f.status <> 'cancelled'")).fetchall()
+    finally:
+        session.close()
+    curves = fare_curves.curves()
+    return [{"flight_id": r.flight_id, "route_id": r.route_id, "base_price": float(r.base_price), "capacity": r.total_capacity,
+             "departure": to_utc_naive(r.departure_time), "curve": curves.get(r.flight_id)} for r in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline market simulation against the dynamic pricing engine")
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--synthetic", type=int, default=2000, help="number of synthetic flights")
+    src.add_argument("--from-db", action="store_true", help="use the flights in the configured database")
+    parser.add_argument("--routes", type=int, default=200)
+    parser.add_argument("--horizon-days", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full", action="store_true", help="include price path and per-route breakdown")
+    args = parser.parse_args()
+
+    flights = load_schedule() if args.from_db else synthetic_schedule(args.synthetic, args.routes, seed=args.seed)
+    summary = run_market(flights, MarketConfig(horizon_days=args.horizon_days), workers=args.workers, seed=args.seed)
+    if not args.full:
+        summary.pop("by_route")
+        summary["price_path"] = summary["price_path"][::max(1, math.ceil(len(summary["price_path"]) / 8))]
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
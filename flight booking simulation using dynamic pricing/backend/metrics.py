@@ -0,0 +1,303 @@
+# backend/metrics.py
+# Request-level instrumentation exposed in Prometheus text format on GET /metrics:
+# per-route latency histograms and in-flight gauge (MetricsMiddleware), SQL statement timing and
+# per-request statement counts (instrument_engine), connection pool stats, pricing call counters,
+# and an opt-in sampling profiler (METRICS_PROFILING=1, then send "X-Profile: 1" on a request).
+import contextlib, contextvars, itertools, os, sys, threading, time
+from bisect import bisect_left
+from collections import Counter as _Tally, deque
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _fmt_labels(self, values, extra=()):
+        pairs = list(zip(self.label_names, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        self._values = {}
+
+    def inc(self, labels=(), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0.0)
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{self._fmt_labels(k)} {v:g}" for k, v in items]
+
+class Gauge(_Metric):
+    """A settable value, or a callback evaluated at scrape time (collect returns [(labels, value)])."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, label_names=(), collect=None):
+        super().__init__(name, help_text, label_names)
+        self._values = {}
+        self._collect = collect
+
+    def inc(self, labels=(), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, labels=(), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+    def render(self):
+        if self._collect is not None:
+            items = self._collect()
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return self.header() + [f"{self.name}{self._fmt_labels(k)} {v:g}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, labels=()):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+
+    def totals(self, labels=()):
+        """(count, sum) of the observations for one label set."""
+        with self._lock:
+            row = self._values.get(labels)
+            return (sum(row[:-1]), row[-1]) if row else (0, 0.0)
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for labels, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), row[:-1]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._fmt_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(labels)} {row[-1]:g}")
+            lines.append(f"{self.name}_count{self._fmt_labels(labels)} {cumulative}")
+        return lines
+
+REGISTRY = []
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+# HTTP
+http_requests = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+request_statements = Histogram("http_request_db_statements", "SQL statements executed per request", ("route",), COUNT_BUCKETS)
+
+# SQL
+db_statements = Counter("db_statements_total", "SQL statements executed by operation", ("operation",))
+db_latency = Histogram("db_statement_duration_seconds", "SQL statement latency by operation", ("operation",))
+pool_wait = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection")
+
+# Pricing
+pricing_calls = Counter("pricing_calls_total", "Calls into the pricing engine", ("function",))
+pricing_fares = Counter("pricing_fares_total", "Fares computed by the pricing engine", ("function",))
+
+# Fare stream (backend/fare_stream.py)
+fare_stream_subscribers = Gauge("fare_stream_subscribers", "Open fare streams")
+fare_stream_events = Counter("fare_stream_events_total", "Events sent on fare streams", ("event",))
+
+_engines = []
+
+def _pool_stats():
+    out = []
+    for label, engine in _engines:
+        pool = engine.pool
+        for stat in ("checkedout", "overflow", "size"):
+            fn = getattr(pool, stat, None)
+            if fn is not None:
+                try:
+                    out.append(((label, stat), float(fn())))
+                except Exception:  # pools without a fixed size (e.g. NullPool) don't support every stat
+                    pass
+    return out
+
+pool_gauge = Gauge("db_pool_connections", "Connection pool state per engine: checkedout / overflow / size", ("engine", "stat"), collect=_pool_stats)
+
+# Per-request SQL statement count (mutable dict shared with threadpool / run_sync work of the same request)
+_request_db = contextvars.ContextVar("request_db", default=None)
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_t0")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    op = _operation(statement)
+    db_statements.inc((op,))
+    db_latency.observe(elapsed, (op,))
+    stats = _request_db.get()
+    if stats is not None:
+        stats["statements"] += 1
+        stats["seconds"] += elapsed
+
+@contextlib.contextmanager
+def statement_counter():
+    """Count SQL statements (and their seconds) run in this context, e.g. around a direct crud call."""
+    stats = {"statements": 0, "seconds": 0.0}
+    token = _request_db.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_db.reset(token)
+
+def instrument_engine(engine, label: str = "primary"):
+    """Time every statement on a sync Engine and record how long pool checkouts wait."""
+    if getattr(engine, "_metrics_instrumented", False):
+        return engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        t0 = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            pool_wait.observe(time.perf_counter() - t0)
+    pool.connect = timed_connect
+    engine._metrics_instrumented = True
+    _engines[:] = [(l, e) for l, e in _engines if l != label] + [(label, engine)]
+    return engine
+
+# Sampling profiler
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "0").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_SECONDS = 0.002
+_profiles = deque(maxlen=20)
+_profile_ids = itertools.count(1)
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread in the process (the event loop plus threadpool workers doing
+    the request's DB work) every interval while a request runs, and aggregates them as collapsed
+    stacks ("outer;...;inner count"), the input format of flamegraph tools.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def recent_profiles():
+    return list(_profiles)
+
+def _route_template(app, scope):
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    from starlette.routing import Match
+    for route in app.router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"  # keeps label cardinality bounded (no raw paths)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app, fastapi_app=None):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = {"code": 500}
+        profile = PROFILING_ENABLED and (b"x-profile", b"1") in scope.get("headers", [])
+        profile_id = next(_profile_ids) if profile else None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if profile_id is not None:
+                    message.setdefault("headers", []).append((b"x-profile-id", str(profile_id).encode()))
+            await send(message)
+
+        stats = {"statements": 0, "seconds": 0.0}
+        token = _request_db.set(stats)
+        http_in_flight.inc()
+        t0 = time.perf_counter()
+        profiler = SamplingProfiler() if profile else None
+        try:
+            if profiler:
+                profiler.__enter__()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                profiler.__exit__(None, None, None)
+            elapsed = time.perf_counter() - t0
+            http_in_flight.dec()
+            _request_db.reset(token)
+            route = _route_template(self.fastapi_app or self.app, scope)
+            method = scope["method"]
+            http_requests.inc((method, route, str(status["code"])))
+            http_latency.observe(elapsed, (method, route))
+            request_statements.observe(stats["statements"], (route,))
+            if profiler:
+                _profiles.append({"id": profile_id, "method": method, "path": scope["path"], "route": route,
+                                  "seconds": round(elapsed, 6), "db_statements": stats["statements"],
+                                  "db_seconds": round(stats["seconds"], 6), "samples": profiler.samples.most_common(50)})
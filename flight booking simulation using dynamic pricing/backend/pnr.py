@@ -0,0 +1,85 @@
+# backend/pnr.py
+import threading
+
+from sqlalchemy import text
+
+# PNRs are 6 characters: 5 base-36 characters encoding a sequence number + 1 check character.
+# Sequence numbers come from per-process blocks reserved in the PnrBlock table, so codes are unique
+# across worker processes without a uniqueness retry loop, and issuing a code is normally just
+# next() on a range iterator (atomic under the GIL, no lock taken).
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+BODY_LENGTH = 5
+CODE_SPACE = len(ALPHABET) ** BODY_LENGTH  # 60,466,176 codes
+_VALUES = {ch: i for i, ch in enumerate(ALPHABET)}
+
+# Bijective scramble of the sequence number (MULTIPLIER is coprime with 36) so consecutive
+# bookings don't get visibly consecutive PNRs
+MULTIPLIER = 39_916_801
+OFFSET = 23_730_581
+
+def _check_char(body: str) -> str:
+    """ISO 7064 MOD 37,36 check character (catches every single-character typo and most adjacent swaps)."""
+    p = 36
+    for ch in body:
+        s = (p + _VALUES[ch]) % 36 or 36
+        p = (2 * s) % 37
+    return ALPHABET[(37 - p) % 36]
+
+def is_valid_pnr(code: str) -> bool:
+    code = code.upper()
+    return len(code) == BODY_LENGTH + 1 and all(c in _VALUES for c in code) and _check_char(code[:-1]) == code[-1]
+
+def encode_pnr(n: int) -> str:
+    """Sequence number -> PNR."""
+    if not 0 <= n < CODE_SPACE:
+        raise ValueError("PNR sequence exhausted")
+    v = (n * MULTIPLIER + OFFSET) % CODE_SPACE
+    chars = []
+    for _ in range(BODY_LENGTH):
+        v, r = divmod(v, 36)
+        chars.append(ALPHABET[r])
+    body = "".join(reversed(chars))
+    return body + _check_char(body)
+
+class PnrGenerator:
+    """
+    Issues PNRs from blocks of sequence numbers obtained from allocate_block(size) -> first number.
+    Only refilling a block takes the lock.
+    """
+
+    def __init__(self, allocate_block, block_size: int = 1000):
+        self.allocate_block = allocate_block
+        self.block_size = block_size
+        self._numbers = iter(())
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        try:
+            return encode_pnr(next(self._numbers))
+        except StopIteration:
+            pass
+        with self._lock:
+            try:
+                # another thread may have refilled while we waited
+                return encode_pnr(next(self._numbers))
+            except StopIteration:
+                start = self.allocate_block(self.block_size)
+                self._numbers = iter(range(start, start + self.block_size))
+                return encode_pnr(next(self._numbers))
+
+PNR_BLOCK_DDL = "CREATE TABLE IF NOT EXISTS PnrBlock (block_name VARCHAR(20) PRIMARY KEY, next_value BIGINT NOT NULL)"
+
+def ensure_block_table(conn):
+    conn.execute(text(PNR_BLOCK_DDL))
+    if conn.execute(text("SELECT 1 FROM PnrBlock WHERE block_name = 'pnr'")).first() is None:
+        conn.execute(text("INSERT INTO PnrBlock (block_name, next_value) VALUES ('pnr', 0)"))
+
+def allocate_db_block(engine, size: int) -> int:
+    """Reserve `size` sequence numbers from the PnrBlock row; its row lock serialises concurrent reservations."""
+    with engine.begin() as conn:
+        claimed = conn.execute(text("UPDATE PnrBlock SET next_value = next_value + :size WHERE block_name = 'pnr'"), {"size": size})
+        if claimed.rowcount == 0:
+            ensure_block_table(conn)
+            conn.execute(text("UPDATE PnrBlock SET next_value = next_value + :size WHERE block_name = 'pnr'"), {"size": size})
+        end = conn.execute(text("SELECT next_value FROM PnrBlock WHERE block_name = 'pnr'")).scalar_one()
+    return end - size
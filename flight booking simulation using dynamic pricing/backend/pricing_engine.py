@@ -1,41 +1,125 @@
 # backend/pricing_engine.py
 from datetime import datetime
-import math
+import math, time, zlib
+import numpy as np
 
-def calculate_dynamic_fare(base_price: float, total_seats: int, booked_seats: int, departure_ts: datetime, demand_level: str) -> float:
+from backend.metrics import pricing_calls, pricing_fares
+
+# Demand multiplier per demand level (unknown levels price as "low")
+DEMAND_MULTIPLIERS = {"low": 1.0, "medium": 1.06, "high": 1.18}
+
+_US_PER_DAY = 86_400_000_000
+
+# Demand is drawn per flight per window rather than per request, so a fare stays stable
+# (and cacheable) for the length of a window
+DEMAND_LEVELS = ("low", "medium", "high")
+DEMAND_WINDOW_SECONDS = 900
+
+# Time multiplier tiers: (more than this many days to departure, multiplier), last-minute otherwise
+TIME_TIERS = ((30, 1.0), (15, 1.08), (7, 1.18))
+LAST_MINUTE_MULTIPLIER = 1.40
+
+def demand_window(now: float = None) -> int:
+    """Index of the current demand window (unix time / DEMAND_WINDOW_SECONDS)."""
+    return int((time.time() if now is None else now) // DEMAND_WINDOW_SECONDS)
+
+def demand_level_for(flight_id: int, window: int = None) -> str:
+    """Deterministic pseudo-random demand level for a flight within a demand window."""
+    if window is None:
+        window = demand_window()
+    return DEMAND_LEVELS[zlib.crc32(f"{flight_id}:{window}".encode()) % len(DEMAND_LEVELS)]
+
+def calculate_dynamic_fare(base_price: float, total_seats: int, booked_seats: int, departure_ts: datetime, demand_level: str,
+                           now: datetime = None, seat_mult: float = None) -> float:
     """
     Combine seat availability, time-to-departure and demand to compute dynamic fare.
+    seat_mult overrides the built-in seat tiers (a PriceFactor curve, see fare_curves).
     Returns float rounded to 2 decimals.
     """
+    pricing_calls.inc(("calculate_dynamic_fare",))
     if total_seats <= 0:
         return round(base_price, 2)
 
     remaining_pct = max(0.0, (total_seats - booked_seats) / total_seats)  # fraction 0..1
-    days_to_departure = (departure_ts - datetime.utcnow()).days
+    days_to_departure = (departure_ts - (now or datetime.utcnow())).days
 
-    # Seat multiplier
-    if remaining_pct > 0.5:
-        seat_mult = 1.0
-    elif remaining_pct > 0.2:
-        seat_mult = 1.12
-    else:
-        seat_mult = 1.35
+    # Seat multiplier (built-in tiers unless a PriceFactor curve supplied one)
+    if seat_mult is None:
+        if remaining_pct > 0.5:
+            seat_mult = 1.0
+        elif remaining_pct > 0.2:
+            seat_mult = 1.12
+        else:
+            seat_mult = 1.35
 
     # Time multiplier
-    if days_to_departure > 30:
-        time_mult = 1.0
-    elif days_to_departure > 15:
-        time_mult = 1.08
-    elif days_to_departure > 7:
-        time_mult = 1.18
-    else:
-        time_mult = 1.40
+    time_mult = next((mult for days, mult in TIME_TIERS if days_to_departure > days), LAST_MINUTE_MULTIPLIER)
 
     # Demand multiplier
-    demand_map = {"low": 1.0, "medium": 1.06, "high": 1.18}
-    demand_mult = demand_map.get(demand_level, 1.0)
+    demand_mult = DEMAND_MULTIPLIERS.get(demand_level, 1.0)
 
     price = base_price * seat_mult * time_mult * demand_mult
 
     # Round to nearest 0.5 or cents (choose cents)
     return round(price, 2)
+
+def calculate_dynamic_fares(base_prices, total_seats, booked_seats, departure_ts, demand_levels, now: datetime = None,
+                            seat_mults=None) -> np.ndarray:
+    """
+    Batch version of calculate_dynamic_fare: every argument is an array (or list) of equal length,
+    departure_ts as naive-UTC datetimes or datetime64. All tiers are evaluated with NumPy against a
+    single `now`, and the result is identical, element for element, to calling the scalar function.
+    seat_mults optionally overrides the seat tiers per flight; NaN entries keep the built-in tiers.
+    """
+    base = np.asarray(base_prices, dtype=np.float64)
+    pricing_calls.inc(("calculate_dynamic_fares",))
+    pricing_fares.inc(("calculate_dynamic_fares",), len(base))
+    total = np.asarray(total_seats, dtype=np.int64)
+    booked = np.asarray(booked_seats, dtype=np.int64)
+    dep = np.asarray(departure_ts, dtype="datetime64[us]")
+    now64 = np.datetime64(now or datetime.utcnow(), "us")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        remaining_pct = np.maximum(0.0, (total - booked) / total)
+    # timedelta.days floors towards -inf, as does integer floor division
+    days_to_departure = (dep - now64).astype(np.int64) // _US_PER_DAY
+
+    seat_mult = np.where(remaining_pct > 0.5, 1.0, np.where(remaining_pct > 0.2, 1.12, 1.35))
+    if seat_mults is not None:
+        seat_mults = np.asarray(seat_mults, dtype=np.float64)
+        seat_mult = np.where(np.isnan(seat_mults), seat_mult, seat_mults)
+    time_mult = np.select([days_to_departure > days for days, _ in TIME_TIERS], [mult for _, mult in TIME_TIERS],
+                          LAST_MINUTE_MULTIPLIER)
+    levels = np.asarray(demand_levels, dtype=object)
+    demand_mult = np.ones(len(levels))
+    for level, mult in DEMAND_MULTIPLIERS.items():
+        demand_mult[levels == level] = mult
+
+    # Same multiplication order as the scalar path so the unrounded floats match exactly
+    price = np.where(total <= 0, base, base * seat_mult * time_mult * demand_mult)
+    return _round_cents(price)
+
+def next_tier_change(departure_ts, now: datetime = None) -> np.ndarray:
+    """
+    When each fare's time multiplier next changes, as datetime64[us]: a flight leaves the "more
+    than N days" tier just after departure - (N + 1) days. NaT once it is in the last-minute tier.
+    """
+    dep = np.asarray(departure_ts, dtype="datetime64[us]")
+    now64 = np.datetime64(now or datetime.utcnow(), "us")
+    out = np.full(len(dep), np.datetime64("NaT", "us"))
+    for days, _ in TIME_TIERS:  # widest tier first, so the first boundary still ahead is the next one
+        boundary = dep - np.timedelta64(days + 1, "D")
+        out = np.where(np.isnat(out) & (boundary >= now64), boundary, out)
+    return out
+
+def _round_cents(price: np.ndarray) -> np.ndarray:
+    """
+    np.round(x, 2) scales by 100 before rounding, which can land on the other side of a half-cent
+    tie than Python's correctly rounded round(x, 2). Those near-ties are re-rounded in Python.
+    """
+    scaled = price * 100.0
+    fares = np.rint(scaled) / 100.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        fares[i] = round(float(price[i]), 2)
+    return fares
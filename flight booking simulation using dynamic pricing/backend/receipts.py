@@ -0,0 +1,193 @@
+# backend/receipts.py
+import asyncio, hashlib, io, os, threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+
+RECEIPT_CACHE_BYTES = int(os.getenv("RECEIPT_CACHE_MB", "64")) * 1024 * 1024
+RECEIPT_DIR = os.getenv("RECEIPT_DIR")  # optional on-disk store shared by all API processes
+RECEIPT_WORKERS = int(os.getenv("RECEIPT_WORKERS", "2"))
+MAX_PENDING_RENDERS = 1000  # beyond this, pre-rendering is skipped and receipts render on first download
+
+def render_receipt_pdf(payload) -> bytes:
+    """Draw the receipt PDF for a receipt payload (runs in the render process pool)."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    p.setFont("Helvetica", 12)
+    p.drawString(40, 750, f"Flight Booking Receipt - PNR: {payload.get('pnr')}")
+    p.drawString(40, 730, f"Flight ID: {payload.get('flight_id')}")
+    p.drawString(40, 710, f"Seats: {payload.get('seats')}")
+    p.drawString(40, 690, f"Total Price: ${payload.get('total_price')}")
+    p.drawString(40, 670, f"Booking Time: {payload.get('booking_time')}")
+    p.drawString(40, 650, "Passengers:")
+    y = 630
+    for psg in payload.get("passengers", []):
+        line = f"- {psg.get('name')} | age:{psg.get('age')} | passport:{psg.get('passport')}"
+        if psg.get('seat'):
+            line += f" | seat:{psg.get('seat')}"
+        p.drawString(60, y, line)
+        y -= 16
+        if y < 80:
+            p.showPage()
+            y = 750
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+def etag_for(pdf: bytes) -> str:
+    return '"' + hashlib.blake2b(pdf, digest_size=16).hexdigest() + '"'
+
+class ReceiptStore:
+    """
+    Rendered receipts keyed by PNR: an in-memory LRU bounded by total size in bytes, optionally
+    backed by files in disk_dir (so other workers and restarts reuse renders). Values are (pdf, etag).
+    """
+
+    def __init__(self, max_bytes: int = RECEIPT_CACHE_BYTES, disk_dir: str = RECEIPT_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _path(self, pnr: str) -> Path:
+        return self.disk_dir / f"{pnr}.pdf"
+
+    def get(self, pnr: str):
+        with self._lock:
+            entry = self._data.get(pnr)
+            if entry is not None:
+                self._data.move_to_end(pnr)
+                self.hits += 1
+                return entry
+        if self.disk_dir and self._path(pnr).exists():
+            pdf = self._path(pnr).read_bytes()
+            entry = (pdf, etag_for(pdf))
+            self._remember(pnr, *entry)
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, pnr: str, pdf: bytes):
+        entry = (pdf, etag_for(pdf))
+        if self.disk_dir:
+            tmp = self._path(pnr).with_suffix(".tmp")
+            tmp.write_bytes(pdf)
+            os.replace(tmp, self._path(pnr))
+        self._remember(pnr, *entry)
+        return entry
+
+    def _remember(self, pnr, pdf, etag):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(pnr, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._data[pnr] = (pdf, etag)
+            self._bytes += len(pdf)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def discard(self, pnr: str):
+        """Forget a receipt (e.g. the booking changed); the next download re-renders it."""
+        with self._lock:
+            old = self._data.pop(pnr, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+        if self.disk_dir:
+            self._path(pnr).unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+receipt_store = ReceiptStore()
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = {}  # pnr -> Future of a render in flight
+_pending_lock = threading.Lock()
+
+def _render_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the API process holds DB connections and threads that must not be copied
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=RECEIPT_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _rendered(pnr: str, fut):
+    try:
+        if not fut.cancelled() and fut.exception() is None:
+            receipt_store.put(pnr, fut.result())
+    finally:
+        with _pending_lock:
+            _pending.pop(pnr, None)
+
+def _submit(pnr: str, payload):
+    """One render per PNR at a time; concurrent callers share the Future."""
+    pool = _render_pool()
+    with _pending_lock:
+        fut = _pending.get(pnr)
+        if fut is not None:
+            return fut
+        fut = _pending[pnr] = pool.submit(render_receipt_pdf, payload)
+    fut.add_done_callback(partial(_rendered, pnr))
+    return fut
+
+def prerender(pnr: str, payload):
+    """Queue a render right after a booking commits; never blocks or fails the caller."""
+    if len(_pending) >= MAX_PENDING_RENDERS:
+        return
+    try:
+        _submit(pnr, payload)
+    except BrokenProcessPool:
+        _reset_pool()  # a worker died; start a fresh pool, this receipt renders on first download
+    except Exception:
+        pass
+
+async def get_receipt_pdf(pnr: str, load_payload):
+    """
+    (pdf, etag) for a PNR, or None if it has no receipt. Served from the store, else awaits a
+    render already in flight, else loads the payload (load_payload(pnr), run on a thread) and
+    renders it in the process pool.
+    """
+    entry = receipt_store.get(pnr)
+    if entry is not None:
+        return entry
+    with _pending_lock:
+        fut = _pending.get(pnr)
+    if fut is None:
+        payload = await asyncio.to_thread(load_payload, pnr)
+        if payload is None:
+            return None
+        fut = _submit(pnr, payload)
+    pdf = await asyncio.wrap_future(fut)
+    return pdf, etag_for(pdf)
+
+def shutdown():
+    _reset_pool()
@@ -0,0 +1,391 @@
+# backend/route_graph.py
+import heapq, threading, time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import bindparam, text
+
+from backend.db_config import get_read_session, get_session
+from backend.fare_curves import fare_curves
+from backend.pricing_engine import calculate_dynamic_fares, demand_level_for, demand_window
+from backend.utils import to_datetime64_utc
+
+GRAPH_SQL = """
+SELECT f.flight_id, f.flight_number, f.departure_time, f.base_price, f.current_occupancy,
+       r.origin_airport_code, r.destination_airport_code, r.base_duration_minutes,
+       COALESCE(a.total_capacity, 150) AS total_capacity
+FROM Flight f
+JOIN Route r ON r.route_id = f.route_id
+LEFT JOIN Aircraft a ON a.aircraft_id = f.aircraft_id
+WHERE f.status <> 'cancelled'
+ORDER BY f.flight_id
+"""
+
+OCCUPANCY_SQL = "SELECT flight_id, current_occupancy, status FROM Flight WHERE flight_id IN :ids"
+
+# Minimum connection time at the connecting airport; the big hubs need longer for transfers
+MIN_CONNECTION_MINUTES = 45
+AIRPORT_MIN_CONNECTION_MINUTES = {"DEL": 60, "BOM": 60, "DXB": 90, "DOH": 60, "SIN": 60}
+MAX_CONNECTION_MINUTES = 24 * 60
+MAX_STOPS = 2
+MAX_EXPANSIONS = 50_000  # labels settled per query before the search gives up on finding k itineraries
+
+_EPOCH = np.datetime64("1970-01-01T00:00", "m")
+
+def _minutes(dt: datetime) -> int:
+    return int((np.datetime64(dt, "m") - _EPOCH).astype(np.int64))
+
+def _iso(minutes: int) -> str:
+    return (datetime(1970, 1, 1) + timedelta(minutes=minutes)).isoformat() + "+00:00"
+
+class _Schedule:
+    """
+    One snapshot of the Flight table as a time-expanded graph. Per flight (row i, ordered by
+    flight_id): origin/destination airport index, departure/arrival in UTC minutes since the epoch,
+    free seats and the current dynamic fare. Per airport: its departures sorted by time, so the
+    onward flights of a connection are one bisect away.
+    """
+
+    def __init__(self, rows):
+        self.ids = array("q", (r.flight_id for r in rows))
+        self.numbers = [r.flight_number for r in rows]
+        self.airports = sorted({r.origin_airport_code for r in rows} | {r.destination_airport_code for r in rows})
+        index = {code: i for i, code in enumerate(self.airports)}
+        self.origin = array("i", (index[r.origin_airport_code] for r in rows))
+        self.dest = array("i", (index[r.destination_airport_code] for r in rows))
+        self.departure_ts = to_datetime64_utc([r.departure_time for r in rows])
+        dep = (self.departure_ts.astype("datetime64[m]") - _EPOCH).astype(np.int64)
+        self.dep = array("q", dep.tolist())
+        self.arr = array("q", (dep + np.array([int(r.base_duration_minutes) for r in rows], dtype=np.int64)).tolist())
+        self.base = np.array([float(r.base_price) for r in rows], dtype=np.float64)
+        self.capacity = np.array([int(r.total_capacity) for r in rows], dtype=np.int64)
+        self.booked = np.array([int(r.current_occupancy or 0) for r in rows], dtype=np.int64)
+        self.free = array("i", np.maximum(0, self.capacity - self.booked).tolist())
+        self.fare = array("d", bytes(8 * len(rows)))
+        self.window = None
+        self.refreshed = array("q", bytes(8 * len(rows)))  # sequence number of the refresh that last set each row
+        self.cancelled = set()  # rows cancelled since the snapshot was built (no free seats; gone on rebuild)
+
+        order = np.lexsort((dep, np.frombuffer(self.origin, dtype=np.int32))) if len(rows) else np.array([], dtype=np.int64)
+        bounds = np.searchsorted(np.frombuffer(self.origin, dtype=np.int32)[order], np.arange(len(self.airports) + 1))
+        self.out_times, self.out_rows = [], []
+        self.neighbours_in = [set() for _ in self.airports]
+        for a in range(len(self.airports)):
+            sl = order[bounds[a]:bounds[a + 1]]
+            self.out_rows.append(array("i", sl.tolist()))
+            self.out_times.append(array("q", dep[sl].tolist()))
+        for o, d in set(zip(self.origin, self.dest)):
+            self.neighbours_in[d].add(o)
+        self.index = index
+        self._hops = {}
+        self._routes = None
+        self._routes_lock = threading.Lock()
+
+    def row_of(self, flight_id: int):
+        i = bisect_left(self.ids, flight_id)
+        return i if i < len(self.ids) and self.ids[i] == flight_id else None
+
+    def route_rows(self, origin: str, destination: str) -> np.ndarray:
+        """Rows of the flights on one route, ordered by departure (the index is built on first use)."""
+        if self._routes is None:
+            with self._routes_lock:
+                if self._routes is None:
+                    origin_ix = np.frombuffer(self.origin, dtype=np.int32)
+                    dest_ix = np.frombuffer(self.dest, dtype=np.int32)
+                    order = np.lexsort((np.frombuffer(self.dep, dtype=np.int64), dest_ix, origin_ix))
+                    keys = origin_ix[order].astype(np.int64) * len(self.airports) + dest_ix[order]
+                    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(order) else np.array([], dtype=np.int64)
+                    bounds = np.r_[starts, len(order)]
+                    self._routes = {int(keys[lo]): order[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])}
+        o, d = self.index.get(origin), self.index.get(destination)
+        if o is None or d is None:
+            return np.array([], dtype=np.int64)
+        return self._routes.get(o * len(self.airports) + d, np.array([], dtype=np.int64))
+
+    def price(self, rows):
+        """Dynamic fares for the given rows at their current occupancy (same inputs as /search)."""
+        rows = list(rows)
+        if not rows:
+            return np.array([], dtype=np.float64)
+        ids = [self.ids[i] for i in rows]
+        booked, capacity = self.booked[rows], self.capacity[rows]
+        return calculate_dynamic_fares(self.base[rows], capacity, booked, self.departure_ts[rows],
+                                       [demand_level_for(fid) for fid in ids],
+                                       seat_mults=fare_curves.seat_multipliers(ids, booked.tolist(), capacity.tolist()))
+
+    def reprice(self, rows=None):
+        """Refresh the stored fares (all of them when the demand window rolls over)."""
+        if rows is None:
+            self.window = demand_window()
+            rows = range(len(self.ids))
+        rows = list(rows)
+        if rows:
+            for i, fare in zip(rows, self.price(rows).tolist()):
+                self.fare[i] = fare
+
+    def hops_to(self, destination: int, max_legs: int):
+        """{airport: fewest legs to destination}, up to max_legs, from a BFS over the route network."""
+        key = (destination, max_legs)
+        hops = self._hops.get(key)
+        if hops is None:
+            hops, queue = {destination: 0}, deque([destination])
+            while queue:
+                a = queue.popleft()
+                if hops[a] < max_legs:
+                    for b in self.neighbours_in[a]:
+                        if b not in hops:
+                            hops[b] = hops[a] + 1
+                            queue.append(b)
+            self._hops[key] = hops
+        return hops
+
+class RouteGraph:
+    """
+    In-memory route/schedule graph for connection search. Built at startup from one query over
+    Flight/Route/Aircraft; occupancy changes (notify_occupancy_changed) only mark flights dirty and
+    are re-read and re-priced before the next search. Every max_age_seconds the whole snapshot is
+    rebuilt in the background (new or retimed flights) and swapped in; searches keep using the old
+    one meanwhile. When the demand window rolls over, the stored fares are likewise recomputed in
+    the background (find_connections re-prices the legs it returns, so only the ranking lags).
+    """
+
+    def __init__(self, max_age_seconds: float = 300.0):
+        self.max_age_seconds = max_age_seconds
+        self._schedule = None
+        self._built_at = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._apply_lock = threading.Lock()  # writes to the current schedule's occupancy and fares
+        self._rebuilding = self._repricing = False
+        self._seq = 0
+        self._replay = None  # flights refreshed while a rebuild runs, re-applied to the new snapshot
+        self._listeners = []
+        self.builds = self.refreshes = 0
+
+    def subscribe(self, callback):
+        """callback(schedule, rows) runs after dirty flights are re-read and re-priced in a snapshot."""
+        self._listeners.append(callback)
+
+    def mark_dirty(self, flight_ids):
+        with self._lock:
+            self._dirty.update(flight_ids)
+
+    def invalidate(self):
+        """Rebuild the whole graph in the background on next use (schedule changes)."""
+        with self._lock:
+            if self._built_at is not None:
+                self._built_at = float("-inf")
+
+    def build(self):
+        with self._lock:
+            self._replay = set()
+        session = get_read_session()
+        try:
+            rows = session.execute(text(GRAPH_SQL)).fetchall()
+        finally:
+            session.close()
+        schedule = _Schedule(rows)
+        schedule.reprice()
+        with self._lock:
+            self._schedule, self._built_at = schedule, time.monotonic()
+            self._dirty |= self._replay
+            self._replay = None
+            self.builds += 1
+        return schedule
+
+    def _rebuild_in_background(self):
+        try:
+            self.build()
+        finally:
+            self._rebuilding = False
+
+    def _reprice_in_background(self, schedule):
+        try:
+            with self._lock:
+                start = self._seq
+            window = demand_window()
+            fares = array("d", schedule.price(range(len(schedule.ids))).tolist())
+            with self._apply_lock:
+                schedule.fare, schedule.window = fares, window
+                # rows refreshed meanwhile were priced above at their old occupancy
+                schedule.reprice(np.flatnonzero(np.frombuffer(schedule.refreshed, dtype=np.int64) > start).tolist())
+        finally:
+            self._repricing = False
+
+    def _refresh_dirty(self, schedule):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if self._replay is not None:
+                self._replay |= dirty
+            self._seq += 1
+            seq = self._seq
+        rows = {}
+        for fid in dirty:
+            i = schedule.row_of(fid)
+            if i is not None:
+                rows[fid] = i
+        if not rows:
+            return
+        # occupancy comes from the primary: the change that marked the flight has just been committed there.
+        # Read without holding a lock; a refresh that started later (higher seq) and got here first wins.
+        session = get_session()
+        try:
+            q = text(OCCUPANCY_SQL).bindparams(bindparam("ids", expanding=True))
+            found = session.execute(q, {"ids": list(rows)}).fetchall()
+        finally:
+            session.close()
+        applied = []
+        with self._apply_lock:
+            for fid, occ, status in found:
+                i = rows[fid]
+                if schedule.refreshed[i] > seq:
+                    continue
+                schedule.refreshed[i] = seq
+                schedule.booked[i] = int(occ or 0)
+                # a cancelled flight stays in the snapshot until the next rebuild, with no seats to sell
+                if status == "cancelled":
+                    schedule.cancelled.add(i)
+                schedule.free[i] = 0 if status == "cancelled" else max(0, int(schedule.capacity[i]) - int(occ or 0))
+                applied.append(i)
+            schedule.reprice(applied)
+        self.refreshes += 1
+        if applied:
+            for callback in self._listeners:
+                callback(schedule, applied)
+
+    def snapshot(self, fares: bool = True) -> _Schedule:
+        """
+        The current schedule with dirty flights re-read. Unless fares=False (callers that only need
+        occupancy and price their own rows), a demand window rollover starts a background re-price
+        of the stored fares; the previous window's fares are returned until it is done.
+        """
+        schedule = self._schedule
+        if schedule is None or self._built_at is None:
+            with self._build_lock:
+                if self._schedule is None or self._built_at is None:
+                    self.build()
+                schedule = self._schedule
+        elif time.monotonic() - self._built_at > self.max_age_seconds and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        if fares and schedule.window != demand_window():
+            with self._lock:
+                start, self._repricing = not self._repricing, True
+            if start:
+                threading.Thread(target=self._reprice_in_background, args=(schedule,), daemon=True).start()
+        if self._dirty:
+            self._refresh_dirty(schedule)
+        return schedule
+
+    def stats(self):
+        schedule = self._schedule
+        return {"flights": len(schedule.ids) if schedule else 0, "airports": len(schedule.airports) if schedule else 0,
+                "builds": self.builds, "dirty_refreshes": self.refreshes}
+
+def min_connection_minutes(airport: str) -> int:
+    return AIRPORT_MIN_CONNECTION_MINUTES.get(airport, MIN_CONNECTION_MINUTES)
+
+def _search(schedule, origin, destination, start, end, k, sort, max_stops, seats, min_connection, max_connection):
+    """
+    Best-first (Dijkstra) search over partial itineraries, cheapest total fare or shortest elapsed
+    time first; both only grow as legs are added, so the first k labels that reach the destination
+    are the k best. Onward flights come from the sorted departures of the connecting airport within
+    [arrival + MCT, arrival + max_connection]; airports that cannot reach the destination in the legs
+    left are never entered, and a label is dropped once k settled labels at the same airport arrived
+    no later with no more legs (and, for duration, left no earlier) and can still catch every onward
+    flight it could: an earlier arrival's connection window also closes earlier.
+    Returns ([[row, ...], ...], labels settled).
+    """
+    max_legs = max_stops + 1
+    hops = schedule.hops_to(destination, max_legs)
+    mct = [max(min_connection, min_connection_minutes(code)) for code in schedule.airports]
+    by_price = sort == "price"
+    labels = []  # (row, parent label, legs, fare so far, first departure)
+    heap = []
+
+    def push(row, parent, legs, fare, first_dep):
+        labels.append((row, parent, legs, fare, first_dep))
+        key = fare if by_price else schedule.arr[row] - first_dep
+        heapq.heappush(heap, (key, schedule.arr[row], len(labels) - 1))
+
+    times, out_rows = schedule.out_times[origin], schedule.out_rows[origin]
+    for j in range(bisect_left(times, start), bisect_left(times, end)):
+        row = out_rows[j]
+        b = schedule.dest[row]
+        if schedule.free[row] >= seats and hops.get(b, max_legs + 1) <= max_legs - 1:
+            push(row, -1, 1, schedule.fare[row], schedule.dep[row])
+
+    found, settled, expansions = [], {}, 0
+    while heap and len(found) < k and expansions < MAX_EXPANSIONS:
+        _, arrival, label = heapq.heappop(heap)
+        row, parent, legs, fare, first_dep = labels[label]
+        a = schedule.dest[row]
+        if a == destination:
+            path = []
+            while label >= 0:
+                path.append(labels[label][0])
+                label = labels[label][1]
+            found.append(path[::-1])
+            continue
+        expansions += 1
+        times, out_rows = schedule.out_times[a], schedule.out_rows[a]
+        # departures this label can take are times[lo:hi]; one that arrived at t can take those before t + max_connection
+        lo, hi = bisect_left(times, arrival + mct[a]), bisect_right(times, arrival + max_connection)
+        seen = settled.setdefault(a, [])
+        if sum(1 for l, t, d in seen if l <= legs and t <= arrival and (by_price or d >= first_dep)
+               and bisect_right(times, t + max_connection) >= hi) >= k:
+            continue
+        seen.append((legs, arrival, first_dep))
+
+        visited = {a}
+        p = label
+        while p >= 0:
+            visited.add(schedule.origin[labels[p][0]])
+            p = labels[p][1]
+        left = max_legs - legs - 1
+        for j in range(lo, hi):
+            nxt = out_rows[j]
+            b = schedule.dest[nxt]
+            if b in visited or schedule.free[nxt] < seats or hops.get(b, max_legs + 1) > left:
+                continue
+            push(nxt, label, legs + 1, fare + schedule.fare[nxt], first_dep)
+    return found, expansions
+
+def find_connections(origin: str, destination: str, day, k: int = 5, sort: str = "price", max_stops: int = MAX_STOPS,
+                     seats: int = 1, min_connection: int = MIN_CONNECTION_MINUTES,
+                     max_connection: int = MAX_CONNECTION_MINUTES):
+    """
+    The k cheapest (sort="price") or fastest (sort="duration") itineraries from origin to destination
+    whose first leg departs on `day` (UTC), with up to max_stops connections and `seats` free seats on
+    every leg. Legs are re-priced through calculate_dynamic_fares at response time, so each leg's fare
+    matches what /search quotes for that flight.
+    """
+    schedule = route_graph.snapshot()
+    o, d = schedule.index.get(origin), schedule.index.get(destination)
+    if o is None or d is None or o == d:
+        return []
+    start = _minutes(datetime.combine(day, datetime.min.time()))
+    paths, _ = _search(schedule, o, d, start, start + 24 * 60, k, sort, max_stops, seats, min_connection, max_connection)
+    fares = schedule.price([r for path in paths for r in path]).tolist()
+    results, n = [], 0
+    for path in paths:
+        legs = []
+        for row in path:
+            legs.append({"flight_id": schedule.ids[row], "flight_number": schedule.numbers[row],
+                         "origin": schedule.airports[schedule.origin[row]], "destination": schedule.airports[schedule.dest[row]],
+                         "departure": _iso(schedule.dep[row]), "arrival": _iso(schedule.arr[row]),
+                         "available_seats": schedule.free[row], "dynamic_fare": fares[n]})
+            n += 1
+        results.append({"legs": legs, "stops": len(path) - 1,
+                        "total_fare": round(sum(l["dynamic_fare"] for l in legs), 2),
+                        "departure": legs[0]["departure"], "arrival": legs[-1]["arrival"],
+                        "duration_minutes": schedule.arr[path[-1]] - schedule.dep[path[0]],
+                        "connection_minutes": [schedule.dep[b] - schedule.arr[a] for a, b in zip(path, path[1:])]})
+    key = (lambda r: (r["total_fare"], r["duration_minutes"])) if sort == "price" else (lambda r: (r["duration_minutes"], r["total_fare"]))
+    return sorted(results, key=key)
+
+route_graph = RouteGraph()
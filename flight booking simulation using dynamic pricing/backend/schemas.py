@@ -1,6 +1,6 @@
 # backend/schemas.py
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 class FlightSearchResponse(BaseModel):
     flight_id: int
@@ -10,6 +10,7 @@ class FlightSearchResponse(BaseModel):
     departure: str
     base_price: float
     available_seats: int
+    class_availability: Dict[str, int] = {}
     dynamic_fare: float
 
 class Passenger(BaseModel):
@@ -21,10 +22,91 @@ class Passenger(BaseModel):
 class BookingRequest(BaseModel):
     flight_id: int
     passengers: List[Passenger]
+    seat_class: Optional[str] = None
     simulate_payment: bool = True
     payment_success_rate: float = 0.95
+    fare_hold_token: Optional[str] = None
 
 class BookingResponse(BaseModel):
     pnr: str
     total_price: float
     status: str
+    seats: List[str] = []
+
+class BatchBookingRequest(BaseModel):
+    bookings: List[BookingRequest]
+
+class BatchBookingItem(BaseModel):
+    index: int
+    flight_id: int
+    status: str
+    pnr: Optional[str] = None
+    total_price: Optional[float] = None
+    seats: List[str] = []
+    error: Optional[str] = None
+
+class BatchBookingResponse(BaseModel):
+    confirmed: int
+    failed: int
+    results: List[BatchBookingItem]
+
+class CancelResult(BaseModel):
+    pnr: str
+    status: str
+    refund: Optional[float] = None
+    error: Optional[str] = None
+
+class ConnectionLeg(BaseModel):
+    flight_id: int
+    flight_number: str
+    origin: str
+    destination: str
+    departure: str
+    arrival: str
+    available_seats: int
+    dynamic_fare: float
+
+class Itinerary(BaseModel):
+    legs: List[ConnectionLeg]
+    stops: int
+    total_fare: float
+    departure: str
+    arrival: str
+    duration_minutes: int
+    connection_minutes: List[int] = []
+
+class FareHoldRequest(BaseModel):
+    flight_id: int
+    seats: int = 1
+
+class FareHoldResponse(BaseModel):
+    token: str
+    flight_id: int
+    seats: int
+    fare_per_seat: float
+    total_price: float
+    expires_at: int
+
+class FareCalendarDay(BaseModel):
+    date: str
+    min_fare: Optional[float] = None
+    flight_id: Optional[int] = None
+    flight_number: Optional[str] = None
+    available_seats: int
+    flights: int
+
+class FareCalendarResponse(BaseModel):
+    origin: str
+    destination: str
+    date_from: str
+    days: List[FareCalendarDay]
+
+class BulkCancelRequest(BaseModel):
+    pnrs: List[str]
+    reason: Literal["customer", "duplicate_booking", "schedule_conflict"] = "customer"  # cancellation.CUSTOMER_REASONS
+
+class BulkCancelResponse(BaseModel):
+    cancelled: int
+    failed: int
+    refund_total: float
+    results: List[CancelResult]
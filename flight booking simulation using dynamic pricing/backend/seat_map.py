@@ -0,0 +1,260 @@
+# backend/seat_map.py
+import re, threading
+
+from sqlalchemy import bindparam, text
+
+from backend.cache import TTLCache
+from backend.db_config import get_session
+
+SEAT_SQL = "SELECT seat_id, flight_id, seat_number, class, is_booked FROM Seat WHERE flight_id IN :fids"
+
+# Guarded claim: only seats that are still free are flipped, so rowcount < len(ids) means we lost a race
+CLAIM_SEAT_ROWS_SQL = "UPDATE Seat SET is_booked = TRUE WHERE flight_id = :fid AND seat_id IN :ids AND is_booked = FALSE"
+
+CLASS_ORDER = ("First", "Business", "Premium Economy", "Economy")
+DEFAULT_CLASS = "Economy"
+
+_SEAT_RE = re.compile(r"^(\d+)([A-Z]+)$")
+
+def _seat_key(seat_number: str):
+    m = _SEAT_RE.match(seat_number.strip().upper())
+    return (int(m.group(1)), m.group(2)) if m else (10 ** 6, seat_number)
+
+def _lowest_bits(mask: int, n: int):
+    """Indices of the n lowest set bits of mask."""
+    out = []
+    while mask and len(out) < n:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
+
+class CabinMap:
+    """
+    One cabin class of one flight. Seats are ordered front to back, left to right; seat i is bit i.
+    booked:   bit set = seat taken
+    same_row: bit i set when seat i+1 is the next seat in the same row (so runs never wrap a row)
+    """
+
+    def __init__(self, name, seats):
+        seats = sorted(seats, key=lambda s: _seat_key(s[1]))
+        self.name = name
+        self.ids = [s[0] for s in seats]
+        self.numbers = [s[1] for s in seats]
+        self.full = (1 << len(seats)) - 1
+        self.booked = 0
+        self.same_row = 0
+        rows = [_seat_key(s[1])[0] for s in seats]
+        for i, booked in enumerate(s[2] for s in seats):
+            if booked:
+                self.booked |= 1 << i
+            if i + 1 < len(rows) and rows[i] == rows[i + 1]:
+                self.same_row |= 1 << i
+
+    def free_mask(self, taken: int = 0) -> int:
+        return self.full & ~self.booked & ~taken
+
+    def available(self) -> int:
+        return self.free_mask().bit_count()
+
+    def find_adjacent(self, n: int, taken: int = 0):
+        """Bit indices of the front-most run of n free seats in one row, or None."""
+        free = self.free_mask(taken)
+        runs, chain = free, self.full
+        for k in range(1, n):
+            chain &= self.same_row >> (k - 1)
+            runs &= free >> k
+        runs &= chain
+        if not runs:
+            return None
+        start = (runs & -runs).bit_length() - 1
+        return list(range(start, start + n))
+
+class FlightSeatMap:
+    def __init__(self, rows):
+        by_class = {}
+        for seat_id, number, cls, booked in rows:
+            by_class.setdefault(cls, []).append((seat_id, number, bool(booked)))
+        self.cabins = {cls: CabinMap(cls, seats) for cls, seats in by_class.items()}
+        self.by_number = {}
+        self.by_id = {}
+        for cabin in self.cabins.values():
+            for i, (sid, num) in enumerate(zip(cabin.ids, cabin.numbers)):
+                self.by_number[num.upper()] = (cabin, i)
+                self.by_id[sid] = (cabin, i)
+
+    def availability(self):
+        return {cls: cabin.available() for cls, cabin in self.cabins.items()}
+
+    def _taken_masks(self, taken_ids):
+        masks = {}
+        for sid in taken_ids:
+            if sid in self.by_id:
+                cabin, i = self.by_id[sid]
+                masks[cabin.name] = masks.get(cabin.name, 0) | (1 << i)
+        return masks
+
+    def pick(self, passengers, seat_class=None, taken_ids=()):
+        """
+        Choose seats for a party. Passengers naming a seat get that seat; the rest sit together
+        (one row if possible, else the front-most free seats) in seat_class, or in Economy / the
+        roomiest cabin when no class is asked for. A party no single cabin can hold is split across
+        cabins, Economy (or the roomiest) first. Returns one (seat_id, seat_number) or None per passenger;
+        all None when the flight has no seat map (passenger seats are then kept as given, unchecked).
+        Raises ValueError when a named seat, the requested class or the party size can't be honoured.
+        """
+        if not self.cabins:
+            return [None] * len(passengers)
+        taken = self._taken_masks(taken_ids)
+        out = [None] * len(passengers)
+        rest = []
+        for idx, p in enumerate(passengers):
+            wanted = (p.get("seat") or "").strip().upper()
+            if not wanted:
+                rest.append(idx)
+                continue
+            if wanted not in self.by_number:
+                raise ValueError(f"Seat {wanted} does not exist on this flight")
+            cabin, i = self.by_number[wanted]
+            if not (cabin.free_mask(taken.get(cabin.name, 0)) >> i) & 1:
+                raise ValueError(f"Seat {wanted} is already booked")
+            taken[cabin.name] = taken.get(cabin.name, 0) | (1 << i)
+            out[idx] = (cabin.ids[i], cabin.numbers[i])
+        if not rest:
+            return out
+
+        if seat_class:
+            cabin = self.cabins.get(seat_class)
+            free = cabin.free_mask(taken.get(seat_class, 0)).bit_count() if cabin else 0
+            if free < len(rest):
+                raise ValueError(f"Only {free} {seat_class} seats available")
+        else:
+            candidates = [c for c in self.cabins.values() if c.free_mask(taken.get(c.name, 0)).bit_count() >= len(rest)]
+            if not candidates:
+                return self._split(out, rest, taken)
+            if any(c.name == DEFAULT_CLASS for c in candidates):
+                cabin = self.cabins[DEFAULT_CLASS]
+            else:
+                cabin = max(candidates, key=lambda c: c.free_mask(taken.get(c.name, 0)).bit_count())
+        mask = taken.get(cabin.name, 0)
+        bits = cabin.find_adjacent(len(rest), mask) or _lowest_bits(cabin.free_mask(mask), len(rest))
+        for idx, i in zip(rest, bits):
+            out[idx] = (cabin.ids[i], cabin.numbers[i])
+        return out
+
+    def _split(self, out, rest, taken):
+        """Seat the passengers at `rest` over several cabins, front-most free seats of each."""
+        free = {name: cabin.free_mask(taken.get(name, 0)) for name, cabin in self.cabins.items()}
+        total = sum(mask.bit_count() for mask in free.values())
+        if total < len(rest):
+            raise ValueError(f"Only {total} seats available")
+        order = sorted(self.cabins.values(), key=lambda c: (c.name != DEFAULT_CLASS, -free[c.name].bit_count()))
+        seats = [(cabin.ids[i], cabin.numbers[i]) for cabin in order for i in _lowest_bits(free[cabin.name], len(rest))]
+        for idx, seat in zip(rest, seats):
+            out[idx] = seat
+        return out
+
+    def set_booked(self, seat_numbers, booked: bool = True):
+        for num in seat_numbers:
+            hit = self.by_number.get(num.upper())
+            if hit:
+                cabin, i = hit
+                cabin.booked = cabin.booked | (1 << i) if booked else cabin.booked & ~(1 << i)
+
+    def layout(self):
+        """Seat map for display: per class, seats in order with their booked flag."""
+        return [{"class": cls, "total": len(cabin.ids), "available": cabin.available(),
+                 "seats": [{"seat": num, "booked": bool((cabin.booked >> i) & 1)} for i, num in enumerate(cabin.numbers)]}
+                for cls, cabin in sorted(self.cabins.items(), key=lambda kv: CLASS_ORDER.index(kv[0]) if kv[0] in CLASS_ORDER else len(CLASS_ORDER))]
+
+class SeatMapCache:
+    """
+    Seat-level inventory per flight, held as one bitmap per cabin class (see CabinMap) and loaded
+    from the Seat table on first use. Bookings flip bits after commit (mark_booked); the Seat table
+    stays the source of truth, guarded by CLAIM_SEAT_ROWS_SQL, so a stale map only costs a retry.
+    Flights without Seat rows are cached as empty maps. The maps live in a TTLCache: at most maxsize
+    flights (least recently used dropped first), each reloaded after max_age_seconds.
+    """
+
+    def __init__(self, max_age_seconds: float = 300.0, maxsize: int = 10_000):
+        self._maps = TTLCache(maxsize=maxsize, ttl_seconds=max_age_seconds)  # TTL picks up out-of-band edits
+        self._lock = threading.Lock()  # seat bit flips
+
+    def invalidate(self, flight_id: int = None):
+        if flight_id is None:
+            self._maps.clear()
+        else:
+            self._maps.invalidate(flight_id)
+
+    def _ensure_loaded(self, flight_ids):
+        """{flight_id: FlightSeatMap} for flight_ids, loading the missing or expired maps in one Seat query."""
+        found = {}
+        for fid in flight_ids:
+            seat_map = self._maps.get(fid)
+            if seat_map is not None:
+                found[fid] = seat_map
+        missing = set(flight_ids) - set(found)
+        if not missing:
+            return found
+        # query outside any lock: callers may hold a booking transaction (and its write lock) while they
+        # wait for the cache locks in invalidate / mark_booked, so those must never wait on the connection pool
+        session = get_session()
+        try:
+            q = text(SEAT_SQL).bindparams(bindparam("fids", expanding=True))
+            rows = session.execute(q, {"fids": sorted(missing)}).fetchall()
+        finally:
+            session.close()
+        by_flight = {fid: [] for fid in missing}
+        for r in rows:
+            by_flight[r.flight_id].append((r.seat_id, r.seat_number, r._mapping["class"], r.is_booked))
+        loaded = {fid: FlightSeatMap(seats) for fid, seats in by_flight.items()}
+        for fid, seat_map in loaded.items():
+            self._maps.put(fid, seat_map)
+        found.update(loaded)
+        return found
+
+    def get(self, flight_id: int) -> FlightSeatMap:
+        return self._ensure_loaded([flight_id])[flight_id]
+
+    def availability(self, flight_ids):
+        """{flight_id: {class: free seats}} with a single Seat query for the flights not yet loaded."""
+        maps = self._ensure_loaded(flight_ids)
+        return {fid: maps[fid].availability() for fid in flight_ids}
+
+    def pick_seats(self, flight_id: int, passengers, seat_class=None, taken_ids=()):
+        return self.get(flight_id).pick(passengers, seat_class, taken_ids)
+
+    def mark_booked(self, flight_id: int, seat_numbers, booked: bool = True):
+        """Apply a committed seat change to the in-memory map (no-op if the flight isn't loaded)."""
+        seat_map = self._maps.get(flight_id)
+        if seat_map is not None:
+            with self._lock:
+                seat_map.set_booked(seat_numbers, booked)
+
+    def stats(self):
+        return self._maps.stats()
+
+def claim_seat_rows(session, flight_id: int, seat_ids) -> bool:
+    """Flip is_booked for seat_ids inside the caller's transaction; False if any was already taken."""
+    if not seat_ids:
+        return True
+    q = text(CLAIM_SEAT_ROWS_SQL).bindparams(bindparam("ids", expanding=True))
+    return session.execute(q, {"fid": flight_id, "ids": list(seat_ids)}).rowcount == len(seat_ids)
+
+def seat_layout(capacity: int):
+    """
+    A generic cabin layout for populating Seat: ~4% First and ~12% Business (4 abreast),
+    the rest Economy (6 abreast). Returns [(seat_number, class)].
+    """
+    first = capacity * 4 // 100
+    business = capacity * 12 // 100
+    seats, row = [], 1
+    for cls, count, letters in (("First", first, "ACDF"), ("Business", business, "ACDF"), ("Economy", capacity - first - business, "ABCDEF")):
+        while count > 0:
+            for letter in letters[:count]:
+                seats.append((f"{row}{letter}", cls))
+            count -= len(letters)
+            row += 1
+    return seats
+
+seat_maps = SeatMapCache()
@@ -0,0 +1,127 @@
+# backend/simulator.py
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+
+from backend.crud import notify_occupancy_changed
+from backend.db_config import get_session
+from backend.utils import to_datetime64_utc
+
+FLIGHTS_SQL = """
+SELECT f.flight_id, f.route_id, f.departure_time, COALESCE(a.total_capacity, 150) AS total_capacity
+FROM Flight f
+LEFT JOIN Aircraft a ON a.aircraft_id = f.aircraft_id
+WHERE f.status <> 'cancelled'
+ORDER BY f.flight_id
+"""
+
+# Capacity-checked so simulated demand can never oversell a flight that real bookings are also filling;
+# flights cancelled since the schedule was loaded are skipped
+APPLY_BOOKINGS_SQL = """
+UPDATE Flight SET current_occupancy = current_occupancy + :n
+WHERE flight_id = :fid AND current_occupancy + :n <= :capacity AND status <> 'cancelled'
+"""
+
+_US_PER_DAY = 86_400_000_000
+
+class DemandSimulator:
+    """
+    Background demand: each tick draws seat bookings for every flight in one NumPy call and applies
+    them with a single executemany UPDATE.
+
+    arrival_model:
+      "poisson"  - Poisson arrivals whose rate rises as departure nears:
+                   base_rate * (floor + exp(-days_to_departure / decay_days)) * route popularity
+      "uniform"  - 0..max_per_tick seats per flight per tick (the original simulator's behaviour)
+    route_popularity maps route_id -> rate multiplier (default 1.0).
+    Static flight data (ids, routes, departures, capacities) is cached and reloaded every refresh_every ticks.
+    """
+
+    def __init__(self, arrival_model: str = "poisson", base_rate: float = 0.5, decay_days: float = 14.0,
+                 floor: float = 0.05, max_per_tick: int = 3, route_popularity: dict = None,
+                 refresh_every: int = 30, seed: int = None):
+        if arrival_model not in ("poisson", "uniform"):
+            raise ValueError(f"Unknown arrival model: {arrival_model}")
+        self.arrival_model = arrival_model
+        self.base_rate = base_rate
+        self.decay_days = decay_days
+        self.floor = floor
+        self.max_per_tick = max_per_tick
+        self.route_popularity = route_popularity or {}
+        self.refresh_every = refresh_every
+        self.rng = np.random.default_rng(seed)
+        self._flight_ids = None
+        self._ticks_since_refresh = 0
+        self.metrics = {"ticks": 0, "last_tick_seconds": 0.0, "max_tick_seconds": 0.0, "total_tick_seconds": 0.0,
+                        "last_flights": 0, "last_seats_booked": 0, "total_seats_booked": 0}
+
+    def refresh(self, session):
+        """(Re)load the static per-flight arrays."""
+        rows = session.execute(text(FLIGHTS_SQL)).fetchall()
+        flight_ids, route_ids, departures, capacities = zip(*rows) if rows else ((), (), (), ())
+        self._flight_ids = np.array(flight_ids, dtype=np.int64)
+        self._departures = to_datetime64_utc(departures)
+        self._capacity = np.array(capacities, dtype=np.int64)
+        self._popularity = np.array([self.route_popularity.get(r, 1.0) for r in route_ids], dtype=np.float64)
+        self._ticks_since_refresh = 0
+
+    def draw(self, occupancy: np.ndarray, now: datetime = None) -> np.ndarray:
+        """Seats booked this tick per flight, clipped to remaining capacity; departed flights get none."""
+        days = (self._departures - np.datetime64(now or datetime.utcnow(), "us")).astype(np.int64) / _US_PER_DAY
+        if self.arrival_model == "poisson":
+            lam = self.base_rate * (self.floor + np.exp(-np.maximum(days, 0.0) / self.decay_days)) * self._popularity
+            seats = self.rng.poisson(lam)
+        else:
+            seats = self.rng.integers(0, self.max_per_tick + 1, size=len(occupancy))
+        seats[days < 0] = 0
+        return np.minimum(seats, np.maximum(self._capacity - occupancy, 0))
+
+    def tick(self):
+        """One simulation step; returns the flight ids whose occupancy changed."""
+        t0 = time.perf_counter()
+        session = get_session()
+        try:
+            with session.begin():
+                if self._flight_ids is None or self._ticks_since_refresh >= self.refresh_every:
+                    self.refresh(session)
+                self._ticks_since_refresh += 1
+
+                occ_rows = session.execute(text("SELECT flight_id, current_occupancy, status FROM Flight")).fetchall()
+                occupancy = np.zeros(len(self._flight_ids), dtype=np.int64)
+                if occ_rows:
+                    ids = np.fromiter((r[0] for r in occ_rows), dtype=np.int64, count=len(occ_rows))
+                    occ = np.fromiter((int(r[1] or 0) for r in occ_rows), dtype=np.int64, count=len(occ_rows))
+                    cancelled = np.fromiter((r[2] == "cancelled" for r in occ_rows), dtype=bool, count=len(occ_rows))
+                    pos = np.searchsorted(self._flight_ids, ids)
+                    known = (pos < len(self._flight_ids)) & (self._flight_ids[np.minimum(pos, len(self._flight_ids) - 1)] == ids)
+                    occupancy[pos[known]] = occ[known]
+                    # cancelled after the last refresh: count as full so no seats are drawn for it
+                    closed = pos[known & cancelled]
+                    occupancy[closed] = self._capacity[closed]
+
+                seats = self.draw(occupancy)
+                changed = np.flatnonzero(seats)
+                if len(changed):
+                    session.execute(text(APPLY_BOOKINGS_SQL), [
+                        {"n": int(n), "fid": int(fid), "capacity": int(cap)}
+                        for n, fid, cap in zip(seats[changed], self._flight_ids[changed], self._capacity[changed])
+                    ])
+        finally:
+            session.close()
+
+        changed_ids = self._flight_ids[changed].tolist()
+        if changed_ids:
+            notify_occupancy_changed(changed_ids)
+
+        elapsed = time.perf_counter() - t0
+        m = self.metrics
+        m["ticks"] += 1
+        m["last_tick_seconds"] = elapsed
+        m["max_tick_seconds"] = max(m["max_tick_seconds"], elapsed)
+        m["total_tick_seconds"] += elapsed
+        m["last_flights"] = len(self._flight_ids)
+        m["last_seats_booked"] = int(seats.sum())
+        m["total_seats_booked"] += int(seats.sum())
+        return changed_ids
@@ -0,0 +1,36 @@
+# backend/utils.py
+from datetime import datetime, timezone
+from functools import lru_cache
+import numpy as np
+
+def to_utc_naive(value):
+    """
+    Normalise a departure_time value to a naive UTC datetime.
+    SQLite hands back ISO strings (possibly with an offset), Postgres hands back aware datetimes;
+    the pricing engine compares against datetime.utcnow(), so both are converted to naive UTC.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@lru_cache(maxsize=64)
+def _offset_minutes(suffix: str) -> int:
+    if not suffix or suffix == "Z":
+        return 0
+    sign = -1 if suffix[0] == "-" else 1
+    return sign * (int(suffix[1:3]) * 60 + int(suffix[4:6]))
+
+def to_datetime64_utc(values) -> np.ndarray:
+    """
+    Vectorised to_utc_naive for a whole departure_time column, as datetime64[us].
+    'YYYY-MM-DD HH:MM:SS[+HH:MM]' strings (SQLite) are parsed by NumPy in one go; anything else
+    (datetimes from Postgres, fractional seconds) goes through to_utc_naive row by row.
+    """
+    values = list(values)
+    if values and all(isinstance(v, str) and (len(v) == 19 or (len(v) == 25 and v[19] in "+-")) for v in values):
+        local = np.array([v[:10] + "T" + v[11:19] for v in values], dtype="datetime64[us]")
+        minutes = np.array([_offset_minutes(v[19:]) for v in values], dtype=np.int64)
+        return local - minutes.astype("timedelta64[m]")
+    return np.array([to_utc_naive(v) for v in values], dtype="datetime64[us]")
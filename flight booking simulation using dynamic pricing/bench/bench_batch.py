@@ -0,0 +1,45 @@
+# bench/bench_batch.py
+# Bookings/sec: looping over POST /book_multi vs POST /book_batch, in-process over ASGI.
+#   python -m bench.bench_batch --bookings 2000 --batch-size 200
+import argparse, asyncio, tempfile, time
+from pathlib import Path
+
+import httpx
+
+from bench.common import build_sqlite_db, use_database
+
+def booking(i):
+    return {"flight_id": 1 + i % 20, "passengers": [{"name": f"Agency {i}", "age": 30}], "simulate_payment": False}
+
+async def run(app, bookings: int, batch_size: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        ok = 0
+        for i in range(bookings):
+            ok += (await client.post("/book_multi", json=booking(i))).status_code == 200
+        loop_elapsed, loop_ok = time.perf_counter() - t0, ok
+
+        t0 = time.perf_counter()
+        ok = 0
+        for start in range(0, bookings, batch_size):
+            body = {"bookings": [booking(i) for i in range(start, min(start + batch_size, bookings))]}
+            resp = await client.post("/book_batch", json=body)
+            ok += resp.json()["confirmed"] if resp.status_code == 200 else 0
+        batch_elapsed, batch_ok = time.perf_counter() - t0, ok
+    return loop_elapsed, loop_ok, batch_elapsed, batch_ok
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    from backend import api
+    use_database(build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "batch.db"))
+    loop_s, loop_ok, batch_s, batch_ok = asyncio.run(run(api.app, args.bookings, args.batch_size))
+    print(f"/book_multi loop : {loop_ok:>6} confirmed in {loop_s:7.2f}s  {loop_ok / loop_s:9.1f} bookings/sec")
+    print(f"/book_batch x{args.batch_size:<4}: {batch_ok:>6} confirmed in {batch_s:7.2f}s  {batch_ok / batch_s:9.1f} bookings/sec")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench/bench_booking_lookup.py
+# PNR lookups/sec: the old two-query path (Booking row + latest receipt + json.loads) vs. the
+# BookingView read model (one primary-key read) vs. booking_cache hits, plus GET /booking over ASGI.
+#   python -m bench.bench_booking_lookup --bookings 2000
+import argparse, asyncio, json, random, tempfile, time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import text
+
+from bench.common import build_sqlite_db, percentiles, use_database
+
+def old_lookup(session, pnr):
+    row = session.execute(text("SELECT * FROM Booking WHERE pnr_code = :pnr"), {"pnr": pnr}).fetchone()
+    booking = dict(row._mapping)
+    rec = session.execute(text("SELECT payload_json FROM receipts WHERE booking_id = :bid ORDER BY receipt_id DESC LIMIT 1"),
+                          {"bid": booking["booking_id"]}).fetchone()
+    return {"booking": booking, "receipt": json.loads(rec.payload_json) if rec else None}
+
+def timed(fn, pnrs):
+    t0 = time.perf_counter()
+    for pnr in pnrs:
+        fn(pnr)
+    return len(pnrs) / (time.perf_counter() - t0)
+
+async def http_lookups(app, pnrs):
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for pnr in pnrs:
+            t0 = time.perf_counter()
+            assert (await client.get(f"/booking/{pnr}")).status_code == 200
+            samples.append(time.perf_counter() - t0)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+
+    from backend import api, crud
+    from backend.cache import booking_cache
+    from backend.db_config import get_session
+    use_database(build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "lookup.db"))
+    api.startup()
+    reqs = [{"flight_id": 1 + i % 17, "passengers": [{"name": f"Guest {i}", "age": 30}, {"name": f"Guest {i}b"}], "simulate_payment": False}
+            for i in range(args.bookings)]
+    pnrs = []
+    for start in range(0, len(reqs), 200):
+        pnrs += [r["pnr"] for r in crud.book_batch(reqs[start:start + 200]) if r["status"] == "confirmed"]
+    sample = random.Random(1).choices(pnrs, k=args.lookups)
+
+    session = get_session()
+    try:
+        old = timed(lambda pnr: old_lookup(session, pnr), sample)
+        view = timed(lambda pnr: crud._booking_view_tx(session, pnr), sample)
+    finally:
+        session.close()
+    booking_cache.clear()
+    cached = timed(crud.get_booking, sample)
+    print(f"Booking + receipts queries : {old:10.0f} lookups/sec")
+    print(f"BookingView primary key    : {view:10.0f} lookups/sec")
+    print(f"booking_cache (cold start) : {cached:10.0f} lookups/sec  {booking_cache.stats()}")
+    p = percentiles(asyncio.run(http_lookups(api.app, sample[:1000])))
+    print(f"GET /booking/{{pnr}}         : p50 {p['p50']:.2f} ms  p95 {p['p95']:.2f} ms  p99 {p['p99']:.2f} ms")
+    api.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench/bench_cancel.py
+# Mass cancellation of a sold-out 400-seat flight: one /cancel-style transaction per PNR vs. a single
+# set-based cancel_flight, checking that seats, occupancy, refunds and caches all come back consistent.
+#   python -m bench.bench_cancel --party-size 2
+import argparse, tempfile, time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from bench.common import build_sqlite_db, use_database
+
+CAPACITY = 400
+
+def add_flight(engine) -> int:
+    from backend.seat_map import seat_layout
+    with engine.begin() as conn:
+        aircraft_id = conn.execute(text("INSERT INTO Aircraft (model, total_capacity) VALUES ('Bench 400', :cap)"), {"cap": CAPACITY}).lastrowid
+        flight_id = conn.execute(text("INSERT INTO Flight (flight_number, route_id, aircraft_id, departure_time, base_price) "
+                                      "VALUES ('BN400', 1, :aid, '2030-01-15 08:00:00+00:00', 5000.00)"), {"aid": aircraft_id}).lastrowid
+        conn.execute(text("INSERT INTO Seat (flight_id, seat_number, class, is_booked) VALUES (:fid, :num, :cls, FALSE)"),
+                     [{"fid": flight_id, "num": num, "cls": cls} for num, cls in seat_layout(CAPACITY)])
+    return flight_id
+
+def sell_out(flight_id: int, party_size: int):
+    from backend import crud
+    reqs = [{"flight_id": flight_id, "passengers": [{"name": f"Pax {i}-{k}"} for k in range(party_size)], "simulate_payment": False}
+            for i in range(CAPACITY // party_size)]
+    pnrs = []
+    for start in range(0, len(reqs), 100):
+        pnrs += [r["pnr"] for r in crud.book_batch(reqs[start:start + 100]) if r["status"] == "confirmed"]
+    return pnrs
+
+def check(engine, flight_id: int):
+    from backend import crud
+    from backend.seat_map import seat_maps
+    with engine.connect() as conn:
+        occ = conn.execute(text("SELECT current_occupancy FROM Flight WHERE flight_id = :fid"), {"fid": flight_id}).scalar()
+        taken = conn.execute(text("SELECT COUNT(*) FROM Seat WHERE flight_id = :fid AND is_booked"), {"fid": flight_id}).scalar()
+        live = conn.execute(text("SELECT COUNT(*) FROM Booking WHERE flight_id = :fid AND status = 'confirmed'"), {"fid": flight_id}).scalar()
+        refunds = conn.execute(text("SELECT COUNT(*), SUM(amount) FROM Refund")).fetchone()
+    fare = crud.search_flights("DEL", "BOM", limit=500)
+    avail = next((f"{f['available_seats']} free" for f in fare if f["flight_id"] == flight_id), "no flight")
+    return (f"occupancy {occ}, seats booked {taken}, live bookings {live}, refunds {refunds[0]} ({refunds[1]:.2f}), "
+            f"search shows {avail}, seat map {sum(seat_maps.get(flight_id).availability().values())} free")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--party-size", type=int, default=2)
+    args = parser.parse_args()
+
+    from backend import cancellation
+    from backend.db_config import init_db
+    engine = use_database(build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "cancel.db"))
+    init_db()
+    flight_id = add_flight(engine)
+
+    pnrs = sell_out(flight_id, args.party_size)
+    t0 = time.perf_counter()
+    for pnr in pnrs:
+        cancellation.cancel_bookings([pnr])
+    loop_s = time.perf_counter() - t0
+    print(f"per-PNR cancel   : {len(pnrs)} bookings in {loop_s * 1000:8.1f} ms  -> {check(engine, flight_id)}")
+
+    pnrs = sell_out(flight_id, args.party_size)
+    t0 = time.perf_counter()
+    results = cancellation.cancel_flight(flight_id)
+    flight_s = time.perf_counter() - t0
+    print(f"cancel_flight    : {len(results)} bookings in {flight_s * 1000:8.1f} ms  -> {check(engine, flight_id)}")
+    print(f"speed-up {loop_s / flight_s:.1f}x")
+
+if __name__ == "__main__":
+    main()
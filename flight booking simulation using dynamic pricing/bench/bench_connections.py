@@ -0,0 +1,63 @@
+# bench/bench_connections.py
+# Connection search on a synthetic schedule (bench/synth.py): route graph build time, the cost of
+# re-reading dirty flights, and k-cheapest / k-fastest itinerary queries with up to two stops
+# between random airport pairs.
+#   python -m bench.bench_connections --routes 2000 --flights 100000 --queries 2000
+import argparse, random, shutil, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bench.common import percentiles, use_database
+from bench.run import CACHE_DIR
+from bench.synth import cached_synthesize
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=2_000)
+    parser.add_argument("--flights", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-stops", type=int, default=2)
+    args = parser.parse_args()
+
+    pristine = CACHE_DIR / f"synth-{args.routes}-{args.flights}-{args.seed}.db"
+    synth = cached_synthesize(pristine, routes=args.routes, flights=args.flights, seat_flights=2_000, seed=args.seed)
+    db_path = Path(tempfile.mkdtemp(prefix="flightbench-")) / "run.db"
+    shutil.copyfile(pristine, db_path)
+    use_database(db_path)
+
+    from backend import route_graph as rg
+    t0 = time.perf_counter()
+    schedule = rg.route_graph.build()
+    print(f"graph build: {len(schedule.ids):,} flights, {len(schedule.airports)} airports in {time.perf_counter() - t0:.2f}s")
+
+    rng = random.Random(args.seed)
+    dirty = rng.sample(list(schedule.ids), 100)
+    rg.route_graph.mark_dirty(dirty)
+    t0 = time.perf_counter()
+    rg.route_graph.snapshot()
+    print(f"dirty refresh (100 flights): {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+    anchor = datetime.fromisoformat(synth["anchor"]).date()
+    pairs = [tuple(rng.sample(schedule.airports, 2)) for _ in range(args.queries)]
+    days = [anchor + timedelta(days=rng.randrange(80)) for _ in range(args.queries)]
+    for sort in ("price", "duration"):
+        samples, found, stops, expansions = [], 0, 0, []
+        for (o, d), day in zip(pairs, days):
+            s = time.perf_counter()
+            results = rg.find_connections(o, d, day, k=args.k, sort=sort, max_stops=args.max_stops)
+            samples.append(time.perf_counter() - s)
+            found += len(results)
+            stops += sum(r["stops"] for r in results)
+            # the search alone (no re-pricing), for its expansion count
+            start = rg._minutes(datetime.combine(day, datetime.min.time()))
+            expansions.append(rg._search(schedule, schedule.index[o], schedule.index[d], start, start + 24 * 60, args.k, sort,
+                                         args.max_stops, 1, rg.MIN_CONNECTION_MINUTES, rg.MAX_CONNECTION_MINUTES)[1])
+        p = percentiles(samples)
+        print(f"sort={sort:8} p50 {p['p50']:7.3f} ms  p95 {p['p95']:7.3f} ms  p99 {p['p99']:7.3f} ms  "
+              f"itineraries/query {found / args.queries:.2f}  stops/itinerary {stops / max(found, 1):.2f}  "
+              f"expansions p50 {sorted(expansions)[len(expansions) // 2]} max {max(expansions)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench/bench_fare_calendar.py
+# Fare calendar on a synthetic schedule (bench/synth.py): 60 days of cheapest fares per route from
+# the in-memory cells (first request of a demand window and repeat requests) against 60 per-day
+# crud.search_flights calls, the cost of the incremental update after a booking, and a check that
+# every cell matches the cheapest bookable flight /search returns for that day.
+#   python -m bench.bench_fare_calendar --routes 2000 --flights 100000 --queries 500
+import argparse, random, shutil, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bench.common import percentiles, use_database
+from bench.run import CACHE_DIR
+from bench.synth import cached_synthesize
+
+DAYS = 60
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        s = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - s)
+    return percentiles(samples)
+
+def report(name, p):
+    print(f"{name:40} p50 {p['p50']:8.3f} ms  p95 {p['p95']:8.3f} ms  p99 {p['p99']:8.3f} ms")
+
+def search_calendar(origin, destination, day):
+    """The per-day alternative: one search per date."""
+    from backend import crud
+    out = []
+    for i in range(DAYS):
+        d = day + timedelta(days=i)
+        fares = [r["dynamic_fare"] for r in crud.search_flights(origin, destination, d, d, limit=500) if r["available_seats"] > 0]
+        out.append(min(fares) if fares else None)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=2_000)
+    parser.add_argument("--flights", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=200)
+    args = parser.parse_args()
+
+    pristine = CACHE_DIR / f"synth-{args.routes}-{args.flights}-{args.seed}.db"
+    synth = cached_synthesize(pristine, routes=args.routes, flights=args.flights, seat_flights=2_000, seed=args.seed)
+    db_path = Path(tempfile.mkdtemp(prefix="flightbench-")) / "run.db"
+    shutil.copyfile(pristine, db_path)
+    use_database(db_path)
+
+    from backend import crud
+    from backend.cache import search_cache
+    from backend.fare_calendar import fare_calendar, fare_calendar_for
+    from backend.route_graph import route_graph
+    schedule = route_graph.build()
+    rng = random.Random(args.seed)
+    anchor = datetime.fromisoformat(synth["anchor"]).date()
+    routes = sorted({(schedule.airports[o], schedule.airports[d]) for o, d in zip(schedule.origin, schedule.dest)})
+    queries = [(*rng.choice(routes), anchor + timedelta(days=rng.randrange(30)), DAYS) for _ in range(args.queries)]
+
+    report("fare_calendar (first in window)", timed(fare_calendar_for, queries))
+    report("fare_calendar (repeat)", timed(fare_calendar_for, queries))
+    search_cache.clear()
+    report(f"{DAYS} x crud.search_flights", timed(search_calendar, [q[:3] for q in queries[:max(1, args.queries // 10)]]))
+
+    # bookings on the seat-map flights, then the calendar of each booked flight's route
+    lo, hi = synth["seat_flight_ids"]
+    samples = []
+    for i in range(args.bookings):
+        fid = rng.randint(lo, hi)
+        crud.book_multi({"flight_id": fid, "simulate_payment": False, "passengers": [{"name": f"Bench {i}", "age": 30}]})
+        row = schedule.row_of(fid)
+        o, d = schedule.airports[schedule.origin[row]], schedule.airports[schedule.dest[row]]
+        s = time.perf_counter()
+        fare_calendar_for(o, d, anchor, DAYS)
+        samples.append(time.perf_counter() - s)
+    report("fare_calendar after a booking", percentiles(samples))
+    print(f"calendar stats: {fare_calendar.stats()}")
+
+    search_cache.clear()
+    mismatches = 0
+    for o, d, day, _ in queries[:50]:
+        cells = [c["min_fare"] for c in fare_calendar_for(o, d, day, DAYS)["days"]]
+        mismatches += sum(1 for a, b in zip(cells, search_calendar(o, d, day)) if a != b)
+    print(f"cells differing from /search: {mismatches} of {50 * DAYS}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench/bench_fare_stream.py
+# Fare stream fan-out on a synthetic schedule (bench/synth.py): --streams open subscriptions, each
+# watching --flights-per-stream seat-map flights, while bookings land on those flights. Reports the
+# delay from a booking request to its update reaching each subscriber, and the events sent
+# against the /search calls the same browser tabs would make polling every --poll-seconds.
+#   python -m bench.bench_fare_stream --streams 1000 --bookings 300
+import argparse, asyncio, random, shutil, tempfile, threading, time
+from pathlib import Path
+
+from bench.common import percentiles, use_database
+from bench.run import CACHE_DIR
+from bench.synth import cached_synthesize
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=2_000)
+    parser.add_argument("--flights", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--streams", type=int, default=1_000)
+    parser.add_argument("--flights-per-stream", type=int, default=10)
+    parser.add_argument("--bookings", type=int, default=300)
+    parser.add_argument("--poll-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    pristine = CACHE_DIR / f"synth-{args.routes}-{args.flights}-{args.seed}.db"
+    synth = cached_synthesize(pristine, routes=args.routes, flights=args.flights, seat_flights=2_000, seed=args.seed)
+    db_path = Path(tempfile.mkdtemp(prefix="flightbench-")) / "run.db"
+    shutil.copyfile(pristine, db_path)
+    use_database(db_path)
+
+    from backend import crud
+    from backend.fare_stream import fare_publisher
+    from backend.route_graph import route_graph
+    route_graph.build()
+    fare_publisher.start()
+    rng = random.Random(args.seed)
+    lo, hi = synth["seat_flight_ids"]
+    watched = rng.sample(range(lo, hi + 1), min(200, hi - lo + 1))  # a popular subset, as on a busy search page
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        subs = [fare_publisher.subscribe(rng.sample(watched, args.flights_per_stream), loop) for _ in range(args.streams)]
+        fare_publisher.current(watched)  # what each stream's first event carries; deltas are sent against it
+        received, delays, booked_at = [0], [], {}
+
+        async def reader(sub):
+            while True:
+                for update in await sub.next_batch(1.0):
+                    received[0] += 1
+                    t = booked_at.get(update["flight_id"])
+                    if t is not None:
+                        delays.append(time.perf_counter() - t)
+
+        readers = [asyncio.create_task(reader(s)) for s in subs]
+
+        def book():
+            for i in range(args.bookings):
+                fid = rng.choice(watched)
+                booked_at[fid] = time.perf_counter()
+                crud.book_multi({"flight_id": fid, "simulate_payment": False, "passengers": [{"name": f"Bench {i}", "age": 30}]})
+                time.sleep(0.005)
+
+        t0 = time.perf_counter()
+        booker = threading.Thread(target=book)
+        booker.start()
+        while booker.is_alive():
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(1.0)
+        elapsed = time.perf_counter() - t0
+        for r in readers:
+            r.cancel()
+        for sub in subs:
+            fare_publisher.unsubscribe(sub)
+        return received[0], delays, elapsed
+
+    received, delays, elapsed = asyncio.run(run())
+    fare_publisher.stop()
+    p = percentiles(delays)
+    polls = args.streams * elapsed / args.poll_seconds
+    print(f"{args.streams} streams x {args.flights_per_stream} flights, {args.bookings} bookings in {elapsed:.1f}s")
+    print(f"booking request -> subscriber  p50 {p['p50']:.2f} ms  p95 {p['p95']:.2f} ms  p99 {p['p99']:.2f} ms")
+    print(f"events delivered: {received:,}  vs  /search polls at {args.poll_seconds:g}s: {polls:,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# bench/bench_io_modes.py
+# Sync (threadpool) vs async engine for /search and /book_multi, driven in-process over ASGI.
+#   python -m bench.bench_io_modes --clients 100 500 1000 --requests 2000
+import argparse, asyncio, tempfile, time
+from pathlib import Path
+
+import httpx
+
+from bench.common import build_sqlite_db, percentiles, use_database
+
+async def drive(app, clients: int, total: int, make_request):
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for i in remaining:
+                t0 = time.perf_counter()
+                resp = await make_request(client, i)
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code != 200:
+                    errors += 1
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+    return {"rps": total / elapsed, "errors": errors, **percentiles(latencies)}
+
+def search_request(client, i):
+    return client.get("/search", params={"origin": "DEL"})
+
+def book_request(client, i):
+    payload = {"flight_id": 1 + i % 20, "passengers": [{"name": f"Bench {i}"}], "simulate_payment": False}
+    return client.post("/book_multi", json=payload)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    from backend import api
+    workdir = Path(tempfile.mkdtemp(prefix="flightbench-"))
+    for endpoint, make_request in (("search", search_request), ("book_multi", book_request)):
+        for mode in ("sync", "async"):
+            for clients in args.clients:
+                use_database(build_sqlite_db(workdir / "bench.db"))
+                api.DB_IO_MODE = mode
+                r = asyncio.run(drive(api.app, clients, args.requests, make_request))
+                print(f"{endpoint:<10} {mode:<5} clients={clients:<5} rps={r['rps']:8.1f}  "
+                      f"p50={r['p50']:7.1f}ms p95={r['p95']:7.1f}ms p99={r['p99']:7.1f}ms  errors={r['errors']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# bench/bench_metrics.py
+# Overhead of the /metrics instrumentation: GET /booking/{pnr} latency over ASGI with and without
+# MetricsMiddleware (engine statement listeners stay attached in both runs), plus /metrics render time.
+#   python -m bench.bench_metrics --requests 3000
+import argparse, asyncio, tempfile, time
+from pathlib import Path
+
+import httpx
+
+from bench.common import build_sqlite_db, percentiles, use_database
+
+async def lookups(app, pnrs):
+    samples = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for pnr in pnrs:
+            t0 = time.perf_counter()
+            assert (await client.get(f"/booking/{pnr}")).status_code == 200
+            samples.append(time.perf_counter() - t0)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    from backend import api, crud
+    from backend.cache import booking_cache
+    from backend.metrics import MetricsMiddleware, render_metrics
+    use_database(build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "metrics.db"))
+    api.startup()
+    reqs = [{"flight_id": 1 + i % 17, "passengers": [{"name": f"Guest {i}"}], "simulate_payment": False} for i in range(500)]
+    pnrs = [r["pnr"] for r in crud.book_batch(reqs) if r["status"] == "confirmed"]
+    sample = (pnrs * (args.requests // len(pnrs) + 1))[:args.requests]
+
+    # call MetricsMiddleware directly vs. the app it wraps (exception handling + router)
+    instrumented = api.app.build_middleware_stack()
+    while not isinstance(instrumented, MetricsMiddleware):
+        instrumented = instrumented.app
+    asyncio.run(lookups(instrumented.app, sample))  # warm-up
+    for label, app in (("without middleware", instrumented.app), ("with middleware", instrumented)):
+        booking_cache.clear()
+        p = percentiles(asyncio.run(lookups(app, sample)))
+        print(f"{label:20}: p50 {p['p50']:.3f} ms  p95 {p['p95']:.3f} ms  p99 {p['p99']:.3f} ms")
+    t0 = time.perf_counter()
+    body = render_metrics()
+    print(f"render_metrics      : {(time.perf_counter() - t0) * 1000:.2f} ms, {len(body.splitlines())} lines")
+    api.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# bench/bench_pnr.py
+# PNR issue rate and a uniqueness check over many codes.
+#   python -m bench.bench_pnr --codes 10000000 --threads 8
+import argparse, itertools, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend.pnr import PnrGenerator, is_valid_pnr
+
+def in_memory_allocator():
+    """Stand-in for the PnrBlock table: hands out consecutive blocks, like the DB row would."""
+    counter, lock = itertools.count(), threading.Lock()
+    def allocate(size):
+        with lock:
+            return next(counter) * size
+    return allocate
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--codes", type=int, default=10_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--block-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    gen = PnrGenerator(in_memory_allocator(), block_size=args.block_size)
+    per_thread = args.codes // args.threads
+
+    def issue(_):
+        out = np.empty(per_thread, dtype="S6")
+        for i in range(per_thread):
+            out[i] = gen.next()
+        return out
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        codes = np.concatenate(list(pool.map(issue, range(args.threads))))
+    elapsed = time.perf_counter() - t0
+
+    duplicates = len(codes) - len(np.unique(codes))
+    sample = codes[:: max(1, len(codes) // 10_000)]
+    invalid = sum(not is_valid_pnr(c.decode()) for c in sample)
+    print(f"codes={len(codes):,} threads={args.threads} elapsed={elapsed:.2f}s codes/sec={len(codes) / elapsed:,.0f}")
+    print(f"duplicates={duplicates} invalid_check_chars_in_sample={invalid}")
+
+if __name__ == "__main__":
+    main()
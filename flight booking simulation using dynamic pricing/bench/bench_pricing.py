@@ -0,0 +1,53 @@
+# bench/bench_pricing.py
+# Scalar vs batch fare engine. Run from the project root:
+#   python -m bench.bench_pricing --sizes 10000 1000000
+import argparse, time
+from datetime import datetime
+
+import numpy as np
+
+from backend.pricing_engine import calculate_dynamic_fare, calculate_dynamic_fares
+
+def make_inputs(n: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    capacities = rng.choice([78, 180, 189, 220, 290, 396, 550], size=n)
+    inputs = {
+        "base_prices": np.round(rng.uniform(2500, 22000, size=n), 2),
+        "total_seats": capacities,
+        "booked_seats": (capacities * rng.uniform(0, 1, size=n)).astype(np.int64),
+        "departure_ts": np.datetime64(now, "us") + rng.integers(0, 90 * 86_400_000_000, size=n).astype("timedelta64[us]"),
+        "demand_levels": rng.choice(["low", "medium", "high"], size=n).astype(object),
+    }
+    return inputs, now
+
+def run_scalar(inputs, now):
+    deps = inputs["departure_ts"].astype(datetime)
+    return [
+        calculate_dynamic_fare(float(b), int(t), int(k), d, l, now=now)
+        for b, t, k, d, l in zip(inputs["base_prices"], inputs["total_seats"], inputs["booked_seats"], deps, inputs["demand_levels"])
+    ]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        inputs, now = make_inputs(n)
+
+        t0 = time.perf_counter()
+        scalar = run_scalar(inputs, now)
+        t_scalar = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        batch = calculate_dynamic_fares(now=now, **inputs)
+        t_batch = time.perf_counter() - t0
+
+        # the batch engine must agree bit-for-bit with the scalar one
+        mismatches = int(np.count_nonzero(np.asarray(scalar) != batch))
+        print(f"n={n:>9,}  scalar={t_scalar:8.3f}s  batch={t_batch:8.3f}s  "
+              f"speedup={t_scalar / t_batch:6.1f}x  mismatches={mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench/bench_receipts.py
+# GET /receipt/{pnr} latency: inline reportlab render per request (the old path) vs. pre-rendered
+# receipts from the store, plus revalidation with If-None-Match, in-process over ASGI.
+#   python -m bench.bench_receipts --bookings 300
+import argparse, asyncio, tempfile, time
+from pathlib import Path
+
+import httpx
+
+from bench.common import build_sqlite_db, percentiles, use_database
+
+async def run(app, bookings: int):
+    from backend import crud, receipts
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        pnrs = []
+        for i in range(bookings):
+            # flight 18 flies the 9-seat Cessna Caravan; stay on flights 1-17 so long runs don't sell out
+            body = {"flight_id": 1 + i % 17, "passengers": [{"name": f"Guest {i}", "age": 40, "passport": f"P{i:07d}"}] * 2,
+                    "simulate_payment": False}
+            pnrs.append((await client.post("/book_multi", json=body)).json()["pnr"])
+
+        inline = []
+        for pnr in pnrs:
+            t0 = time.perf_counter()
+            receipts.render_receipt_pdf(crud.receipt_payload(pnr))
+            inline.append(time.perf_counter() - t0)
+
+        while receipts._pending:  # let the pre-render queue drain
+            await asyncio.sleep(0.05)
+        served, etags = [], {}
+        for pnr in pnrs:
+            t0 = time.perf_counter()
+            resp = await client.get(f"/receipt/{pnr}")
+            served.append(time.perf_counter() - t0)
+            etags[pnr] = resp.headers["etag"]
+
+        revalidated, not_modified = [], 0
+        for pnr in pnrs:
+            t0 = time.perf_counter()
+            resp = await client.get(f"/receipt/{pnr}", headers={"If-None-Match": etags[pnr]})
+            revalidated.append(time.perf_counter() - t0)
+            not_modified += resp.status_code == 304
+    return inline, served, revalidated, not_modified
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=300)
+    args = parser.parse_args()
+
+    from backend import api, receipts
+    use_database(build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "receipts.db"))
+    api.startup()
+    try:
+        inline, served, revalidated, not_modified = asyncio.run(run(api.app, args.bookings))
+    finally:
+        api.shutdown()
+    for label, samples in (("inline render  ", inline), ("pre-rendered   ", served), ("If-None-Match  ", revalidated)):
+        p = percentiles(samples)
+        print(f"{label}: p50 {p['p50']:7.2f} ms  p95 {p['p95']:7.2f} ms  p99 {p['p99']:7.2f} ms")
+    print(f"304 responses: {not_modified}/{len(revalidated)}; store {receipts.receipt_store.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench/bench_seats.py
+# Seat-level inventory on a full 550-seat A380 seat map: seat-map reads and adjacent-seat searches
+# from the in-memory bitmaps vs. scanning Seat rows, then concurrent bookings that must never share a seat.
+#   python -m bench.bench_seats --threads 16
+import argparse, random, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import text
+
+from bench.common import build_sqlite_db, use_database
+
+A380_FLIGHT = 10  # seed flight 6E100 flies the Airbus A380 (550 seats)
+
+def populate(engine, flight_id: int, capacity: int):
+    from backend.seat_map import seat_layout
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM Seat WHERE flight_id = :fid"), {"fid": flight_id})
+        conn.execute(text("INSERT INTO Seat (flight_id, seat_number, class, is_booked) VALUES (:fid, :num, :cls, FALSE)"),
+                     [{"fid": flight_id, "num": num, "cls": cls} for num, cls in seat_layout(capacity)])
+
+def scan_adjacent(engine, flight_id: int, n: int):
+    """The per-request alternative: read every free seat row and look for n in a row."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT seat_id, seat_number FROM Seat WHERE flight_id = :fid AND class = 'Economy' AND is_booked = FALSE"),
+                            {"fid": flight_id}).fetchall()
+    by_row = {}
+    for r in rows:
+        by_row.setdefault(int(r.seat_number[:-1]), []).append(r.seat_number[-1])
+    for row in sorted(by_row):
+        letters = sorted(by_row[row])
+        for i in range(len(letters) - n + 1):
+            if all(ord(letters[i + k]) - ord(letters[i]) == k for k in range(n)):
+                return [f"{row}{c}" for c in letters[i:i + n]]
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    from backend import crud
+    from backend.seat_map import seat_maps
+    engine = use_database(build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "seats.db"))
+    populate(engine, A380_FLIGHT, 550)
+    seat_maps.invalidate()
+
+    t0 = time.perf_counter()
+    for _ in range(args.lookups):
+        scan_adjacent(engine, A380_FLIGHT, 3)
+    scan_s = time.perf_counter() - t0
+    seat_maps.get(A380_FLIGHT)
+    t0 = time.perf_counter()
+    for _ in range(args.lookups):
+        seat_maps.pick_seats(A380_FLIGHT, [{}, {}, {}])
+    bitmap_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(args.lookups):
+        seat_maps.get(A380_FLIGHT).availability()
+    avail_s = time.perf_counter() - t0
+    print(f"adjacent x3, Seat scan : {args.lookups / scan_s:10.0f} lookups/sec")
+    print(f"adjacent x3, bitmap    : {args.lookups / bitmap_s:10.0f} lookups/sec")
+    print(f"class availability     : {args.lookups / avail_s:10.0f} lookups/sec")
+
+    rng = random.Random(7)
+    reqs = [{"flight_id": A380_FLIGHT, "passengers": [{"name": f"P{i}-{k}"} for k in range(rng.randint(1, 4))],
+             "seat_class": rng.choice([None, None, None, "Business"]), "simulate_payment": False} for i in range(400)]
+
+    def book(req):
+        try:
+            return crud.book_multi(req)["seats"]
+        except Exception:
+            return None
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        assigned = [s for s in pool.map(book, reqs) if s]
+    elapsed = time.perf_counter() - t0
+    seats = [num for s in assigned for num in s]
+    with engine.connect() as conn:
+        flagged = conn.execute(text("SELECT COUNT(*) FROM Seat WHERE flight_id = :fid AND is_booked"), {"fid": A380_FLIGHT}).scalar()
+        occupancy = conn.execute(text("SELECT current_occupancy FROM Flight WHERE flight_id = :fid"), {"fid": A380_FLIGHT}).scalar()
+    print(f"bookings: {len(assigned)} in {elapsed:.2f}s ({len(assigned) / elapsed:.0f}/sec), seats assigned {len(seats)}, "
+          f"distinct {len(set(seats))}, Seat.is_booked {flagged}, occupancy {occupancy}")
+    in_memory = seat_maps.get(A380_FLIGHT).availability()
+    seat_maps.invalidate(A380_FLIGHT)
+    print(f"in-memory map {in_memory} matches a fresh load from Seat: {in_memory == seat_maps.get(A380_FLIGHT).availability()}")
+
+if __name__ == "__main__":
+    main()
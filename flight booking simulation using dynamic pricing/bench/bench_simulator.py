@@ -0,0 +1,44 @@
+# bench/bench_simulator.py
+# Demand simulator tick time over a large synthetic schedule.
+#   python -m bench.bench_simulator --flights 100000 --ticks 5
+import argparse, sqlite3, tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from bench.common import build_sqlite_db, use_database
+
+def add_flights(db_path, n: int, seed: int = 7):
+    """Append n flights over the seed routes/aircraft, departing over the next 90 days."""
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM Flight WHERE flight_id > 20")
+    rows = ((f"SB{i:07d}", int(rng.integers(1, 21)), int(rng.integers(1, 21)),
+             (now + timedelta(minutes=int(m))).strftime("%Y-%m-%d %H:%M:%S+00:00"), float(p))
+            for i, m, p in zip(range(n), rng.integers(0, 90 * 24 * 60, size=n), rng.uniform(2500, 20000, size=n)))
+    conn.executemany("INSERT INTO Flight (flight_number, route_id, aircraft_id, departure_time, base_price) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flights", type=int, default=100_000)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--model", default="poisson", choices=["poisson", "uniform"])
+    args = parser.parse_args()
+
+    db_path = build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "sim.db")
+    add_flights(db_path, args.flights)
+    use_database(db_path)
+    from backend.simulator import DemandSimulator
+
+    sim = DemandSimulator(arrival_model=args.model, seed=1)
+    for _ in range(args.ticks):
+        sim.tick()
+        m = sim.metrics
+        print(f"tick {m['ticks']}: {m['last_tick_seconds'] * 1000:8.1f} ms  flights={m['last_flights']:,}  seats_booked={m['last_seats_booked']:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# bench/common.py
+# Shared helpers for the benchmark scripts: a throwaway SQLite database built from DB/db_schema.sql.
+import sqlite3, statistics
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_SQL = PROJECT_ROOT / "DB" / "db_schema.sql"
+
+def schema_script() -> str:
+    """db_schema.sql made SQLite-friendly: SERIAL keys become rowid aliases, example queries are dropped."""
+    sql = SCHEMA_SQL.read_text()
+    sql = sql.split("-- JOIN EXAMPLE")[0]
+    return sql.replace("SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY")
+
+def build_sqlite_db(path) -> Path:
+    """Create a fresh SQLite database at `path` with the schema and seed data."""
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(path)
+    conn.executescript(schema_script())
+    conn.commit()
+    conn.close()
+    return path
+
+def use_database(path):
+    """Point backend.db_config (sync and async engines) at the SQLite file at `path`."""
+    from backend import db_config
+    return db_config.bind_engines(f"sqlite:///{Path(path).resolve()}")
+
+def percentiles(samples):
+    """p50/p95/p99 in milliseconds for a list of latencies in seconds."""
+    if len(samples) < 2:
+        ms = samples[0] * 1000 if samples else 0.0
+        return {"p50": ms, "p95": ms, "p99": ms}
+    q = statistics.quantiles(samples, n=100)
+    return {"p50": q[49] * 1000, "p95": q[94] * 1000, "p99": q[98] * 1000}
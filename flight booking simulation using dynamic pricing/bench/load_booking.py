@@ -0,0 +1,53 @@
+# bench/load_booking.py
+# Fire thousands of concurrent bookings at a single flight and check nothing is oversold.
+#   python -m bench.load_booking --bookings 3000 --threads 64
+import argparse, sqlite3, tempfile, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from bench.common import build_sqlite_db, use_database
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=3000)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--flight-id", type=int, default=10)  # 6E100, an A380 (550 seats) in the seed data
+    parser.add_argument("--party-size", type=int, default=1)
+    args = parser.parse_args()
+
+    db_path = build_sqlite_db(Path(tempfile.mkdtemp(prefix="flightbench-")) / "load.db")
+    use_database(db_path)
+    from backend import crud
+
+    def book(i):
+        req = {"flight_id": args.flight_id, "passengers": [{"name": f"Load {i}.{p}"} for p in range(args.party_size)],
+               "simulate_payment": False}
+        try:
+            crud.book_multi(req)
+            return "ok"
+        except Exception as e:
+            return type(e).__name__ + (": sold out" if "seats available" in str(e) else "")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = Counter(pool.map(book, range(args.bookings)))
+    elapsed = time.perf_counter() - t0
+
+    conn = sqlite3.connect(db_path)
+    occupancy, capacity = conn.execute(
+        "SELECT f.current_occupancy, a.total_capacity FROM Flight f JOIN Aircraft a ON a.aircraft_id = f.aircraft_id WHERE f.flight_id = ?",
+        (args.flight_id,)).fetchone()
+    booked_rows = conn.execute("SELECT COUNT(*) FROM Booking WHERE flight_id = ? AND booking_id > 20", (args.flight_id,)).fetchone()[0]
+    conn.close()
+
+    confirmed = outcomes["ok"]
+    print(f"attempts={args.bookings} threads={args.threads} elapsed={elapsed:.2f}s "
+          f"attempts/sec={args.bookings / elapsed:.1f} confirmed/sec={confirmed / elapsed:.1f}")
+    print("outcomes:", dict(outcomes))
+    print(f"occupancy={occupancy} capacity={capacity} confirmed_seats={confirmed * args.party_size} booking_rows={booked_rows}")
+    oversold = occupancy > capacity or occupancy != confirmed * args.party_size or booked_rows != confirmed
+    print("OVERSOLD / INCONSISTENT" if oversold else "no overselling")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# bench/run.py
+# The benchmark suite. On a synthetic schedule (bench/synth.py, cached between runs) it runs
+# micro-benchmarks of calculate_dynamic_fare(s) and crud.search_flights, then drives the FastAPI app
+# in-process with concurrent clients for /search, /book_multi and /booking/{pnr}. Results go to JSON:
+# ops/sec, p50/p95/p99 latency and SQL statements per request, plus the commit and environment, so two
+# runs can be compared with --compare. By default results go to <cache dir>/results/<commit>.json,
+# outside the source tree (a results file there would mark later runs "dirty").
+#   python -m bench.run --routes 10000 --flights 1000000 --out /tmp/flightbench/results/HEAD.json
+#   python -m bench.run --compare /tmp/flightbench/results/<old>.json
+import argparse, asyncio, json, platform, random, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from bench.common import PROJECT_ROOT, percentiles, use_database
+from bench.synth import cached_synthesize
+
+CACHE_DIR = Path(tempfile.gettempdir()) / "flightbench"
+# (metric, True when bigger is better) checked by --compare
+COMPARED = (("ops_per_sec", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("statements_per_request", False))
+LATENCY_NOISE_MS = 0.05  # latency changes smaller than this are never reported as regressions
+
+def git_commit():
+    def git(*args):
+        out = subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        return out.stdout.strip() if out.returncode == 0 else None
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+def summarize(samples, elapsed, statements=None, errors=0, **extra):
+    p = percentiles(samples)
+    out = {"n": len(samples), "errors": errors, "ops_per_sec": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+           "p50_ms": round(p["p50"], 4), "p95_ms": round(p["p95"], 4), "p99_ms": round(p["p99"], 4),
+           "statements_per_request": round(statements / len(samples), 2) if statements is not None and samples else None}
+    out.update(extra)
+    return out
+
+def search_queries(db_path, n: int, anchor, rng):
+    """n (origin, destination, date_from, date_to) over random routes; about half carry a 3-day window."""
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    routes = conn.execute("SELECT origin_airport_code, destination_airport_code FROM Route").fetchall()
+    conn.close()
+    out = []
+    for _ in range(n):
+        o, d = rng.choice(routes)
+        if rng.random() < 0.5:
+            day = anchor + timedelta(days=rng.randrange(60))
+            out.append((o, d, day, day + timedelta(days=2)))
+        else:
+            out.append((o, d, None, None))
+    return out
+
+# Micro-benchmarks
+
+def bench_fare_scalar(n: int):
+    from backend.pricing_engine import calculate_dynamic_fare
+    from bench.bench_pricing import make_inputs
+    inputs, now = make_inputs(n)
+    deps = inputs["departure_ts"].astype(datetime)
+    args = list(zip(inputs["base_prices"].tolist(), inputs["total_seats"].tolist(), inputs["booked_seats"].tolist(), deps, inputs["demand_levels"]))
+    samples = []
+    t0 = time.perf_counter()
+    for b, t, k, d, l in args:
+        s = time.perf_counter()
+        calculate_dynamic_fare(b, t, k, d, l, now=now)
+        samples.append(time.perf_counter() - s)
+    return summarize(samples, time.perf_counter() - t0)
+
+def bench_fare_batch(n: int, batch: int):
+    from backend.pricing_engine import calculate_dynamic_fares
+    from bench.bench_pricing import make_inputs
+    inputs, now = make_inputs(n)
+    samples = []
+    t0 = time.perf_counter()
+    for lo in range(0, n, batch):
+        s = time.perf_counter()
+        calculate_dynamic_fares(now=now, **{k: v[lo:lo + batch] for k, v in inputs.items()})
+        samples.append(time.perf_counter() - s)
+    elapsed = time.perf_counter() - t0
+    return summarize(samples, elapsed, batch_size=batch, fares_per_sec=round(n / elapsed, 1))
+
+def bench_search_direct(queries):
+    from backend import crud
+    from backend.cache import search_cache
+    from backend.metrics import statement_counter
+    search_cache.clear()
+    samples, statements, rows = [], 0, 0
+    t0 = time.perf_counter()
+    for q in queries:
+        with statement_counter() as stats:
+            s = time.perf_counter()
+            rows += len(crud.search_flights(*q))
+            samples.append(time.perf_counter() - s)
+        statements += stats["statements"]
+    return summarize(samples, time.perf_counter() - t0, statements, rows_per_query=round(rows / len(queries), 1),
+                     cache=search_cache.stats())
+
+# In-process HTTP load
+
+async def drive(app, requests, concurrency: int, keep=None):
+    """Send `requests` ([(method, url, kwargs)]) from `concurrency` clients; keep(json) sees each 2xx body."""
+    pending = iter(requests)
+    samples, errors = [], 0
+
+    async def client_loop(client):
+        nonlocal errors
+        for method, url, kwargs in pending:
+            s = time.perf_counter()
+            resp = await client.request(method, url, **kwargs)
+            samples.append(time.perf_counter() - s)
+            if resp.status_code >= 400:
+                errors += 1
+            elif keep is not None:
+                keep(resp.json())
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return samples, elapsed, errors
+
+def run_http(app, route: str, requests, concurrency: int, keep=None, warmup: int = 50):
+    from backend.metrics import request_statements
+    asyncio.run(drive(app, requests[:warmup], concurrency))
+    before = request_statements.totals((route,))
+    samples, elapsed, errors = asyncio.run(drive(app, requests[warmup:], concurrency, keep))
+    after = request_statements.totals((route,))
+    return summarize(samples, elapsed, after[1] - before[1], errors, concurrency=concurrency)
+
+def search_requests(queries):
+    out = []
+    for o, d, lo, hi in queries:
+        params = {"origin": o, "destination": d}
+        if lo:
+            params.update(date_from=lo.isoformat(), date_to=hi.isoformat())
+        out.append(("GET", "/search", {"params": params}))
+    return out
+
+def booking_requests(n: int, flight_ids, rng):
+    return [("POST", "/book_multi", {"json": {"flight_id": rng.randint(*flight_ids), "simulate_payment": False,
+                                              "passengers": [{"name": f"Bench {i}-{k}", "age": 30} for k in range(rng.randint(1, 3))]}})
+            for i in range(n)]
+
+# Comparison
+
+def compare(baseline, current, threshold: float):
+    """Print per-benchmark changes; returns the regressions beyond threshold (a fraction, e.g. 0.1)."""
+    regressions = []
+    if baseline["meta"].get("schedule", {}).get("flights") != current["meta"]["schedule"]["flights"]:
+        print("warning: the two runs used different schedule sizes")
+    print(f"\n{'benchmark':34} {'metric':24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            a, b = base.get(metric), cur.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = -change if higher_is_better else change
+            noise = metric.endswith("_ms") and abs(b - a) < LATENCY_NOISE_MS
+            flag = "  REGRESSION" if worse > threshold and not noise else ""
+            if flag:
+                regressions.append((name, metric, change))
+            print(f"{name:34} {metric:24} {a:12.3f} {b:12.3f} {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=10_000)
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--seat-flights", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--fares", type=int, default=100_000, help="calculate_dynamic_fare calls")
+    parser.add_argument("--searches", type=int, default=2_000, help="search calls per search benchmark")
+    parser.add_argument("--bookings", type=int, default=2_000)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--out", type=Path, default=None, help="default: <cache dir>/results/<commit>.json")
+    parser.add_argument("--compare", type=Path, default=None, help="an earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    params = {"routes": args.routes, "flights": args.flights, "seat_flights": args.seat_flights, "seed": args.seed}
+    pristine = args.cache_dir / f"synth-{args.routes}-{args.flights}-{args.seed}.db"
+    t0 = time.perf_counter()
+    synth = cached_synthesize(pristine, **params)
+    print(f"schedule: {args.routes:,} routes, {args.flights:,} flights ({time.perf_counter() - t0:.1f}s, cached at {pristine})")
+    # every run books into a fresh copy, so runs start from identical data
+    db_path = Path(tempfile.mkdtemp(prefix="flightbench-")) / "run.db"
+    shutil.copyfile(pristine, db_path)
+    use_database(db_path)
+
+    from backend import api
+    api.startup()
+    anchor = datetime.fromisoformat(synth["anchor"]).date()
+    queries = search_queries(db_path, args.searches * 2 + 100, anchor, rng)
+    results = {}
+
+    def record(name, res):
+        results[name] = res
+        print(f"{name:34} {res['ops_per_sec']:>10,.1f} ops/s  p50 {res['p50_ms']:8.3f} ms  p95 {res['p95_ms']:8.3f} ms  "
+              f"p99 {res['p99_ms']:8.3f} ms  stmts/req {res['statements_per_request']}  errors {res['errors']}")
+
+    try:
+        record("calculate_dynamic_fare", bench_fare_scalar(args.fares))
+        record("calculate_dynamic_fares[batch=50]", bench_fare_batch(args.fares, 50))
+        crud_warmup = queries[:20]
+        bench_search_direct(crud_warmup)  # loads the fare curves and seat maps once
+        record("crud.search_flights", bench_search_direct(queries[20:20 + args.searches]))
+
+        from backend.cache import booking_cache, search_cache
+        search_cache.clear()
+        record("GET /search", run_http(api.app, "/search", search_requests(queries[20 + args.searches:]), args.concurrency))
+
+        pnrs = []
+        keep = lambda body: pnrs.append(body["pnr"])
+        record("POST /book_multi", run_http(api.app, "/book_multi", booking_requests(args.bookings + 50, synth["seat_flight_ids"], rng),
+                                            args.concurrency, keep))
+        booking_cache.clear()
+        lookups = [("GET", f"/booking/{p}", {}) for p in rng.choices(pnrs, k=args.lookups + 50)]
+        record("GET /booking/{pnr}", run_http(api.app, "/booking/{pnr}", lookups, args.concurrency))
+    finally:
+        api.shutdown()
+
+    report = {"meta": {**git_commit(), "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                       "python": platform.python_version(), "platform": platform.platform(), "io_mode": api.DB_IO_MODE,
+                       "schedule": synth, "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}},
+              "results": results}
+    out = args.out or args.cache_dir / "results" / f"{report['meta']['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\nresults written to {out}")
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
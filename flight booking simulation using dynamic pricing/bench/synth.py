@@ -0,0 +1,137 @@
+# bench/synth.py
+# Synthetic schedule for the benchmark suite: DB/db_schema.sql and its seed data are the template, scaled
+# up to N routes and M flights in SQLite. Generated rows follow the seed: aircraft are drawn from the seed
+# fleet, base prices from the seed fare-per-minute of flying, every fourth flight gets one of the seed
+# PriceFactor curves, and the first --seat-flights flights get a full Seat map (seat_map.seat_layout).
+# The same seed and sizes give the same rows; departures are offsets from --anchor (default: today, UTC).
+#   python -m bench.synth --routes 10000 --flights 1000000 --out /tmp/flightbench/synth.db
+import argparse, itertools, json, sqlite3, string, time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from bench.common import build_sqlite_db
+
+SYNTH_VERSION = 2  # bump when the generated rows change, so cached databases are rebuilt
+HORIZON_DAYS = 90
+CARRIERS = ("AI", "6E", "UK", "SG")
+PRICE_FACTOR_SHARE = 4  # one flight in four has a PriceFactor curve (5 of the 20 seed flights do)
+
+def _template(conn):
+    aircraft = conn.execute("SELECT aircraft_id, total_capacity FROM Aircraft ORDER BY aircraft_id").fetchall()
+    routes = conn.execute("SELECT route_id, origin_airport_code, destination_airport_code, base_duration_minutes FROM Route").fetchall()
+    per_minute = conn.execute("SELECT AVG(f.base_price / r.base_duration_minutes) FROM Flight f JOIN Route r ON r.route_id = f.route_id").fetchone()[0]
+    curves = {}
+    for fid, pct, mult in conn.execute("SELECT flight_id, seats_booked_percent, fare_multiplier FROM PriceFactor ORDER BY flight_id, seats_booked_percent"):
+        curves.setdefault(fid, []).append((pct, mult))
+    return aircraft, routes, per_minute, list(curves.values())
+
+def _airports(seed_codes, count: int, rng):
+    """The seed airport codes plus generated three-letter codes, `count` in total."""
+    codes = list(dict.fromkeys(seed_codes))
+    taken = set(codes)
+    pool = ["".join(p) for p in itertools.product(string.ascii_uppercase, repeat=3)]
+    rng.shuffle(pool)
+    codes += [c for c in pool if c not in taken][:max(0, count - len(codes))]
+    return codes
+
+def _routes(template, target: int, rng):
+    """Seed routes first (ids 1..20), then distinct generated (origin, destination) pairs."""
+    airports = _airports([c for r in template for c in r[1:3]], int(target ** 0.5) + 2, rng)
+    existing = {(r[1], r[2]) for r in template}
+    durations = rng.integers(45, 600, size=target)
+    rows = []
+    while len(rows) + len(template) < target:
+        o, d = rng.choice(len(airports), size=2, replace=False)
+        pair = (airports[o], airports[d])
+        if pair not in existing:
+            existing.add(pair)
+            rows.append((pair[0], pair[1], int(durations[len(rows)])))
+    return rows
+
+def synthesize(path, routes: int = 10_000, flights: int = 1_000_000, seat_flights: int = 2_000,
+               seed: int = 17, anchor: date = None, batch_size: int = 50_000):
+    """Build the database at `path` and return its description (also written next to it as .json)."""
+    anchor = anchor or datetime.utcnow().date()
+    path = build_sqlite_db(path)
+    rng = np.random.default_rng(seed)
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    aircraft, template_routes, per_minute, curves = _template(conn)
+
+    conn.executemany("INSERT INTO Route (origin_airport_code, destination_airport_code, base_duration_minutes) VALUES (?, ?, ?)",
+                     _routes(template_routes, routes, rng))
+    durations = dict(conn.execute("SELECT route_id, base_duration_minutes FROM Route"))
+    route_ids = np.array(sorted(durations))
+    first_id = conn.execute("SELECT COALESCE(MAX(flight_id), 0) + 1 FROM Flight").fetchone()[0]
+    count = max(0, flights - first_id + 1)
+
+    # sorted by (route, departure) so the Flight indexes are appended to rather than split
+    fl_routes = np.sort(rng.choice(route_ids, size=count))
+    fl_minutes = rng.integers(0, HORIZON_DAYS * 24 * 60, size=count) // 5 * 5
+    order = np.lexsort((fl_minutes, fl_routes))
+    fl_routes, fl_minutes = fl_routes[order], fl_minutes[order]
+    fl_aircraft = rng.integers(0, len(aircraft), size=count)
+    noise = rng.lognormal(0.0, 0.25, size=count)
+    start = datetime.combine(anchor, datetime.min.time())
+    capacity = {}
+
+    def flight_rows(lo, hi):
+        for i in range(lo, hi):
+            fid = first_id + i
+            aid, cap = aircraft[fl_aircraft[i]]
+            capacity[fid] = cap if fid < first_id + seat_flights else None
+            price = max(999.0, round(durations[int(fl_routes[i])] * per_minute * float(noise[i]), 2))
+            departure = (start + timedelta(minutes=int(fl_minutes[i]))).strftime("%Y-%m-%d %H:%M:00+00:00")
+            yield (fid, f"{CARRIERS[i % len(CARRIERS)]}{i:07d}", int(fl_routes[i]), aid, departure, price)
+
+    for lo in range(0, count, batch_size):
+        conn.executemany("INSERT INTO Flight (flight_id, flight_number, route_id, aircraft_id, departure_time, base_price) VALUES (?, ?, ?, ?, ?, ?)",
+                         flight_rows(lo, min(count, lo + batch_size)))
+        conn.executemany("INSERT INTO PriceFactor (flight_id, seats_booked_percent, fare_multiplier) VALUES (?, ?, ?)",
+                         ((fid, pct, mult) for fid in range(first_id + lo, first_id + min(count, lo + batch_size))
+                          if fid % PRICE_FACTOR_SHARE == 0 for pct, mult in curves[fid % len(curves)]))
+
+    from backend.seat_map import seat_layout
+    conn.executemany("INSERT INTO Seat (flight_id, seat_number, class, is_booked) VALUES (?, ?, ?, FALSE)",
+                     ((fid, num, cls) for fid, cap in capacity.items() if cap for num, cls in seat_layout(cap)))
+    conn.commit()
+    conn.execute("ANALYZE")
+    info = {"version": SYNTH_VERSION, "routes": routes, "flights": flights, "seat_flights": seat_flights, "seed": seed,
+            "anchor": anchor.isoformat(), "seat_flight_ids": [first_id, first_id + min(seat_flights, count) - 1],
+            "build_seconds": round(time.perf_counter() - t0, 2)}
+    conn.close()
+    Path(path).with_suffix(".json").write_text(json.dumps(info, indent=2))
+    return info
+
+def cached_synthesize(path, **params):
+    """Reuse the database at `path` if it was built with the same parameters and version, else rebuild it."""
+    path = Path(path)
+    params.setdefault("anchor", datetime.utcnow().date())
+    meta = path.with_suffix(".json")
+    if path.exists() and meta.exists():
+        info = json.loads(meta.read_text())
+        wanted = {k: (v.isoformat() if isinstance(v, date) else v) for k, v in params.items() if k != "batch_size"}
+        if info.get("version") == SYNTH_VERSION and all(info.get(k) == v for k, v in wanted.items()):
+            return info
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return synthesize(path, **params)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", type=int, default=10_000)
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--seat-flights", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None)
+    parser.add_argument("--out", default="synth.db")
+    args = parser.parse_args()
+    info = synthesize(args.out, routes=args.routes, flights=args.flights, seat_flights=args.seat_flights,
+                      seed=args.seed, anchor=args.anchor)
+    print(json.dumps(info, indent=2))
+
+if __name__ == "__main__":
+    main()
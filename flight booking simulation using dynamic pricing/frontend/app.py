@@ -1,10 +1,54 @@
 # frontend/app.py
 import streamlit as st
-import requests, json
+import streamlit.components.v1 as components
+import requests, json, time
 from datetime import datetime
 
 API_BASE = "http://127.0.0.1:8000"
 
+@st.cache_resource
+def api_session():
+    # one keep-alive connection pool for every rerun of the script
+    return requests.Session()
+
+api = api_session()
+
+def live_fares(flights):
+    """
+    Fares and seat counts kept current in the browser by the /stream/fares event stream: the page
+    updates in place when a booking changes a flight, without rerunning the script or searching again.
+    """
+    rows = "".join(f"<tr><td>{f['flight_id']}</td><td>{f.get('flight_number') or ''}</td><td>{f['departure']}</td>"
+                   f"<td id='fare-{f['flight_id']}'>${f['dynamic_fare']}</td><td id='seats-{f['flight_id']}'>{f['available_seats']}</td></tr>"
+                   for f in flights)
+    ids = ",".join(str(f['flight_id']) for f in flights[:100])
+    components.html(f"""
+        <table style="font-family: sans-serif; width: 100%">
+          <tr><th align="left">Flight</th><th align="left">Number</th><th align="left">Departure</th><th align="left">Fare</th><th align="left">Seats</th></tr>
+          {rows}
+        </table>
+        <script>
+          const stream = new EventSource("{API_BASE}/stream/fares?flight_ids={ids}");
+          const show = (u) => {{
+            document.getElementById("fare-" + u.flight_id).textContent = "$" + u.dynamic_fare;
+            document.getElementById("seats-" + u.flight_id).textContent = u.available_seats;
+          }};
+          stream.addEventListener("snapshot", (e) => JSON.parse(e.data).forEach(show));
+          stream.addEventListener("fare", (e) => show(JSON.parse(e.data)));
+        </script>""", height=60 + 28 * len(flights))
+
+def fare_hold(flight_id, seats):
+    """A held fare for `seats` seats, reused across reruns until it is about to expire."""
+    hold = st.session_state.get('fare_hold')
+    if hold and hold['flight_id'] == flight_id and hold['seats'] >= seats and hold['expires_at'] > time.time() + 10:
+        return hold
+    resp = api.post(f"{API_BASE}/fare_hold", json={"flight_id": flight_id, "seats": seats})
+    if resp.status_code != 200:
+        st.session_state.pop('fare_hold', None)
+        return None
+    st.session_state['fare_hold'] = resp.json()
+    return st.session_state['fare_hold']
+
 st.set_page_config(page_title="Flight Booking Simulator", layout="wide")
 st.title("✈️ Flight Booking Simulator — Multi-step Booking")
 
@@ -17,7 +61,7 @@ with col2:
     destination = st.text_input("Destination (airport code)", "BOM")
 
 if st.button("Search"):
-    resp = requests.get(f"{API_BASE}/search", params={"origin": origin.strip().upper(), "destination": destination.strip().upper()})
+    resp = api.get(f"{API_BASE}/search", params={"origin": origin.strip().upper(), "destination": destination.strip().upper()})
     if resp.status_code != 200:
         st.error("Failed to fetch flights: " + resp.text)
     else:
@@ -25,20 +69,27 @@ if st.button("Search"):
         st.session_state['flights'] = flights
         st.success(f"Found {len(flights)} flights")
 
-if 'flights' in st.session_state:
-    st.subheader("Results")
+if st.session_state.get('flights'):
+    st.subheader("Results (live)")
+    live_fares(st.session_state['flights'])
     for f in st.session_state['flights']:
-        st.markdown(f"**Flight {f['flight_id']}** — Fare: ${f['dynamic_fare']} — Available seats: {f['available_seats']}")
         if st.button(f"Select flight {f['flight_id']}", key=f"select_{f['flight_id']}"):
             st.session_state['selected_flight'] = f
+            st.session_state.pop('fare_hold', None)
             st.experimental_rerun()
 
 # Step 2: Passenger details & book
 if 'selected_flight' in st.session_state:
     st.header("2 — Passenger Info & Payment")
     flight = st.session_state['selected_flight']
-    st.write(f"Selected flight {flight['flight_id']} — Fare per seat: ${flight['dynamic_fare']} — Available: {flight['available_seats']}")
-    num = st.number_input("Passengers", min_value=1, max_value=flight['available_seats'], value=1)
+    num = st.number_input("Passengers", min_value=1, max_value=max(1, flight['available_seats']), value=1)
+    hold = fare_hold(flight['flight_id'], int(num))
+    if hold:
+        until = datetime.fromtimestamp(hold['expires_at']).strftime('%H:%M:%S')
+        st.write(f"Selected flight {flight['flight_id']} — Fare per seat: ${hold['fare_per_seat']} held until {until} — "
+                 f"Total: ${round(hold['fare_per_seat'] * int(num), 2)}")
+    else:
+        st.warning(f"Could not hold a fare for {int(num)} seat(s) on flight {flight['flight_id']}; it may be sold out.")
     passengers = []
     for i in range(int(num)):
         st.subheader(f"Passenger {i+1}")
@@ -55,15 +106,17 @@ if 'selected_flight' in st.session_state:
             "flight_id": flight['flight_id'],
             "passengers": passengers,
             "simulate_payment": simulate_payment,
-            "payment_success_rate": payment_rate
+            "payment_success_rate": payment_rate,
+            "fare_hold_token": hold['token'] if hold else None
         }
-        res = requests.post(f"{API_BASE}/book_multi", json=payload)
+        res = api.post(f"{API_BASE}/book_multi", json=payload)
         if res.status_code == 200:
             data = res.json()
+            st.session_state.pop('fare_hold', None)  # used up by the booking
             st.success(f"Booking confirmed! PNR: {data['pnr']} — Total: ${data['total_price']}")
             # fetch receipt
             try:
-                r = requests.get(f"{API_BASE}/booking/{data['pnr']}")
+                r = api.get(f"{API_BASE}/booking/{data['pnr']}")
                 if r.status_code == 200:
                     book = r.json()
                     st.json(book.get('receipt'))
@@ -83,7 +136,7 @@ st.header("3 — Booking Management")
 pnr_q = st.text_input("PNR to lookup/cancel")
 if st.button("Get Booking"):
     if pnr_q:
-        r = requests.get(f"{API_BASE}/booking/{pnr_q}")
+        r = api.get(f"{API_BASE}/booking/{pnr_q}")
         if r.status_code == 200:
             st.json(r.json())
             st.session_state['viewed_pnr'] = pnr_q
@@ -92,7 +145,7 @@ if st.button("Get Booking"):
 
 if st.button("Cancel Booking"):
     if 'viewed_pnr' in st.session_state:
-        r = requests.post(f"{API_BASE}/cancel/{st.session_state['viewed_pnr']}")
+        r = api.post(f"{API_BASE}/cancel/{st.session_state['viewed_pnr']}")
         if r.status_code == 200:
             st.success("Cancelled")
         else:
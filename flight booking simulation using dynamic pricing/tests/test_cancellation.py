@@ -0,0 +1,109 @@
+# tests/test_cancellation.py
+import pytest
+from sqlalchemy import text
+
+from bench.common import build_sqlite_db, use_database
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh seeded SQLite database with empty in-process caches."""
+    engine = use_database(build_sqlite_db(tmp_path / "cancel.db"))
+    from backend.cache import booking_cache, search_cache
+    from backend.db_config import init_db
+    from backend.seat_map import seat_maps
+    init_db()
+    seat_maps.invalidate()
+    search_cache.clear()
+    booking_cache.clear()
+    yield engine
+    engine.dispose()
+
+def add_flight(engine, departure="2030-01-15 08:00:00+00:00", capacity=20):
+    """A flight on route 1 with a seat map; returns its id."""
+    from backend.seat_map import seat_layout
+    with engine.begin() as conn:
+        aircraft_id = conn.execute(text("INSERT INTO Aircraft (model, total_capacity) VALUES ('Test', :cap)"), {"cap": capacity}).lastrowid
+        flight_id = conn.execute(text("INSERT INTO Flight (flight_number, route_id, aircraft_id, departure_time, base_price) "
+                                      "VALUES ('TS100', 1, :aid, :dep, 5000.00)"), {"aid": aircraft_id, "dep": departure}).lastrowid
+        conn.execute(text("INSERT INTO Seat (flight_id, seat_number, class, is_booked) VALUES (:fid, :num, :cls, FALSE)"),
+                     [{"fid": flight_id, "num": num, "cls": cls} for num, cls in seat_layout(capacity)])
+    return flight_id
+
+def book(flight_id, *seats):
+    from backend import crud
+    return crud.book_multi({"flight_id": flight_id, "simulate_payment": False,
+                            "passengers": [{"name": f"Pax {i}", "seat": seat} for i, seat in enumerate(seats)]})
+
+def occupancy(engine, flight_id):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT current_occupancy FROM Flight WHERE flight_id = :fid"), {"fid": flight_id}).scalar()
+
+def test_cancelled_seat_can_be_rebooked(db):
+    from backend import cancellation
+    fid = add_flight(db)
+    first = book(fid, "3A")
+    [result] = cancellation.cancel_bookings([first["pnr"].lower()])
+    assert result["status"] == "cancelled" and result["refund"] == first["total_price"]
+    assert occupancy(db, fid) == 0
+    assert book(fid, "3A")["seats"] == ["3A"]
+
+def test_cancelling_twice_fails(db):
+    from backend import cancellation
+    pnr = book(add_flight(db), "3A")["pnr"]
+    cancellation.cancel_bookings([pnr])
+    [result] = cancellation.cancel_bookings([pnr])
+    assert result["status"] == "failed" and result["error"] == "Booking is already cancelled"
+
+def test_customer_cannot_cancel_after_departure(db):
+    from backend import cancellation
+    fid = add_flight(db, departure="2020-01-15 08:00:00+00:00")
+    pnr = book(fid, "3A")["pnr"]
+    [result] = cancellation.cancel_bookings([pnr])
+    assert result["status"] == "failed" and result["error"] == "Flight has already departed"
+    assert occupancy(db, fid) == 1
+
+def test_unknown_reason_is_refused(db):
+    from backend import cancellation
+    with pytest.raises(ValueError):
+        cancellation.cancel_bookings(["ABCDEF"], cancellation.FLIGHT_CANCELLED)
+
+def test_flight_cancel_refunds_in_full_and_hides_the_flight(db):
+    from backend import cancellation, crud
+    fid = add_flight(db)
+    booked = [book(fid, "3A", "3B"), book(fid, "4A")]
+    with db.connect() as conn:
+        origin, destination = conn.execute(text("SELECT origin_airport_code, destination_airport_code FROM Route WHERE route_id = 1")).fetchone()
+    assert any(f["flight_id"] == fid for f in crud.search_flights(origin, destination))
+
+    results = cancellation.cancel_flight(fid)
+    assert sorted(r["refund"] for r in results) == sorted(b["total_price"] for b in booked)
+    assert occupancy(db, fid) == 0
+    assert all(f["flight_id"] != fid for f in crud.search_flights(origin, destination))
+    with pytest.raises(ValueError, match="Flight is cancelled"):
+        book(fid, "3A")
+
+def test_flight_cancel_drops_its_seat_map(db):
+    from backend import cancellation
+    from backend.seat_map import seat_maps
+    fid = add_flight(db)
+    assert seat_maps.availability([fid])[fid]
+    cancellation.cancel_flight(fid)
+    assert seat_maps.stats()["size"] == 0
+
+def test_cancelling_an_unknown_flight_fails(db):
+    from backend import cancellation
+    with pytest.raises(cancellation.FlightNotFound):
+        cancellation.cancel_flight(999_999)
+
+def test_simulator_leaves_cancelled_flight_alone(db):
+    from backend import cancellation
+    from backend.simulator import DemandSimulator
+    fid = add_flight(db)
+    sim = DemandSimulator(arrival_model="uniform", seed=1)
+    sim.tick()
+    cancellation.cancel_flight(fid)  # after the simulator loaded its schedule
+    before = occupancy(db, fid)
+    for _ in range(3):
+        assert fid not in sim.tick()
+    assert fid not in DemandSimulator(arrival_model="uniform", seed=1).tick()
+    assert occupancy(db, fid) == before
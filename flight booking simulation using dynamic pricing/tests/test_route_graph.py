@@ -0,0 +1,35 @@
+# tests/test_route_graph.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from backend.route_graph import _Schedule, _minutes, _search
+
+DAY = datetime(2030, 1, 15)
+
+def schedule_of(*legs):
+    """A _Schedule over (origin, destination, departure hour, duration minutes, fare) legs, flight ids 1.."""
+    rows = [SimpleNamespace(flight_id=i, flight_number=f"T{i}", origin_airport_code=o, destination_airport_code=d,
+                            departure_time=DAY + timedelta(hours=h), base_duration_minutes=mins, base_price=fare,
+                            total_capacity=100, current_occupancy=0)
+            for i, (o, d, h, mins, fare) in enumerate(legs, start=1)]
+    schedule = _Schedule(rows)
+    for i, (*_, fare) in enumerate(legs):
+        schedule.fare[i] = fare
+    return schedule
+
+def search(schedule, origin, destination, k=1, sort="price", max_connection=8 * 60):
+    paths, _ = _search(schedule, schedule.index[origin], schedule.index[destination], _minutes(DAY), _minutes(DAY + timedelta(days=1)),
+                       k, sort, 1, 1, 45, max_connection)
+    return [[schedule.ids[row] for row in path] for path in paths]
+
+def test_late_inbound_leg_still_catches_a_late_outbound_leg():
+    # the cheap inbound arrives at 10:00 and its 8 h connection window closes before the 20:00
+    # departure; the dearer one arriving at 14:00 can still make it
+    schedule = schedule_of(("AAA", "HUB", 8, 120, 100.0), ("AAA", "HUB", 12, 120, 150.0), ("HUB", "DST", 20, 60, 100.0))
+    assert search(schedule, "AAA", "DST") == [[2, 3]]
+    assert search(schedule, "AAA", "DST", sort="duration") == [[2, 3]]
+
+def test_earlier_arrival_that_catches_the_same_flights_dominates():
+    schedule = schedule_of(("AAA", "HUB", 8, 120, 100.0), ("AAA", "HUB", 9, 120, 150.0), ("HUB", "DST", 13, 60, 100.0))
+    assert search(schedule, "AAA", "DST", k=2) == [[1, 3], [2, 3]]
+    assert search(schedule, "AAA", "DST") == [[1, 3]]
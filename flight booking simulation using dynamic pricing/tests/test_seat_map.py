@@ -0,0 +1,48 @@
+# tests/test_seat_map.py
+import pytest
+
+from backend.seat_map import FlightSeatMap, seat_layout
+
+def make_map(capacity=20, booked=()):
+    """A FlightSeatMap over seat_layout(capacity), seat ids 1.., with `booked` seat numbers taken."""
+    return FlightSeatMap([(sid, num, cls, num in booked) for sid, (num, cls) in enumerate(seat_layout(capacity), start=1)])
+
+def numbers(seats):
+    return [s[1] if s else None for s in seats]
+
+def test_no_seat_map_leaves_seats_unassigned():
+    seat_map = FlightSeatMap([])
+    passengers = [{"name": "A", "seat": "12A"}, {"name": "B"}]
+    assert seat_map.pick(passengers) == [None, None]
+    assert seat_map.pick(passengers, seat_class="Business") == [None, None]
+
+def test_named_seat():
+    seat_map = make_map()
+    assert numbers(seat_map.pick([{"name": "A", "seat": "3c"}, {"name": "B"}])) == ["3C", "2A"]
+
+def test_named_seat_must_exist_and_be_free():
+    seat_map = make_map(booked={"3C"})
+    with pytest.raises(ValueError, match="does not exist"):
+        seat_map.pick([{"name": "A", "seat": "99Z"}])
+    with pytest.raises(ValueError, match="already booked"):
+        seat_map.pick([{"name": "A", "seat": "3C"}])
+
+def test_party_sits_together_in_economy():
+    seat_map = make_map()
+    assert numbers(seat_map.pick([{"name": n} for n in "ABC"])) == ["2A", "2B", "2C"]
+
+def test_party_split_across_cabins():
+    # 20 seats: 2 Business (1A, 1C), 18 Economy; leave 2 Economy and 1 Business free
+    economy = [num for num, cls in seat_layout(20) if cls == "Economy"]
+    seat_map = make_map(booked={"1A"} | set(economy[2:]))
+    assert numbers(seat_map.pick([{"name": n} for n in "ABC"])) == ["2A", "2B", "1C"]
+
+def test_party_larger_than_free_seats_fails():
+    seat_map = make_map(booked={num for num, _ in seat_layout(20)} - {"2A", "1C"})
+    with pytest.raises(ValueError, match="Only 2 seats available"):
+        seat_map.pick([{"name": n} for n in "ABC"])
+
+def test_seats_taken_earlier_in_batch_are_skipped():
+    seat_map = make_map()
+    first = seat_map.pick([{"name": "A"}])
+    assert numbers(seat_map.pick([{"name": "B"}], taken_ids=[first[0][0]])) == ["2B"]